@@ -2,6 +2,7 @@ from fastapi import APIRouter
 
 from app.api.v1.cnaes import router as cnaes_router
 from app.api.v1.empresas import router as empresas_router
+from app.api.v1.estabelecimentos import busca_router as estabelecimentos_busca_router
 from app.api.v1.estabelecimentos import router as estabelecimentos_router
 from app.api.v1.municipios import router as municipios_router
 from app.api.v1.naturezas import router as naturezas_router
@@ -17,4 +18,5 @@ router.include_router(naturezas_router)
 router.include_router(cnaes_router)
 router.include_router(empresas_router)
 router.include_router(estabelecimentos_router)
+router.include_router(estabelecimentos_busca_router)
 router.include_router(simples_router)
\ No newline at end of file
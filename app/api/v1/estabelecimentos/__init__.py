@@ -1,5 +1,5 @@
-from app.api.v1.estabelecimentos.router import router
+from app.api.v1.estabelecimentos.router import busca_router, router
 from app.api.v1.estabelecimentos.schemas import EstabelecimentoRead
 from app.api.v1.estabelecimentos.service import EstabelecimentoService
 
-__all__ = ["router", "EstabelecimentoRead", "EstabelecimentoService"]
+__all__ = ["router", "busca_router", "EstabelecimentoRead", "EstabelecimentoService"]
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
@@ -7,6 +7,7 @@ from app.api.v1.estabelecimentos.schemas import EstabelecimentoRead
 from app.api.v1.estabelecimentos.service import EstabelecimentoService
 
 router = APIRouter(prefix="/empresas/{cnpj_basico}/estabelecimentos", tags=["Estabelecimentos"])
+busca_router = APIRouter(prefix="/estabelecimentos", tags=["Estabelecimentos"])
 
 
 def get_estabelecimento_service(
@@ -53,4 +54,29 @@ async def listar_estabelecimentos(
         total_items=total_items,
         current_page=pagination.page,
         items_per_page=pagination.limit,
-    )
\ No newline at end of file
+    )
+
+
+@busca_router.get("", response_model=PaginatedResponse[EstabelecimentoRead])
+async def buscar_estabelecimentos(
+    cnae_secundario: str = Query(
+        ...,
+        min_length=7,
+        max_length=7,
+        description="Código CNAE entre as atividades secundárias (ex: 6202300)",
+    ),
+    pagination: PaginationParams = Depends(get_pagination_params),
+    service: EstabelecimentoService = Depends(get_estabelecimento_service),
+):
+    """Lista estabelecimentos que exercem o CNAE como atividade secundária."""
+    estabelecimentos, total_items, total_pages = await service.get_by_cnae_secundario(
+        codigo=cnae_secundario,
+        page=pagination.page,
+        limit=pagination.limit,
+    )
+    return PaginatedResponse.from_page(
+        data=estabelecimentos,
+        total_items=total_items,
+        current_page=pagination.page,
+        items_per_page=pagination.limit,
+    )
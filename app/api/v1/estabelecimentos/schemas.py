@@ -1,6 +1,6 @@
 from datetime import date
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
 class EstabelecimentoRead(BaseModel):
@@ -20,7 +20,13 @@ class EstabelecimentoRead(BaseModel):
     pais: str | None
     data_inicio_atividade: date | None
     cnae_fiscal_principal: str
+    # Texto da Receita ("6201501,6202300"), como antes da coluna virar array
     cnae_fiscal_secundaria: str | None
+    cnaes_secundarios: list[str] | None = Field(
+        default=None,
+        validation_alias="cnae_fiscal_secundaria",
+        description="Códigos CNAE das atividades secundárias, em lista",
+    )
     tipo_logradouro: str
     logradouro: str
     numero: str
@@ -38,3 +44,8 @@ class EstabelecimentoRead(BaseModel):
     correio_eletronico: str | None
     situacao_especial: str | None
     data_situacao_especial: date | None
+
+    @field_validator("cnae_fiscal_secundaria", mode="before")
+    @classmethod
+    def _join_cnaes(cls, value):
+        return ",".join(value) if isinstance(value, list) else value
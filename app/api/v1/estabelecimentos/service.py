@@ -34,5 +34,17 @@ class EstabelecimentoService:
             limit=limit,
         )
 
+    async def get_by_cnae_secundario(
+        self,
+        codigo: str,
+        page: int = 1,
+        limit: int = 25,
+    ):
+        return await self._repo.get_by_cnae_secundario(
+            codigo=codigo,
+            page=page,
+            limit=limit,
+        )
+
     async def get_all(self, page: int = 1, limit: int = 25):
         return await self._repo.get_all(page=page, limit=limit)
@@ -28,6 +28,8 @@ class Settings(BaseSettings):
     postgres_port: int = Field(default=5432, validation_alias='POSTGRES_PORT')
     postgres_db: str = Field(default='cnpj_api', validation_alias='POSTGRES_DB')
     page_limit: int = Field(default=25, validation_alias='PAGE_LIMIT')
+    db_pool_size: int = Field(default=5, validation_alias='DB_POOL_SIZE')
+    db_max_overflow: int = Field(default=10, validation_alias='DB_MAX_OVERFLOW')
 
     @property
     def database_url(self) -> str:
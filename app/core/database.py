@@ -10,7 +10,12 @@ from app.core.config import settings
 mapper_registry = registry()
 Base = mapper_registry.generate_base()
 
-engine = create_async_engine(settings.database_url, echo=False)
+engine = create_async_engine(
+    settings.database_url,
+    echo=False,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+)
 SessionLocal = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
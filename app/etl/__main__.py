@@ -1,7 +1,10 @@
 import argparse
 import asyncio
+import csv
+import glob
 import logging
 import sys
+import tempfile
 from pathlib import Path
 
 # Raiz do projeto (para resolver caminhos relativos)
@@ -9,7 +12,15 @@ PROJECT_ROOT = Path(__file__).resolve().parents[2]
 # Garante que o projeto está no path (rodar de qualquer diretório)
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from app.etl.session import get_async_session
+from app.etl.base import LOAD_MODES, BaseCSVPipeline
+from app.etl.diff import apply_removals, diff_snapshots
+from app.etl.fastload import MAINTENANCE_WORK_MEM, fast_full_load, state_path_for
+from app.etl.metrics import RunMetrics, write_json_report, write_prometheus
+from app.etl.orchestrator import ReleaseReport, detect_stages, run_release
+from app.etl.readers.archive import count_lines, is_zip, open_input
+from app.etl.rejects import rejects_path_for
+from app.etl.runner import input_files, is_input_file, max_concurrency, run_files, status_path_for
+from app.etl.swap import build_next, create_next, drop_next, next_table_for, swap
 from app.etl.pipelines import (
     CnaesPipeline,
     EmpresasPipeline,
@@ -22,6 +33,55 @@ from app.etl.pipelines import (
     SimplesPipeline,
 )
 
+# Subcomando -> (pipeline, ajuda, exemplo de arquivo)
+PIPELINES: dict[str, tuple[type[BaseCSVPipeline], str, str]] = {
+    "paises": (
+        PaisesPipeline,
+        "Importar CSV de países",
+        "storage/F.K03200$Z.D60110.PAISCSV",
+    ),
+    "municipios": (
+        MunicipiosPipeline,
+        "Importar CSV de municípios",
+        "storage/F.K03200$Z.D60110.MUNICCSV",
+    ),
+    "qualificacoes": (
+        QualificacoesPipeline,
+        "Importar CSV de qualificações (sócios)",
+        "storage/F.K03200$Z.D60110.QUALSCSV",
+    ),
+    "naturezas": (
+        NaturezasPipeline,
+        "Importar CSV de naturezas jurídicas",
+        "storage/F.K03200$Z.D60110.NATJUCSV",
+    ),
+    "motivos": (
+        MotivosPipeline,
+        "Importar CSV de motivos (situação cadastral)",
+        "storage/F.K03200$Z.D60110.MOTICSV",
+    ),
+    "cnaes": (
+        CnaesPipeline,
+        "Importar CSV de CNAEs (atividades econômicas)",
+        "storage/F.K03200$Z.D60110.CNAECSV",
+    ),
+    "empresas": (
+        EmpresasPipeline,
+        "Importar CSV de empresas (EMPRECSV)",
+        "K3241.K03200Y0.D60110.EMPRECSV",
+    ),
+    "estabelecimentos": (
+        EstabelecimentosPipeline,
+        "Importar CSV de estabelecimentos (ESTABELE)",
+        "storage/K3241.K03200Y0.D60110.ESTABELE",
+    ),
+    "simples": (
+        SimplesPipeline,
+        "Importar CSV de Simples Nacional (SIMPLES.CSV)",
+        "storage/K3241.K03200Y0.D60110.SIMPLES.CSV",
+    ),
+}
+
 
 def _resolve_path(file_path: str) -> Path:
     """Resolve caminho: se for relativo, usa a raiz do projeto como base."""
@@ -29,6 +89,20 @@ def _resolve_path(file_path: str) -> Path:
     return (PROJECT_ROOT / p) if not p.is_absolute() else p
 
 
+def _resolve_inputs(file_arg: str, pipeline_cls: type[BaseCSVPipeline]) -> list[Path]:
+    """
+    Expande a entrada em arquivos: um diretório (arquivos que casam com file_patterns
+    do pipeline), um glob (ex.: 'storage/*ESTABELE*') ou um único arquivo; nos dois primeiros,
+    sem os arquivos que o ETL grava ao lado das entradas (ver is_input_file).
+    """
+    p = _resolve_path(file_arg)
+    if p.is_dir():
+        return input_files(p, pipeline_cls.file_patterns)
+    if glob.has_magic(file_arg):
+        return sorted(Path(f) for f in glob.glob(str(p)) if is_input_file(Path(f)))
+    return [p]
+
+
 def _setup_logging(quiet: bool, debug: bool = False) -> None:
     if debug:
         logging.basicConfig(
@@ -47,543 +121,536 @@ def _setup_logging(quiet: bool, debug: bool = False) -> None:
         )
 
 
-async def _cmd_paises(args: argparse.Namespace) -> int:
-    path = _resolve_path(args.file)
-    if not path.exists():
-        print(f"Erro: arquivo não encontrado: {path}", file=sys.stderr)
+def _dry_run(pipeline_cls: type[BaseCSVPipeline], path: Path) -> None:
+    """Dry-run: só valida header e primeira linha."""
+    pipeline = pipeline_cls(None)
+    with open_input(path, pipeline.encoding, pipeline.file_patterns) as source:
+        r = csv.reader(source.text, delimiter=pipeline.delimiter)
+        pipeline._validate_header(list(pipeline.fieldnames or next(r, [])))
+        row = next(r, None)
+        if row is not None:
+            pipeline._convert(row)
+
+
+async def _cmd_pipeline(args: argparse.Namespace) -> int:
+    pipeline_cls = args.pipeline_cls
+    if getattr(args, "swap_rollback", False):
+        _setup_logging(getattr(args, "quiet", False), getattr(args, "debug", False))
+        return await _run_swap_rollback(args, pipeline_cls)
+    if args.file is None:
+        print("Erro: informe o arquivo (ou diretório/glob) a importar", file=sys.stderr)
         return 1
-    quiet = getattr(args, "quiet", False)
-    debug = getattr(args, "debug", False)
-    _setup_logging(quiet, debug)
-    async with get_async_session() as session:
-        pipeline = PaisesPipeline(session)
-        if getattr(args, "dry_run", False):
-            # Dry-run: só valida header e primeira linha
-            with path.open(newline="", encoding=pipeline.encoding) as f:
-                import csv
-                r = csv.DictReader(
-                    f,
-                    delimiter=pipeline.delimiter,
-                    fieldnames=list(pipeline.fieldnames) if pipeline.fieldnames else None,
-                )
-                pipeline._validate_header(list(r.fieldnames or []))
-                for i, row in enumerate(r):
-                    if i >= 1:
-                        break
-                    pipeline.transform_row(row)
-            print("Dry-run OK: CSV válido.")
-            return 0
-        stats = await pipeline.run(
-            path,
-            show_progress=not quiet,
-            debug=debug,
-            auto_commit=getattr(args, "auto_commit", False),
-        )
-    print("ETL concluído:", stats)
-    return 0
-
-
-async def _cmd_municipios(args: argparse.Namespace) -> int:
-    path = _resolve_path(args.file)
-    if not path.exists():
-        print(f"Erro: arquivo não encontrado: {path}", file=sys.stderr)
+    paths = _resolve_inputs(args.file, pipeline_cls)
+    if not paths:
+        print(f"Erro: nenhum arquivo encontrado em: {args.file}", file=sys.stderr)
         return 1
-    quiet = getattr(args, "quiet", False)
-    debug = getattr(args, "debug", False)
-    _setup_logging(quiet, debug)
-    async with get_async_session() as session:
-        pipeline = MunicipiosPipeline(session)
-        if getattr(args, "dry_run", False):
-            with path.open(newline="", encoding=pipeline.encoding) as f:
-                import csv
-                r = csv.DictReader(
-                    f,
-                    delimiter=pipeline.delimiter,
-                    fieldnames=list(pipeline.fieldnames) if pipeline.fieldnames else None,
-                )
-                pipeline._validate_header(list(r.fieldnames or []))
-                for i, row in enumerate(r):
-                    if i >= 1:
-                        break
-                    pipeline.transform_row(row)
-            print("Dry-run OK: CSV válido.")
-            return 0
-        stats = await pipeline.run(
-            path,
-            show_progress=not quiet,
-            debug=debug,
-            auto_commit=getattr(args, "auto_commit", False),
-        )
-    print("ETL concluído:", stats)
-    return 0
-
-
-async def _cmd_qualificacoes(args: argparse.Namespace) -> int:
-    path = _resolve_path(args.file)
-    if not path.exists():
-        print(f"Erro: arquivo não encontrado: {path}", file=sys.stderr)
+    missing = [p for p in paths if not p.exists()]
+    if missing:
+        print(f"Erro: arquivo não encontrado: {missing[0]}", file=sys.stderr)
         return 1
-    quiet = getattr(args, "quiet", False)
-    debug = getattr(args, "debug", False)
-    _setup_logging(quiet, debug)
-    async with get_async_session() as session:
-        pipeline = QualificacoesPipeline(session)
-        if getattr(args, "dry_run", False):
-            with path.open(newline="", encoding=pipeline.encoding) as f:
-                import csv
-                r = csv.DictReader(
-                    f,
-                    delimiter=pipeline.delimiter,
-                    fieldnames=list(pipeline.fieldnames) if pipeline.fieldnames else None,
-                )
-                pipeline._validate_header(list(r.fieldnames or []))
-                for i, row in enumerate(r):
-                    if i >= 1:
-                        break
-                    pipeline.transform_row(row)
-            print("Dry-run OK: CSV válido.")
-            return 0
-        stats = await pipeline.run(
-            path,
-            show_progress=not quiet,
-            debug=debug,
-            auto_commit=getattr(args, "auto_commit", False),
-        )
-    print("ETL concluído:", stats)
-    return 0
-
-
-async def _cmd_naturezas(args: argparse.Namespace) -> int:
-    path = _resolve_path(args.file)
-    if not path.exists():
-        print(f"Erro: arquivo não encontrado: {path}", file=sys.stderr)
+    if not _valid_writers(args.writers):
         return 1
     quiet = getattr(args, "quiet", False)
     debug = getattr(args, "debug", False)
     _setup_logging(quiet, debug)
-    async with get_async_session() as session:
-        pipeline = NaturezasPipeline(session)
-        if getattr(args, "dry_run", False):
-            with path.open(newline="", encoding=pipeline.encoding) as f:
-                import csv
-                r = csv.DictReader(
-                    f,
-                    delimiter=pipeline.delimiter,
-                    fieldnames=list(pipeline.fieldnames) if pipeline.fieldnames else None,
-                )
-                pipeline._validate_header(list(r.fieldnames or []))
-                for i, row in enumerate(r):
-                    if i >= 1:
-                        break
-                    pipeline.transform_row(row)
-            print("Dry-run OK: CSV válido.")
-            return 0
-        stats = await pipeline.run(
-            path,
-            show_progress=not quiet,
-            debug=debug,
-            auto_commit=getattr(args, "auto_commit", False),
-        )
-    print("ETL concluído:", stats)
-    return 0
-
 
-async def _cmd_motivos(args: argparse.Namespace) -> int:
-    path = _resolve_path(args.file)
-    if not path.exists():
-        print(f"Erro: arquivo não encontrado: {path}", file=sys.stderr)
+    if getattr(args, "dry_run", False):
+        for path in paths:
+            _dry_run(pipeline_cls, path)
+            if not is_zip(path):
+                print(f"  {path.name}: {count_lines(path)} linhas")
+        print("Dry-run OK: CSV válido.")
+        return 0
+
+    run_kwargs = dict(
+        concurrency=args.concurrency,
+        show_progress=not quiet,
+        debug=debug,
+        auto_commit=getattr(args, "auto_commit", False),
+        mode=getattr(args, "mode", "orm"),
+        workers=getattr(args, "workers", 1),
+        writers=args.writers,
+    )
+    resume = getattr(args, "resume", False)
+    replay = getattr(args, "replay_rejects", False)
+    swap_reload = getattr(args, "swap", False)
+    fast_reload = getattr(args, "fast_full_load", False)
+    if swap_reload or fast_reload:
+        if (swap_reload and fast_reload) or replay or resume or args.retry_failed or getattr(args, "since", None):
+            print(
+                "Erro: --swap e --fast-full-load recarregam a tabela do zero; não combinam entre si "
+                "nem com --since, --replay-rejects, --resume ou --retry-failed",
+                file=sys.stderr,
+            )
+            return 1
+        if swap_reload:
+            return await _run_swap(args, pipeline_cls, paths, **run_kwargs)
+        return await _run_fast_full_load(args, pipeline_cls, paths, **run_kwargs)
+    if getattr(args, "since", None) and not replay:
+        return await _run_since(args, pipeline_cls, paths, **run_kwargs)
+
+    report = await run_files(
+        pipeline_cls,
+        paths,
+        status_path=status_path_for(pipeline_cls, paths) if len(paths) > 1 and not replay else None,
+        retry_failed=args.retry_failed and not replay,
+        replay_rejects=replay,
+        resume=resume and not replay,
+        **run_kwargs,
+    )
+    _write_metrics(args, report.metrics)
+    return _print_report(report)
+
+
+def _write_metrics(args: argparse.Namespace, runs: list[RunMetrics]) -> None:
+    """Relatório JSON (--metrics-json) e textfile do Prometheus (--metrics-prom) da execução."""
+    if getattr(args, "metrics_json", None):
+        write_json_report(Path(args.metrics_json), runs)
+    if getattr(args, "metrics_prom", None):
+        write_prometheus(Path(args.metrics_prom), runs)
+
+
+def _print_report(report) -> int:
+    """Resumo da importação de um conjunto de arquivos; retorna o código de saída."""
+    if len(report.results) > 1:
+        for result in report.results:
+            detail = result.stats if result.ok else f"FALHOU ({result.error})"
+            print(f"  {result.path.name}: {detail}")
+    if len(report.results) == 1 and report.failed:
+        print(f"Erro: {report.failed[0].error}", file=sys.stderr)
         return 1
-    quiet = getattr(args, "quiet", False)
-    debug = getattr(args, "debug", False)
-    _setup_logging(quiet, debug)
-    async with get_async_session() as session:
-        pipeline = MotivosPipeline(session)
-        if getattr(args, "dry_run", False):
-            with path.open(newline="", encoding=pipeline.encoding) as f:
-                import csv
-                r = csv.DictReader(
-                    f,
-                    delimiter=pipeline.delimiter,
-                    fieldnames=list(pipeline.fieldnames) if pipeline.fieldnames else None,
-                )
-                pipeline._validate_header(list(r.fieldnames or []))
-                for i, row in enumerate(r):
-                    if i >= 1:
-                        break
-                    pipeline.transform_row(row)
-            print("Dry-run OK: CSV válido.")
-            return 0
-        stats = await pipeline.run(
-            path,
-            show_progress=not quiet,
-            debug=debug,
-            auto_commit=getattr(args, "auto_commit", False),
+    if report.failed:
+        print(
+            f"ETL com falhas em {len(report.failed)} arquivo(s); "
+            "reexecute com --retry-failed para processar só esses.",
+            file=sys.stderr,
         )
-    print("ETL concluído:", stats)
-    return 0
-
-
-async def _cmd_cnaes(args: argparse.Namespace) -> int:
-    path = _resolve_path(args.file)
-    if not path.exists():
-        print(f"Erro: arquivo não encontrado: {path}", file=sys.stderr)
         return 1
-    quiet = getattr(args, "quiet", False)
-    debug = getattr(args, "debug", False)
-    _setup_logging(quiet, debug)
-    async with get_async_session() as session:
-        pipeline = CnaesPipeline(session)
-        if getattr(args, "dry_run", False):
-            with path.open(newline="", encoding=pipeline.encoding) as f:
-                import csv
-                r = csv.DictReader(
-                    f,
-                    delimiter=pipeline.delimiter,
-                    fieldnames=list(pipeline.fieldnames) if pipeline.fieldnames else None,
-                )
-                pipeline._validate_header(list(r.fieldnames or []))
-                for i, row in enumerate(r):
-                    if i >= 1:
-                        break
-                    pipeline.transform_row(row)
-            print("Dry-run OK: CSV válido.")
-            return 0
-        stats = await pipeline.run(
-            path,
-            show_progress=not quiet,
-            debug=debug,
-            auto_commit=getattr(args, "auto_commit", False),
-        )
-    print("ETL concluído:", stats)
+    print("ETL concluído:", report.totals)
     return 0
 
 
-async def _cmd_empresas(args: argparse.Namespace) -> int:
-    path = _resolve_path(args.file)
-    if not path.exists():
-        print(f"Erro: arquivo não encontrado: {path}", file=sys.stderr)
+async def _run_fast_full_load(
+    args: argparse.Namespace,
+    pipeline_cls: type[BaseCSVPipeline],
+    paths: list[Path],
+    **run_kwargs,
+) -> int:
+    """Recarga completa: tabela vazia e sem índices/constraints durante o COPY (ver app.etl.fastload)."""
+    run_kwargs["mode"] = "copy"
+    table = pipeline_cls.model.__tablename__
+    try:
+        async with fast_full_load(
+            table,
+            state_path=state_path_for(table, paths),
+            concurrency=min(args.concurrency, max_concurrency()),
+            maintenance_work_mem=args.maintenance_work_mem,
+        ) as rebuilt:
+            report = await run_files(pipeline_cls, paths, **run_kwargs)
+    except Exception as exc:
+        print(f"Erro: {type(exc).__name__}: {exc}", file=sys.stderr)
         return 1
-    quiet = getattr(args, "quiet", False)
-    debug = getattr(args, "debug", False)
-    _setup_logging(quiet, debug)
-    async with get_async_session() as session:
-        pipeline = EmpresasPipeline(session)
-        if getattr(args, "dry_run", False):
-            with path.open(newline="", encoding=pipeline.encoding) as f:
-                import csv
-                r = csv.DictReader(
-                    f,
-                    delimiter=pipeline.delimiter,
-                    fieldnames=list(pipeline.fieldnames) if pipeline.fieldnames else None,
-                )
-                pipeline._validate_header(list(r.fieldnames or []))
-                for i, row in enumerate(r):
-                    if i >= 1:
-                        break
-                    pipeline.transform_row(row)
-            print("Dry-run OK: CSV válido.")
-            return 0
-        stats = await pipeline.run(
-            path,
-            show_progress=not quiet,
-            debug=debug,
-            auto_commit=getattr(args, "auto_commit", False),
+    for invalid in rebuilt.invalid:
+        print(f"  FK não validada (continua NOT VALID): {invalid}", file=sys.stderr)
+    for missing in rebuilt.missing:
+        print(f"  FK não recriada (recrie com uma nova --fast-full-load): {missing}", file=sys.stderr)
+    _write_metrics(args, report.metrics)
+    return _print_report(report)
+
+
+async def _run_swap(
+    args: argparse.Namespace,
+    pipeline_cls: type[BaseCSVPipeline],
+    paths: list[Path],
+    **run_kwargs,
+) -> int:
+    """Recarga blue/green: carga em <tabela>_next e troca atômica com a atual (ver app.etl.swap)."""
+    run_kwargs["mode"] = "copy"
+    table = pipeline_cls.model.__tablename__
+    concurrency = min(args.concurrency, max_concurrency())
+    ddl = await create_next(table)
+    report = await run_files(pipeline_cls, paths, target_table=next_table_for(table), **run_kwargs)
+    _write_metrics(args, report.metrics)
+    if report.failed:
+        await drop_next(table)
+        print(f"Tabela {table} mantida sem alterações.", file=sys.stderr)
+        return _print_report(report)
+    try:
+        built = await build_next(
+            table, ddl, concurrency=concurrency, maintenance_work_mem=args.maintenance_work_mem
         )
-    print("ETL concluído:", stats)
+        swapped = await swap(table, concurrency=concurrency)
+    except Exception as exc:
+        print(f"Erro: {type(exc).__name__}: {exc}", file=sys.stderr)
+        print(f"Tabela {table} mantida sem alterações; carga em {next_table_for(table)}.", file=sys.stderr)
+        return 1
+    for invalid in built.invalid + swapped.invalid:
+        print(f"  FK não validada (continua NOT VALID): {invalid}", file=sys.stderr)
+    for missing in built.missing + swapped.missing:
+        print(f"  FK não criada na tabela particionada (há partições com violações): {missing}", file=sys.stderr)
+    return _print_report(report)
+
+
+async def _run_swap_rollback(args: argparse.Namespace, pipeline_cls: type[BaseCSVPipeline]) -> int:
+    """Volta a versão anterior (<tabela>_old) para o lugar da atual."""
+    table = pipeline_cls.model.__tablename__
+    try:
+        swapped = await swap(table, rollback=True, concurrency=min(args.concurrency, max_concurrency()))
+    except Exception as exc:
+        print(f"Erro: {exc}", file=sys.stderr)
+        return 1
+    for invalid in swapped.invalid:
+        print(f"  FK não validada (continua NOT VALID): {invalid}", file=sys.stderr)
+    for missing in swapped.missing:
+        print(f"  FK não criada na tabela particionada (há partições com violações): {missing}", file=sys.stderr)
+    print(f"Rollback concluído: versão anterior de {table} restaurada (a substituída ficou em {table}_old).")
     return 0
 
 
-async def _cmd_estabelecimentos(args: argparse.Namespace) -> int:
-    path = _resolve_path(args.file)
-    if not path.exists():
-        print(f"Erro: arquivo não encontrado: {path}", file=sys.stderr)
+async def _run_since(
+    args: argparse.Namespace,
+    pipeline_cls: type[BaseCSVPipeline],
+    paths: list[Path],
+    **run_kwargs,
+) -> int:
+    """Modo incremental: diff com a release anterior (--since) e carga só do delta."""
+    # As alteradas já existem na tabela (no modo copy violariam a PK): delta sempre via upsert
+    run_kwargs["mode"] = "upsert"
+    old_paths = _resolve_inputs(args.since, pipeline_cls)
+    if not old_paths or not all(p.exists() for p in old_paths):
+        print(f"Erro: release anterior não encontrada: {args.since}", file=sys.stderr)
         return 1
-    quiet = getattr(args, "quiet", False)
-    debug = getattr(args, "debug", False)
-    _setup_logging(quiet, debug)
-    async with get_async_session() as session:
-        pipeline = EstabelecimentosPipeline(session)
-        if getattr(args, "dry_run", False):
-            with path.open(newline="", encoding=pipeline.encoding) as f:
-                import csv
-                r = csv.DictReader(
-                    f,
-                    delimiter=pipeline.delimiter,
-                    fieldnames=list(pipeline.fieldnames) if pipeline.fieldnames else None,
-                )
-                pipeline._validate_header(list(r.fieldnames or []))
-                for i, row in enumerate(r):
-                    if i >= 1:
-                        break
-                    pipeline.transform_row(row)
-            print("Dry-run OK: CSV válido.")
-            return 0
-        stats = await pipeline.run(
-            path,
-            show_progress=not quiet,
-            debug=debug,
-            auto_commit=getattr(args, "auto_commit", False),
+    with tempfile.TemporaryDirectory(prefix="etl-diff-", dir=args.work_dir) as workdir:
+        diff = await asyncio.to_thread(
+            diff_snapshots, pipeline_cls(None), old_paths, paths, Path(workdir)
+        )
+        print("Diff com a release anterior:", diff.summary)
+        # Rejeitos do delta ficam ao lado da release nova; sem checkpoint (o diff é temporário)
+        report = await run_files(
+            pipeline_cls,
+            [diff.changes_path],
+            rejects_path=rejects_path_for(paths[0]),
+            checkpoint=False,
+            **run_kwargs,
         )
-    print("ETL concluído:", stats)
+        _write_metrics(args, report.metrics)
+        if report.failed:
+            print(f"Erro: {report.failed[0].error}", file=sys.stderr)
+            return 1
+        removals = await apply_removals(pipeline_cls, diff, debug=run_kwargs["debug"])
+    totals = report.totals
+    totals["deleted"] = removals["deleted"]
+    totals["errors"] = totals.get("errors", 0) + removals["errors"]
+    print("ETL concluído:", totals)
     return 0
 
 
-async def _cmd_simples(args: argparse.Namespace) -> int:
-    path = _resolve_path(args.file)
-    if not path.exists():
-        print(f"Erro: arquivo não encontrado: {path}", file=sys.stderr)
+def _valid_writers(writers: int) -> bool:
+    """--writers entre 1 e o pool do banco; senão imprime o erro."""
+    if 1 <= writers <= max_concurrency():
+        return True
+    print(f"Erro: --writers deve estar entre 1 e {max_concurrency()} (pool do banco)", file=sys.stderr)
+    return False
+
+
+def _parse_workers(values: list[str] | None) -> tuple[int, dict[str, int]]:
+    """--workers N e/ou --workers <pipeline>=N (repetível) -> (padrão, por etapa)."""
+    default, per_stage = 1, {}
+    for value in values or []:
+        name, sep, count = value.rpartition("=")
+        if sep and name not in PIPELINES:
+            raise ValueError(f"pipeline desconhecido em --workers: {name}")
+        if not count.isdigit() or int(count) < 1:
+            raise ValueError(f"--workers inválido: {value}")
+        if sep:
+            per_stage[name] = int(count)
+        else:
+            default = int(count)
+    return default, per_stage
+
+
+async def _cmd_all(args: argparse.Namespace) -> int:
+    """Release completa: detecta os arquivos, ordena as etapas pelas FKs e roda as independentes juntas."""
+    directory = _resolve_path(args.release_dir)
+    if not directory.is_dir():
+        print(f"Erro: diretório não encontrado: {args.release_dir}", file=sys.stderr)
         return 1
-    quiet = getattr(args, "quiet", False)
-    debug = getattr(args, "debug", False)
-    _setup_logging(quiet, debug)
-    async with get_async_session() as session:
-        pipeline = SimplesPipeline(session)
-        if getattr(args, "dry_run", False):
-            with path.open(newline="", encoding=pipeline.encoding) as f:
-                import csv
-                r = csv.DictReader(
-                    f,
-                    delimiter=pipeline.delimiter,
-                    fieldnames=list(pipeline.fieldnames) if pipeline.fieldnames else None,
-                )
-                pipeline._validate_header(list(r.fieldnames or []))
-                for i, row in enumerate(r):
-                    if i >= 1:
-                        break
-                    pipeline.transform_row(row)
-            print("Dry-run OK: CSV válido.")
-            return 0
-        stats = await pipeline.run(
-            path,
-            show_progress=not quiet,
-            debug=debug,
-            auto_commit=getattr(args, "auto_commit", False),
+    if not _valid_writers(args.writers):
+        return 1
+    _setup_logging(args.quiet, args.debug)
+    try:
+        workers, stage_workers = _parse_workers(args.workers)
+        stages, unmatched = detect_stages(directory, {name: cls for name, (cls, _, _) in PIPELINES.items()})
+    except ValueError as exc:
+        print(f"Erro: {exc}", file=sys.stderr)
+        return 1
+    if not stages:
+        print(f"Erro: nenhum arquivo da Receita encontrado em: {directory}", file=sys.stderr)
+        return 1
+    for path in unmatched:
+        print(f"  ignorado (nenhum pipeline): {path.name}", file=sys.stderr)
+    for stage in stages:
+        after = f" (após {', '.join(sorted(stage.depends_on))})" if stage.depends_on else ""
+        print(f"  {stage.name}: {len(stage.paths)} arquivo(s){after}")
+
+    report = await run_release(
+        stages,
+        concurrency=args.concurrency,
+        workers=workers,
+        stage_workers=stage_workers,
+        retry_failed=args.retry_failed,
+        debug=args.debug,
+        auto_commit=args.auto_commit,
+        mode=args.mode,
+        resume=args.resume,
+        writers=args.writers,
+    )
+    _write_metrics(args, report.metrics)
+    return _print_release_report(report)
+
+
+def _print_release_report(report: ReleaseReport) -> int:
+    """Resumo da release: uma linha por etapa e os totais; retorna o código de saída."""
+    columns = ("processed", "inserted", "updated", "skipped", "errors", "duplicates")
+    print(f"{'etapa':<18}{'arquivos':>9}{'tempo':>9}" + "".join(f"{c:>11}" for c in columns) + f"{'rejeitos':>10}  status")
+    for result in report.results:
+        totals = result.report.totals if result.report is not None else {}
+        rejects = sum(v for k, v in totals.items() if k.startswith("rejects."))
+        if result.skipped:
+            status = f"não executada ({result.skipped})"
+        elif result.error:
+            status = f"FALHOU ({result.error})"
+        elif result.report.failed:
+            status = f"FALHOU ({len(result.report.failed)} arquivo(s); use --retry-failed)"
+        else:
+            status = "ok"
+        print(
+            f"{result.stage.name:<18}{len(result.stage.paths):>9}{result.seconds:>8.1f}s"
+            + "".join(f"{totals.get(c, 0):>11}" for c in columns)
+            + f"{rejects:>10}  {status}"
         )
-    print("ETL concluído:", stats)
-    return 0
-
-
-def main() -> int:
-    parser = argparse.ArgumentParser(description="ETL CNPJ API")
-    sub = parser.add_subparsers(dest="pipeline", required=True)
-
-    p_paises = sub.add_parser("paises", help="Importar CSV de países")
-    p_paises.add_argument(
-        "file",
-        help="Caminho do CSV (ex.: storage/F.K03200$Z.D60110.PAISCSV). Relativo à raiz do projeto ou absoluto.",
-    )
-    p_paises.add_argument("--dry-run", action="store_true", help="Apenas validar CSV")
-    p_paises.add_argument(
-        "--quiet",
-        "-q",
-        action="store_true",
-        help="Sem barra de progresso nem logging",
-    )
-    p_paises.add_argument(
-        "--debug",
-        action="store_true",
-        help="Exibir erros (traceback) e detalhes de cada operação (inserted/updated/skipped)",
-    )
-    p_paises.add_argument(
-        "--auto-commit",
-        action="store_true",
-        help="Realizar commit a cada 1000 registros processados",
-    )
-    p_paises.set_defaults(func=_cmd_paises)
-
-    p_municipios = sub.add_parser("municipios", help="Importar CSV de municípios")
-    p_municipios.add_argument(
-        "file",
-        help="Caminho do CSV (ex.: storage/F.K03200$Z.D60110.MUNICCSV). Relativo à raiz do projeto ou absoluto.",
-    )
-    p_municipios.add_argument("--dry-run", action="store_true", help="Apenas validar CSV")
-    p_municipios.add_argument(
-        "--quiet",
-        "-q",
-        action="store_true",
-        help="Sem barra de progresso nem logging",
-    )
-    p_municipios.add_argument(
-        "--debug",
-        action="store_true",
-        help="Exibir erros (traceback) e detalhes de cada operação (inserted/updated/skipped)",
-    )
-    p_municipios.add_argument(
-        "--auto-commit",
-        action="store_true",
-        help="Realizar commit a cada 1000 registros processados",
-    )
-    p_municipios.set_defaults(func=_cmd_municipios)
-
-    p_qualificacoes = sub.add_parser("qualificacoes", help="Importar CSV de qualificações (sócios)")
-    p_qualificacoes.add_argument(
-        "file",
-        help="Caminho do CSV (ex.: storage/F.K03200$Z.D60110.QUALSCSV). Relativo à raiz do projeto ou absoluto.",
-    )
-    p_qualificacoes.add_argument("--dry-run", action="store_true", help="Apenas validar CSV")
-    p_qualificacoes.add_argument(
-        "--quiet",
-        "-q",
-        action="store_true",
-        help="Sem barra de progresso nem logging",
-    )
-    p_qualificacoes.add_argument(
-        "--debug",
-        action="store_true",
-        help="Exibir erros (traceback) e detalhes de cada operação (inserted/updated/skipped)",
-    )
-    p_qualificacoes.add_argument(
-        "--auto-commit",
-        action="store_true",
-        help="Realizar commit a cada 1000 registros processados",
-    )
-    p_qualificacoes.set_defaults(func=_cmd_qualificacoes)
-
-    p_naturezas = sub.add_parser("naturezas", help="Importar CSV de naturezas jurídicas")
-    p_naturezas.add_argument(
-        "file",
-        help="Caminho do CSV (ex.: storage/F.K03200$Z.D60110.NATJUCSV). Relativo à raiz do projeto ou absoluto.",
-    )
-    p_naturezas.add_argument("--dry-run", action="store_true", help="Apenas validar CSV")
-    p_naturezas.add_argument(
-        "--quiet",
-        "-q",
+        if result.report is not None:
+            for failed in result.report.failed:
+                print(f"    {failed.path.name}: {failed.error}", file=sys.stderr)
+    print(f"ETL da release {'com falhas' if report.failed else 'concluído'} em {report.seconds:.1f}s:", report.totals)
+    return 1 if report.failed else 0
+
+
+def _add_release_parser(sub: argparse._SubParsersAction) -> None:
+    p = sub.add_parser(
+        "all",
+        help="Importar uma release completa (todas as tabelas, na ordem das FKs)",
+        description=(
+            "Detecta os arquivos da Receita no diretório pelo nome, monta a ordem das cargas pelas FKs "
+            "dos modelos e roda ao mesmo tempo as etapas independentes."
+        ),
+    )
+    p.add_argument("release_dir", help="Diretório com os arquivos (CSV ou .zip) de uma release")
+    p.add_argument("--quiet", "-q", action="store_true", help="Sem logging")
+    p.add_argument("--debug", action="store_true", help="Exibir erros (traceback) e detalhes de cada operação")
+    p.add_argument("--auto-commit", action="store_true", help="Realizar commit a cada 1000 registros processados")
+    p.add_argument("--mode", choices=LOAD_MODES, default="orm", help="Modo de carga de todas as etapas")
+    p.add_argument(
+        "--workers",
+        action="append",
+        metavar="N|PIPELINE=N",
+        help=(
+            "Processos de leitura por arquivo: N para todas as etapas e/ou PIPELINE=N para uma "
+            "(repetível; ex.: --workers 2 --workers estabelecimentos=8)"
+        ),
+    )
+    p.add_argument(
+        "--writers",
+        type=int,
+        default=1,
+        help=(
+            "Conexões gravando os lotes de cada arquivo ao mesmo tempo, com os registros separados "
+            f"pela chave (cada arquivo usa N do pool do banco: {max_concurrency()})"
+        ),
+    )
+    p.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help=(
+            "Arquivos importados ao mesmo tempo em cada etapa; as conexões de todas as etapas "
+            f"somadas são limitadas ao pool do banco ({max_concurrency()})"
+        ),
+    )
+    p.add_argument(
+        "--retry-failed",
         action="store_true",
-        help="Sem barra de progresso nem logging",
+        help="Processar só os arquivos que não concluíram com sucesso na última execução",
     )
-    p_naturezas.add_argument(
-        "--debug",
+    p.add_argument(
+        "--resume",
         action="store_true",
-        help="Exibir erros (traceback) e detalhes de cada operação (inserted/updated/skipped)",
-    )
-    p_naturezas.add_argument(
-        "--auto-commit",
-        action="store_true",
-        help="Realizar commit a cada 1000 registros processados",
-    )
-    p_naturezas.set_defaults(func=_cmd_naturezas)
-
-    p_motivos = sub.add_parser("motivos", help="Importar CSV de motivos (situação cadastral)")
-    p_motivos.add_argument(
+        help="Retomar cada arquivo a partir do último checkpoint (use com --auto-commit)",
+    )
+    p.add_argument(
+        "--metrics-json",
+        metavar="ARQUIVO",
+        help="Gravar o relatório da execução em JSON (tempo por etapa, vazão, latência dos lotes, memória)",
+    )
+    p.add_argument(
+        "--metrics-prom",
+        metavar="ARQUIVO",
+        help=(
+            "Gravar as métricas da execução como textfile do Prometheus (ex.: no diretório do "
+            "--collector.textfile.directory do node_exporter, com extensão .prom)"
+        ),
+    )
+    p.set_defaults(func=_cmd_all)
+
+
+def _add_pipeline_parser(
+    sub: argparse._SubParsersAction,
+    name: str,
+    pipeline_cls: type[BaseCSVPipeline],
+    help_text: str,
+    example: str,
+) -> None:
+    p = sub.add_parser(name, help=help_text)
+    p.add_argument(
         "file",
-        help="Caminho do CSV (ex.: storage/F.K03200$Z.D60110.MOTICSV). Relativo à raiz do projeto ou absoluto.",
-    )
-    p_motivos.add_argument("--dry-run", action="store_true", help="Apenas validar CSV")
-    p_motivos.add_argument(
+        nargs="?",
+        help=(
+            f"Caminho do CSV (ex.: {example}) ou do .zip da Receita, um diretório com os arquivos "
+            "ou um glob (ex.: 'storage/*ESTABELE*'). Relativo à raiz do projeto ou absoluto."
+        ),
+    )
+    p.add_argument("--dry-run", action="store_true", help="Apenas validar CSV")
+    p.add_argument(
         "--quiet",
         "-q",
         action="store_true",
         help="Sem barra de progresso nem logging",
     )
-    p_motivos.add_argument(
+    p.add_argument(
         "--debug",
         action="store_true",
         help="Exibir erros (traceback) e detalhes de cada operação (inserted/updated/skipped)",
     )
-    p_motivos.add_argument(
+    p.add_argument(
         "--auto-commit",
         action="store_true",
         help="Realizar commit a cada 1000 registros processados",
     )
-    p_motivos.set_defaults(func=_cmd_motivos)
-
-    p_cnaes = sub.add_parser("cnaes", help="Importar CSV de CNAEs (atividades econômicas)")
-    p_cnaes.add_argument(
-        "file",
-        help="Caminho do CSV (ex.: storage/F.K03200$Z.D60110.CNAECSV). Relativo à raiz do projeto ou absoluto.",
-    )
-    p_cnaes.add_argument("--dry-run", action="store_true", help="Apenas validar CSV")
-    p_cnaes.add_argument(
-        "--quiet",
-        "-q",
+    p.add_argument(
+        "--mode",
+        choices=LOAD_MODES,
+        default="orm",
+        help=(
+            "Modo de carga: orm (insert/update por registro), copy (COPY em lote, carga inicial) "
+            "ou upsert (COPY para staging + INSERT ... ON CONFLICT por lote)"
+        ),
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processos para leitura/transformação em paralelo (faixas de bytes do arquivo)",
+    )
+    p.add_argument(
+        "--writers",
+        type=int,
+        default=1,
+        help=(
+            "Conexões gravando os lotes de cada arquivo ao mesmo tempo, com os registros separados "
+            f"pela chave (cada arquivo usa N do pool do banco: {max_concurrency()})"
+        ),
+    )
+    p.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help=(
+            "Arquivos importados ao mesmo tempo, cada um com sua conexão "
+            f"(limitado ao pool do banco: {max_concurrency()})"
+        ),
+    )
+    p.add_argument(
+        "--retry-failed",
         action="store_true",
-        help="Sem barra de progresso nem logging",
+        help="Com vários arquivos, processar só os que não concluíram com sucesso na última execução",
     )
-    p_cnaes.add_argument(
-        "--debug",
+    p.add_argument(
+        "--replay-rejects",
         action="store_true",
-        help="Exibir erros (traceback) e detalhes de cada operação (inserted/updated/skipped)",
+        help=(
+            "Reprocessar só as linhas rejeitadas na última execução (<arquivo>.rejects.csv.gz), "
+            "por exemplo após corrigir os dados de domínio"
+        ),
     )
-    p_cnaes.add_argument(
-        "--auto-commit",
+    p.add_argument(
+        "--resume",
         action="store_true",
-        help="Realizar commit a cada 1000 registros processados",
-    )
-    p_cnaes.set_defaults(func=_cmd_cnaes)
-
-    p_empresas = sub.add_parser("empresas", help="Importar CSV de empresas (EMPRECSV)")
-    p_empresas.add_argument(
-        "file",
-        help="Caminho do CSV (ex.: K3241.K03200Y0.D60110.EMPRECSV). Relativo à raiz do projeto ou absoluto.",
+        help=(
+            "Retomar a importação interrompida a partir do último checkpoint confirmado "
+            "(etl_checkpoints; use com --auto-commit); arquivos já concluídos são pulados"
+        ),
     )
-    p_empresas.add_argument("--dry-run", action="store_true", help="Apenas validar CSV")
-    p_empresas.add_argument(
-        "--quiet",
-        "-q",
+    p.add_argument(
+        "--fast-full-load",
         action="store_true",
-        help="Sem barra de progresso nem logging",
+        help=(
+            "Recarga completa: esvazia a tabela, remove PK, índices e FKs, carrega via COPY "
+            "e os recria em paralelo no fim (FKs como NOT VALID + VALIDATE CONSTRAINT)"
+        ),
     )
-    p_empresas.add_argument(
-        "--debug",
+    p.add_argument(
+        "--swap",
         action="store_true",
-        help="Exibir erros (traceback) e detalhes de cada operação (inserted/updated/skipped)",
+        help=(
+            "Recarga blue/green: carrega via COPY em <tabela>_next (UNLOGGED), cria índices e FKs, "
+            "SET LOGGED e ANALYZE, e troca com a atual numa transação curta; a anterior fica em <tabela>_old"
+        ),
     )
-    p_empresas.add_argument(
-        "--auto-commit",
+    p.add_argument(
+        "--swap-rollback",
         action="store_true",
-        help="Realizar commit a cada 1000 registros processados",
-    )
-    p_empresas.set_defaults(func=_cmd_empresas)
+        help="Desfazer a última recarga --swap (troca <tabela>_old com a atual); dispensa o arquivo",
+    )
+    p.add_argument(
+        "--maintenance-work-mem",
+        default=MAINTENANCE_WORK_MEM,
+        help=f"maintenance_work_mem das conexões que recriam índices/constraints (padrão: {MAINTENANCE_WORK_MEM})",
+    )
+    p.add_argument(
+        "--since",
+        metavar="RELEASE_ANTERIOR",
+        help=(
+            "Modo incremental: arquivo(s) da release anterior (arquivo, .zip, diretório ou glob); "
+            "compara com a nova, carrega só as linhas inseridas/alteradas (sempre no modo upsert) "
+            "e remove as chaves que saíram"
+        ),
+    )
+    p.add_argument(
+        "--work-dir",
+        help="Diretório para os arquivos temporários do --since (padrão: diretório temporário do sistema)",
+    )
+    p.add_argument(
+        "--metrics-json",
+        metavar="ARQUIVO",
+        help="Gravar o relatório da execução em JSON (tempo por etapa, vazão, latência dos lotes, memória)",
+    )
+    p.add_argument(
+        "--metrics-prom",
+        metavar="ARQUIVO",
+        help=(
+            "Gravar as métricas da execução como textfile do Prometheus (ex.: no diretório do "
+            "--collector.textfile.directory do node_exporter, com extensão .prom)"
+        ),
+    )
+    p.set_defaults(func=_cmd_pipeline, pipeline_cls=pipeline_cls)
 
-    p_estabelecimentos = sub.add_parser(
-        "estabelecimentos", help="Importar CSV de estabelecimentos (ESTABELE)"
-    )
-    p_estabelecimentos.add_argument(
-        "file",
-        help="Caminho do CSV (ex.: storage/K3241.K03200Y0.D60110.ESTABELE). Relativo à raiz do projeto ou absoluto.",
-    )
-    p_estabelecimentos.add_argument("--dry-run", action="store_true", help="Apenas validar CSV")
-    p_estabelecimentos.add_argument(
-        "--quiet",
-        "-q",
-        action="store_true",
-        help="Sem barra de progresso nem logging",
-    )
-    p_estabelecimentos.add_argument(
-        "--debug",
-        action="store_true",
-        help="Exibir erros (traceback) e detalhes de cada operação (inserted/updated/skipped)",
-    )
-    p_estabelecimentos.add_argument(
-        "--auto-commit",
-        action="store_true",
-        help="Realizar commit a cada 1000 registros processados",
-    )
-    p_estabelecimentos.set_defaults(func=_cmd_estabelecimentos)
 
-    p_simples = sub.add_parser("simples", help="Importar CSV de Simples Nacional (SIMPLES.CSV)")
-    p_simples.add_argument(
-        "file",
-        help="Caminho do CSV (ex.: storage/K3241.K03200Y0.D60110.SIMPLES.CSV). Relativo à raiz do projeto ou absoluto.",
-    )
-    p_simples.add_argument("--dry-run", action="store_true", help="Apenas validar CSV")
-    p_simples.add_argument(
-        "--quiet",
-        "-q",
-        action="store_true",
-        help="Sem barra de progresso nem logging",
-    )
-    p_simples.add_argument(
-        "--debug",
-        action="store_true",
-        help="Exibir erros (traceback) e detalhes de cada operação (inserted/updated/skipped)",
-    )
-    p_simples.add_argument(
-        "--auto-commit",
-        action="store_true",
-        help="Realizar commit a cada 1000 registros processados",
-    )
-    p_simples.set_defaults(func=_cmd_simples)
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ETL CNPJ API")
+    sub = parser.add_subparsers(dest="pipeline", required=True)
+    for name, (pipeline_cls, help_text, example) in PIPELINES.items():
+        _add_pipeline_parser(sub, name, pipeline_cls, help_text, example)
+    _add_release_parser(sub)
 
     args = parser.parse_args()
     return asyncio.run(args.func(args))
@@ -2,22 +2,113 @@
 Base para pipelines ETL: leitura de CSV, validação e carga em lote.
 
 Cada entidade (paises, cnae, etc.) pode ter um pipeline que:
-- Define o caminho/stream do CSV e o schema de validação
-- Usa transform_row e _persist_one (via repository) para mapear CSV -> modelos
+- Define o modelo, os arquivos da Receita (file_patterns) e as colunas (column_specs, ver
+  app.etl.columns), convertidas em tuplas na ordem de columns
+- Usa fetch_existing e save_batch (via repository) para persistir os modelos no modo "orm"
 - Herda batch_size para controle de memória
+
+Modos de carga (mode de run, ver LOAD_MODES):
+- "orm": lotes de batch_size modelos; uma consulta de existência e um flush por lote
+- "copy": lotes de copy_batch_size via COPY; só insere (carga inicial em tabela vazia)
+- "upsert": COPY para staging + INSERT ... ON CONFLICT DO UPDATE por lote (ver app.etl.bulk)
+
+Quarentena, checkpoints (--resume), leitura paralela, writers e métricas estão descritos no
+README do ETL (app/etl/README.md).
 """
+import asyncio
 import csv
+import hashlib
 import logging
+import os
+import threading
+import time
 from abc import ABC, abstractmethod
-from collections.abc import Sequence
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, Sequence
+from contextlib import AsyncExitStack, aclosing, closing
+from dataclasses import dataclass, field
+from functools import cached_property
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
 from typing import Any
 
+from sqlalchemy import any_, delete, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from tqdm import tqdm
 
+from app.etl.bulk import ROW_HASH_COLUMN, build_upsert, copy_records, upsert_records
+from app.etl.codes import load_code_sets
+from app.etl.columns import ColumnSpec, compile_converter, rejection_reason, render_fields
+from app.etl.metrics import RunMetrics, current_metrics
+from app.etl.partitions import HashPartitions, hash_partitions
+from app.etl.readers.archive import OffsetLines, is_zip, open_input
+from app.etl.rejects import RejectWriter, iter_rejected_rows, open_rejects, rejects_path_for
+from app.etl.readers.parallel import iter_parallel_ranges
+from app.etl.session import get_async_session
+from app.repositories import EtlCheckpointRepository
+
 logger = logging.getLogger(__name__)
 
+LOAD_MODES = ("orm", "copy", "upsert")
+
+# Ponto do arquivo logo após um registro: (offset em bytes, número da linha)
+Position = tuple[int, int]
+
+# Linhas lidas e convertidas por vez em _convert_chunks (granularidade dos timers de etapa)
+_BLOCK_ROWS = 1_000
+
+# Lotes na fila de cada writer com writers > 1 (ver BaseCSVPipeline._fan_out_chunks)
+WRITER_QUEUE_DEPTH = 2
+
+
+@dataclass
+class _Chunk:
+    """Bloco convertido pela thread de leitura (ver BaseCSVPipeline._convert_chunks)."""
+
+    records: list[Any] = field(default_factory=list)
+    position: Position | None = None
+    # (número da linha, motivo, campos) das linhas descartadas no bloco
+    rejects: list[tuple[int | None, str, list[str]]] = field(default_factory=list)
+    errors: int = 0
+    timings: dict[str, float] = field(default_factory=lambda: dict.fromkeys(("read", "parse", "transform"), 0.0))
+
+
+def compute_row_hash(values: Iterable[Any]) -> int:
+    """Hash de 64 bits (blake2b, BIGINT) dos valores normalizados do registro; estável entre processos."""
+    normalized = "\x1f".join(
+        "\x00" if v is None else ",".join(v) if type(v) is list else str(v) for v in values
+    )
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _db_reason(exc: Exception) -> str:
+    """Código de motivo de um registro recusado pelo banco: db_<SQLSTATE> (ex.: db_23503)."""
+    code = getattr(exc, "sqlstate", None) or getattr(getattr(exc, "orig", None), "sqlstate", None)
+    return f"db_{code}" if code else f"db_{type(exc).__name__}"
+
+
+def _track_bytes(
+    rows: Iterable[Any],
+    position: Callable[[], int],
+    progress: tqdm,
+    every: int = 10_000,
+) -> Iterator[Any]:
+    """Repassa as linhas atualizando a barra de progresso (em bytes) a cada `every` linhas."""
+    last = progress.n
+    try:
+        for i, row in enumerate(rows, start=1):
+            yield row
+            if i % every == 0:
+                current = position()
+                elapsed = progress.format_dict["elapsed"] or 1e-9
+                progress.set_postfix_str(f"{i} linhas, {i / elapsed:.0f} linhas/s", refresh=False)
+                progress.update(current - last)
+                last = current
+        progress.update(max(progress.total - last, 0))
+    finally:
+        progress.close()
+
 
 class BaseCSVPipeline(ABC):
     """Pipeline ETL genérico para importação de CSV."""
@@ -28,11 +119,47 @@ class BaseCSVPipeline(ABC):
     # Se definido, o CSV não tem cabeçalho e essas serão os nomes das colunas (por ordem)
     fieldnames: Sequence[str] | None = None
 
+    # Colunas do modelo e sua posição/conversão no CSV (todas, exceto row_hash)
+    column_specs: Sequence[ColumnSpec] = ()
+
     # Encoding do arquivo (arquivos da Receita Federal costumam ser Latin-1)
     encoding: str = "utf-8-sig"
 
+    # Modelo SQLAlchemy da entidade (tabela e colunas usadas nas cargas em lote)
+    model: type | None = None
+
+    # Padrões (glob) dos nomes de arquivo da Receita para esta entidade, usados ao
+    # receber um diretório como entrada (ex.: Estabelecimentos0..9 -> "*ESTABELE*")
+    file_patterns: Sequence[str] = ()
+
+    # Registros por lote nos modos "copy" e "upsert"
+    copy_batch_size: int = 50_000
+
+    # Tamanho aproximado (bytes) de cada faixa do arquivo lida por um worker (workers > 1)
+    parallel_chunk_bytes: int = 32 * 1024 * 1024
+
+    # Lotes convertidos que a thread de leitura pode deixar à frente da escrita (workers = 1);
+    # 0 converte cada lote na sua vez, sem thread
+    queue_depth: int = 2
+
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
+        self._rejects: RejectWriter | None = None
+        # Checkpoint da carga em andamento (ver run): chave (source), identidade do arquivo,
+        # último ponto carregado e se já há checkpoint confirmado no banco
+        self._source: str | None = None
+        self._identity: dict[str, int] = {}
+        self._position: Position = (0, 0)
+        self._checkpointed = False
+        # Tabela que recebe o COPY (outra que não a do modelo na recarga blue/green)
+        self._target: str | None = None
+        # Partições da tabela de destino do COPY, se particionada por HASH (ver app.etl.partitions)
+        self._partitions: HashPartitions | None = None
+        # Códigos válidos das colunas com FK para tabelas de domínio (ver app.etl.codes):
+        # (posição no registro, coluna, códigos), carregados no início de run
+        self._code_checks: list[tuple[int, str, frozenset[str]]] = []
+        # Tempo por etapa, vazão e latência dos lotes da última run (ver app.etl.metrics)
+        self.metrics: RunMetrics | None = None
 
     async def run(
         self,
@@ -42,82 +169,778 @@ class BaseCSVPipeline(ABC):
         debug: bool = False,
         auto_commit: bool = False,
         auto_commit_batch_size: int = 1000,
+        mode: str = "orm",
+        workers: int = 1,
+        writers: int = 1,
+        replay_rejects: bool = False,
+        rejects_path: Path | None = None,
+        resume: bool = False,
+        checkpoint: bool = True,
+        target_table: str | None = None,
     ) -> dict[str, int]:
         """
-        Executa ETL: extrai do CSV, transforma e persiste um registro por vez (insert/update).
-        Retorna estatísticas (processed, inserted, updated, errors).
-        Se show_progress=True, exibe barra de progresso.
-        Se debug=True, exibe erros (traceback) e detalhes de cada operação (inserted/updated/skipped).
-        Se auto_commit=True, realiza commit a cada auto_commit_batch_size registros processados.
+        Executa ETL: extrai do CSV (ou .zip), transforma e persiste em lotes no modo pedido.
+        Retorna estatísticas (processed, inserted, updated, skipped, errors, duplicates, rejects.<motivo>).
+        Se show_progress=True, exibe barra de progresso (em bytes).
+        Se debug=True, exibe erros (traceback) e detalhes de cada lote.
+        Se auto_commit=True, faz commit (com checkpoint) a cada auto_commit_batch_size registros.
+        workers > 1 converte em processos paralelos; writers > 1 grava por várias conexões.
+        replay_rejects reprocessa a quarentena; resume continua do checkpoint do arquivo.
+        target_table carrega (modo "copy") em outra tabela de mesmas colunas (ver app.etl.swap).
         """
         path = Path(path)
         if not path.exists():
             raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+        if mode not in LOAD_MODES:
+            raise ValueError(f"Modo de carga inválido: {mode!r} (use um de {LOAD_MODES})")
+        if self.model is None:
+            raise ValueError(f"{type(self).__name__} não define model")
+        if writers < 1:
+            raise ValueError(f"writers deve ser >= 1 (recebido {writers})")
+        if target_table is not None and mode != "copy":
+            raise ValueError(f"target_table só se aplica ao modo 'copy' (recebido {mode!r})")
+        self._target = target_table
+        self._partitions = await hash_partitions(self.session, self.target_table) if mode == "copy" else None
+        self._code_checks = [
+            (self._hashed_columns.index(column), column, codes)
+            for column, codes in (await load_code_sets(self.session, self.model)).items()
+        ]
+        for _, column, codes in self._code_checks:
+            if not codes:
+                logger.warning(
+                    "%s: tabela de domínio vazia; todas as linhas com %s serão rejeitadas", path.name, column
+                )
+
+        stats: dict[str, int] = {
+            "processed": 0,
+            "inserted": 0,
+            "updated": 0,
+            "skipped": 0,
+            "errors": 0,
+            "duplicates": 0,
+        }
+        load = dict(
+            mode=mode,
+            debug=debug,
+            auto_commit=auto_commit,
+            auto_commit_batch_size=auto_commit_batch_size,
+            writers=writers,
+        )
 
-        stats: dict[str, int] = {"processed": 0, "inserted": 0, "updated": 0, "skipped": 0, "errors": 0}
-        line_num = 0
+        rejects_path = rejects_path or rejects_path_for(path)
+        if replay_rejects:
+            if not rejects_path.exists():
+                logger.info("%s: nenhum rejeito para reprocessar (%s)", path.name, rejects_path.name)
+                return stats
+            workers = 1
+        if workers > 1 and is_zip(path):
+            logger.warning("%s: leitura paralela não se aplica a .zip; usando um único processo", path.name)
+            workers = 1
 
-        with path.open(newline="", encoding=self.encoding) as f:
-            reader = csv.DictReader(
-                f,
-                delimiter=self.delimiter,
-                fieldnames=list(self.fieldnames) if self.fieldnames else None,
+        self._rejects = RejectWriter(rejects_path, encoding=self.encoding, delimiter=self.delimiter)
+        self._source = None
+        self._position = (0, 0)
+        self._checkpointed = False
+        start: Position | None = None
+        if checkpoint and not replay_rejects:
+            self._source = str(path.resolve())
+            st = path.stat()
+            self._identity = {"file_size": st.st_size, "file_mtime_ns": st.st_mtime_ns}
+            if resume:
+                saved = await EtlCheckpointRepository(self.session).get(self.target_table, self._source)
+                if saved is None:
+                    logger.info("%s: sem checkpoint; importando desde o início", path.name)
+                elif (saved.file_size, saved.file_mtime_ns) != (st.st_size, st.st_mtime_ns):
+                    logger.warning("%s: arquivo mudou desde o checkpoint; importando desde o início", path.name)
+                elif saved.status == "done":
+                    logger.info("%s: importação já concluída (checkpoint de %s)", path.name, saved.updated_at)
+                    return dict(saved.stats)
+                elif not self._rejects.resume(saved.rejects):
+                    # As linhas rejeitadas antes do checkpoint não seriam relidas: seriam perdidas
+                    logger.warning(
+                        "%s: rejeitos do checkpoint não encontrados (%s.new); importando desde o início",
+                        path.name,
+                        rejects_path.name,
+                    )
+                else:
+                    start = self._position = (saved.byte_offset, saved.line_number)
+                    stats.update(saved.stats)
+                    self._checkpointed = True
+                    logger.info("%s: retomando após a linha %d (byte %d)", path.name, start[1], start[0])
+
+        self.metrics = RunMetrics(self.target_table, str(path), mode, workers, start=start or (0, 0))
+        token = current_metrics.set(self.metrics)
+        try:
+            if workers > 1:
+                await self._run_parallel(
+                    path, stats, workers=workers, start=start, show_progress=show_progress, **load
+                )
+            else:
+                await self._run_serial(
+                    path,
+                    stats,
+                    replay_from=rejects_path if replay_rejects else None,
+                    start=start,
+                    show_progress=show_progress,
+                    **load,
+                )
+        except BaseException:
+            if self._checkpointed:
+                # Mantém os rejeitos até o checkpoint para um --resume
+                self._rejects.suspend()
+            else:
+                self._rejects.discard()
+            self.metrics.finish(stats, ok=False)
+            raise
+        finally:
+            current_metrics.reset(token)
+        self._rejects.commit()
+        self.metrics.finish(stats, ok=True)
+        logger.info("%s: %s", path.name, self.metrics.summary())
+        if self._rejects.count:
+            logger.info("%s: %d linha(s) rejeitada(s) em %s", path.name, self._rejects.count, rejects_path.name)
+        return stats
+
+    async def _run_parallel(
+        self,
+        path: Path,
+        stats: dict[str, int],
+        *,
+        workers: int,
+        start: Position | None,
+        show_progress: bool,
+        **load: Any,
+    ) -> None:
+        progress = None
+        if show_progress:
+            progress = tqdm(
+                total=path.stat().st_size,
+                initial=start[0] if start else 0,
+                unit="B",
+                unit_scale=True,
+                desc="ETL",
+                leave=True,
             )
-            self._validate_header(reader.fieldnames or [])
+        chunks = self._parallel_chunks(
+            path, stats, workers=workers, start=start, mode=load["mode"], progress=progress
+        )
+        try:
+            async with aclosing(chunks) as chunks:
+                await self._load_chunks(chunks, stats, **load)
+        finally:
+            if progress is not None:
+                progress.close()
+
+    async def _run_serial(
+        self,
+        path: Path,
+        stats: dict[str, int],
+        *,
+        replay_from: Path | None,
+        start: Position | None,
+        show_progress: bool,
+        **load: Any,
+    ) -> None:
+        """Lê o arquivo (ou o de rejeitos, em replay_from) no próprio processo, a partir de start."""
+        if replay_from is not None:
+            opened = open_rejects(replay_from, self.encoding)
+        else:
+            opened = open_input(path, self.encoding, self.file_patterns)
+        with opened as source:
+            lines: OffsetLines | None = None
+            if replay_from is not None:
+                rows = iter_rejected_rows(csv.reader(source.text, delimiter=self.delimiter))
+            else:
+                # Linhas lidas do fluxo binário, para saber o offset de cada registro (checkpoint)
+                lines = OffsetLines(source.binary, self.encoding)
+                reader = csv.reader(lines, delimiter=self.delimiter)
+                self._validate_header(self.fieldnames or next(reader, []))
+                line_base = 0
+                if start is not None:
+                    source.binary.seek(start[0])
+                    lines.offset, line_base = start
+                    reader = csv.reader(lines, delimiter=self.delimiter)
+                rows = ((line_base + reader.line_num, row) for row in reader if row)
 
-            rows = iter(reader)
             if show_progress:
-                total = self._count_lines(path)
-                rows = tqdm(
+                # Progresso pela posição em bytes do arquivo (comprimidos, no .zip), sem pré-contagem de linhas
+                initial = start[0] if start and not source.compressed else 0
+                rows = _track_bytes(
                     rows,
-                    total=total,
-                    unit=" linhas",
-                    unit_scale=False,
-                    desc="ETL",
-                    leave=True,
+                    source.position,
+                    tqdm(total=source.size, initial=initial, unit="B", unit_scale=True, desc="ETL", leave=True),
                 )
 
-            for row in rows:
-                line_num += 1
+            chunks = self._convert_chunks(rows, lines=lines, mode=load["mode"], debug=load["debug"])
+            if self._use_reader_thread():
+                pipelined = self._threaded_chunks(chunks, stats)
+            else:
+                pipelined = self._inline_chunks(chunks, stats)
+            async with aclosing(pipelined) as pipelined:
+                await self._load_chunks(pipelined, stats, **load)
+
+    def _batch_limit(self, mode: str) -> int:
+        """Tamanho do lote: batch_size modelos no modo "orm", copy_batch_size tuplas nos demais."""
+        return self.batch_size if mode == "orm" else self.copy_batch_size
+
+    def _convert_chunks(
+        self,
+        rows: Iterable[tuple[int | None, list[str]]],
+        *,
+        lines: OffsetLines | None,
+        mode: str,
+        debug: bool,
+    ) -> Iterator[_Chunk]:
+        """Converte as linhas em blocos do tamanho do lote, com a posição final e os rejeitos de cada um."""
+        size = self._batch_limit(mode)
+        convert = self._convert
+        clock = time.perf_counter
+        rows = iter(rows)
+        chunk = _Chunk()
+        line_num = None
+        while True:
+            started = clock()
+            read = lines.seconds if lines is not None else 0.0
+            block = list(islice(rows, _BLOCK_ROWS))
+            pulled = clock()
+            read = lines.seconds - read if lines is not None else 0.0
+            records, rejects = chunk.records, chunk.rejects
+            for line_num, row in block:
                 try:
-                    model = self.transform_row(row)
-                    if model is not None:
-                        result = await self._persist_one(model)
-                        stats["processed"] += 1
-                        if result == "inserted":
-                            stats["inserted"] += 1
-                        elif result == "updated":
-                            stats["updated"] += 1
-                        elif result == "skipped":
-                            stats["skipped"] += 1
-                        if auto_commit and stats["processed"] % auto_commit_batch_size == 0:
-                            await self.session.commit()
-                        if debug:
-                            codigo = getattr(model, "codigo", None)
-                            logger.debug(
-                                "linha %d: %s codigo=%s descricao=%s",
-                                line_num,
-                                result,
-                                codigo,
-                                getattr(model, "descricao", "")[:50],
-                            )
+                    record = convert(row)
                 except Exception:
-                    stats["errors"] += 1
+                    chunk.errors += 1
                     if debug:
-                        logger.exception("linha %d: erro ao processar row=%s", line_num, row)
-                    self.on_row_error(row)
-                    # Rollback para que a próxima linha rode em transação limpa (evita InFailedSqlTransaction)
-                    await self.session.rollback()
+                        logger.exception("linha %s: erro ao processar row=%s", line_num, row)
+                    rejects.append((line_num, self._error_reason(row), row))
+                    continue
+                if record is None:
+                    rejects.append((line_num, self._rejection_reason(row), row))
+                    continue
+                records.append(record)
+            timings = chunk.timings
+            timings["read"] += read
+            timings["parse"] += pulled - started - read
+            timings["transform"] += clock() - pulled
+            if not block or len(records) >= size or len(rejects) >= size:
+                chunk.position = (lines.offset, line_num) if lines is not None else None
+                yield chunk
+                chunk = _Chunk()
+            if not block:
+                return
 
-        return stats
+    def _apply_chunk(self, chunk: _Chunk, stats: dict[str, int]) -> tuple[list[Any], Position | None]:
+        """Soma tempos, rejeitos e erros de um bloco convertido; retorna (registros, posição)."""
+        for stage, seconds in chunk.timings.items():
+            self.metrics.add(stage, seconds)
+        for line_num, reason, row in chunk.rejects:
+            self._reject(stats, line_num, reason, row)
+        stats["errors"] += chunk.errors
+        return chunk.records, chunk.position
+
+    async def _inline_chunks(
+        self,
+        chunks: Iterator[_Chunk],
+        stats: dict[str, int],
+    ) -> AsyncIterator[tuple[list[Any], Position | None]]:
+        """Sem thread de leitura (ver _use_reader_thread): cada bloco é convertido na sua vez."""
+        with closing(chunks):
+            for chunk in chunks:
+                yield self._apply_chunk(chunk, stats)
+
+    def _use_reader_thread(self) -> bool:
+        """Thread de leitura só com mais de uma CPU (com uma, disputa o processador com a escrita)."""
+        return self.queue_depth > 0 and (os.cpu_count() or 1) > 1
+
+    async def _threaded_chunks(
+        self,
+        chunks: Iterator[_Chunk],
+        stats: dict[str, int],
+    ) -> AsyncIterator[tuple[list[Any], Position | None]]:
+        """
+        Blocos convertidos numa thread à frente da escrita (fila de queue_depth blocos).
+        Use com contextlib.aclosing: ao fechar, a thread é parada e aguardada.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[_Chunk | BaseException | None] = asyncio.Queue(maxsize=self.queue_depth)
+        stop = threading.Event()
+        metrics = self.metrics
+
+        def put(item: _Chunk | BaseException | None) -> None:
+            waited = time.perf_counter()
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+            metrics.add("reader_wait", time.perf_counter() - waited)
+
+        def produce() -> None:
+            with closing(chunks):
+                try:
+                    for chunk in chunks:
+                        if stop.is_set():
+                            return
+                        put(chunk)
+                except BaseException as exc:
+                    put(exc)
+                    return
+            put(None)
+
+        producer = asyncio.ensure_future(asyncio.to_thread(produce))
+        try:
+            while True:
+                waited = time.perf_counter()
+                item = await queue.get()
+                metrics.add("queue_wait", time.perf_counter() - waited)
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                # Rejeitos aplicados na saída da fila: o checkpoint inclui só os de antes da posição
+                yield self._apply_chunk(item, stats)
+        finally:
+            # Esvazia a fila até a thread notar o stop (ela pode estar presa num put)
+            stop.set()
+            while not producer.done():
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.wait({producer}, timeout=0.05)
+
+    async def _parallel_chunks(
+        self,
+        path: Path,
+        stats: dict[str, int],
+        *,
+        workers: int,
+        start: Position | None,
+        mode: str,
+        progress: tqdm | None,
+    ) -> AsyncIterator[tuple[list[Any], Position]]:
+        """Blocos convertidos em processos (ver app.etl.readers.parallel), na ordem do arquivo."""
+        # Números de linha das faixas são locais: soma as linhas das faixas anteriores
+        if start is not None:
+            offset, line_base = start
+        else:
+            offset, line_base = 0, 0 if self.fieldnames else 1
+        batch_size = self._batch_limit(mode)
+        ranges = iter_parallel_ranges(self, path, workers=workers, batch_size=batch_size, start=offset)
+        async with aclosing(ranges) as results:
+            while True:
+                waited = time.perf_counter()
+                result = await anext(results, None)
+                self.metrics.add("queue_wait", time.perf_counter() - waited)
+                if result is None:
+                    break
+                for stage, seconds in result.timings.items():
+                    self.metrics.add(stage, seconds)
+                if progress is not None:
+                    progress.update(result.size)
+                range_start = result.end - result.size
+                marks = [*result.marks, (len(result.records), result.size, result.lines, result.errors)]
+                rejects = iter(result.rejects)
+                pending = next(rejects, None)
+                done = errors = 0
+                for count, mark_offset, mark_line, mark_errors in marks:
+                    # Rejeitos e erros até o ponto, para que o checkpoint os inclua exatamente
+                    while pending is not None and pending[0] <= mark_line:
+                        line_num, reason, row = pending
+                        self._reject(stats, line_base + line_num, reason, row)
+                        pending = next(rejects, None)
+                    stats["errors"] += mark_errors - errors
+                    errors = mark_errors
+                    yield result.records[done:count], (range_start + mark_offset, line_base + mark_line)
+                    done = count
+                line_base += result.lines
+
+    async def _load_chunks(
+        self,
+        chunks: AsyncIterable[tuple[list[Any], Position | None]],
+        stats: dict[str, int],
+        *,
+        mode: str,
+        debug: bool,
+        auto_commit: bool,
+        auto_commit_batch_size: int,
+        writers: int = 1,
+    ) -> None:
+        """Carrega os blocos em lotes; os commits (e checkpoints) só acontecem entre blocos."""
+        if writers > 1:
+            await self._fan_out_chunks(
+                chunks,
+                stats,
+                writers=writers,
+                mode=mode,
+                debug=debug,
+                auto_commit=auto_commit,
+                auto_commit_batch_size=auto_commit_batch_size,
+            )
+            return
+        size = self._batch_limit(mode)
+        uncommitted = 0
+        metrics = self.metrics
+        async for chunk, position in chunks:
+            chunk = self._collapse_duplicates(chunk, stats)
+            for i in range(0, len(chunk), size):
+                started = time.perf_counter()
+                uncommitted += await self._load_batch(chunk[i : i + size], stats, mode=mode, debug=debug)
+                metrics.batch(time.perf_counter() - started)
+            if position is not None:
+                self._position = position
+                metrics.sample(position)
+            if auto_commit and uncommitted >= auto_commit_batch_size:
+                started = time.perf_counter()
+                await self._commit(stats)
+                metrics.add("commit", time.perf_counter() - started)
+                uncommitted = 0
+        started = time.perf_counter()
+        await self._save_checkpoint(stats, "done")
+        if auto_commit:
+            await self.session.commit()
+        metrics.add("commit", time.perf_counter() - started)
+
+    async def _fan_out_chunks(
+        self,
+        chunks: AsyncIterable[tuple[list[Any], Position | None]],
+        stats: dict[str, int],
+        *,
+        writers: int,
+        mode: str,
+        debug: bool,
+        auto_commit: bool,
+        auto_commit_batch_size: int,
+    ) -> None:
+        """
+        _load_chunks com writers conexões, cada uma com os registros das suas chaves (ver
+        _split_by_writer); a cada commit, as sessões extras são confirmadas antes da principal.
+        """
+        size = self._batch_limit(mode)
+        metrics = self.metrics
+        failures: list[Exception] = []
+        uncommitted = 0
+
+        async def write(writer: BaseCSVPipeline, queue: asyncio.Queue[list[tuple[Any, ...]]]) -> None:
+            nonlocal uncommitted
+            while True:
+                batch = await queue.get()
+                try:
+                    # Depois de uma falha, só esvazia a fila (a distribuição nunca fica presa)
+                    if not failures:
+                        started = time.perf_counter()
+                        uncommitted += await writer._load_batch(batch, stats, mode=mode, debug=debug)
+                        metrics.batch(time.perf_counter() - started)
+                except Exception as exc:
+                    failures.append(exc)
+                finally:
+                    queue.task_done()
+
+        async def drain() -> None:
+            """Espera os writers gravarem todos os lotes enviados; relança a primeira falha."""
+            await asyncio.gather(*(queue.join() for queue in queues))
+            if failures:
+                raise failures[0]
+
+        async with AsyncExitStack() as sessions:
+            pipelines: list[BaseCSVPipeline] = [self]
+            for _ in range(writers - 1):
+                pipelines.append(self._writer(await sessions.enter_async_context(get_async_session())))
+            queues = [asyncio.Queue(maxsize=WRITER_QUEUE_DEPTH) for _ in pipelines]
+            tasks = [asyncio.create_task(write(p, q)) for p, q in zip(pipelines, queues)]
+            try:
+                async for chunk, position in chunks:
+                    chunk = self._collapse_duplicates(chunk, stats)
+                    for queue, records in zip(queues, self._split_by_writer(chunk, writers)):
+                        for i in range(0, len(records), size):
+                            await queue.put(records[i : i + size])
+                    if failures:
+                        raise failures[0]
+                    if position is not None:
+                        self._position = position
+                        metrics.sample(position)
+                    if auto_commit and uncommitted >= auto_commit_batch_size:
+                        started = time.perf_counter()
+                        await drain()
+                        await asyncio.gather(*(p.session.commit() for p in pipelines[1:]))
+                        await self._commit(stats)
+                        metrics.add("commit", time.perf_counter() - started)
+                        uncommitted = 0
+                await drain()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            # Ao sair, get_async_session confirma as sessões extras, antes do checkpoint final
+        started = time.perf_counter()
+        await self._save_checkpoint(stats, "done")
+        if auto_commit:
+            await self.session.commit()
+        metrics.add("commit", time.perf_counter() - started)
+
+    def _split_by_writer(self, records: list[tuple[Any, ...]], writers: int) -> list[list[tuple[Any, ...]]]:
+        """Separa os registros entre os writers pela chave (ou pela partição): cada chave num só writer."""
+        groups: list[list[tuple[Any, ...]]] = [[] for _ in range(writers)]
+        if self._partitions is not None:
+            index = self.columns.index(self._partitions.column)
+            remainder = self._partitions.remainder
+            for record in records:
+                value = record[index]
+                partition = remainder(value)
+                groups[(hash(value) if partition is None else partition) % writers].append(record)
+            return groups
+        key = self._record_key
+        for record in records:
+            groups[hash(key(record)) % writers].append(record)
+        return groups
+
+    def _collapse_duplicates(self, records: list[tuple[Any, ...]], stats: dict[str, int]) -> list[tuple[Any, ...]]:
+        """Uma ocorrência por chave no bloco, a última; as anteriores contam em stats["duplicates"]."""
+        unique = dict(zip(map(self._record_key, records), records))
+        if len(unique) == len(records):
+            return records
+        stats["duplicates"] += len(records) - len(unique)
+        return list(unique.values())
+
+    @cached_property
+    def _record_key(self) -> Callable[[tuple[Any, ...]], Any]:
+        """Chave primária de um registro (tupla na ordem de columns)."""
+        return itemgetter(*(self.columns.index(c) for c in self.key_columns))
 
-    def _count_lines(self, path: Path) -> int | None:
-        """Conta linhas do arquivo para a barra de progresso (opcional)."""
+    def _writer(self, session: AsyncSession) -> "BaseCSVPipeline":
+        """Cópia do pipeline que grava os lotes desta run em outra sessão (ver _fan_out_chunks)."""
+        writer = type(self)(session)
+        writer._target = self._target
+        writer._partitions = self._partitions
+        writer._rejects = self._rejects
+        writer.metrics = self.metrics
+        writer.on_row_error = self.on_row_error
+        return writer
+
+    async def _commit(self, stats: dict[str, int]) -> None:
+        """Commit dos lotes carregados com o checkpoint do ponto atual, na mesma transação."""
+        if self._source is not None:
+            # Rejeitos até este ponto precisam estar no arquivo antes do checkpoint
+            self._rejects.sync()
+            await self._save_checkpoint(stats, "running")
+        await self.session.commit()
+        self._checkpointed = self._source is not None
+
+    async def _save_checkpoint(self, stats: dict[str, int], status: str) -> None:
+        """Grava o checkpoint (running ou done) na transação corrente, se a carga tiver um."""
+        if self._source is None:
+            return
+        byte_offset, line_number = self._position
+        await EtlCheckpointRepository(self.session).save(
+            self.target_table,
+            self._source,
+            **self._identity,
+            byte_offset=byte_offset,
+            line_number=line_number,
+            rejects=self._rejects.count,
+            stats=dict(stats),
+            status=status,
+        )
+
+    async def _load_batch(
+        self,
+        batch: list[tuple[Any, ...]],
+        stats: dict[str, int],
+        *,
+        mode: str,
+        debug: bool,
+    ) -> int:
+        """
+        Carrega um lote num SAVEPOINT e atualiza stats. Se falhar, divide o lote ao meio até
+        isolar os registros recusados, que vão para a quarentena. Retorna quantos foram carregados.
+        """
         try:
-            with path.open(newline="", encoding=self.encoding) as f:
-                return sum(1 for _ in f)
-        except OSError:
+            async with self.session.begin_nested():
+                inserted, updated, skipped = await self._write_batch(batch, mode)
+        except Exception as exc:
+            if len(batch) == 1:
+                stats["errors"] += 1
+                if debug:
+                    logger.exception("%s: registro rejeitado pelo banco: %s", mode, batch[0])
+                fields = render_fields(self.column_specs, dict(zip(self.columns, batch[0])), self._row_width)
+                self._reject(stats, None, _db_reason(exc), fields)
+                return 0
+            if debug:
+                logger.debug("%s: lote de %d registros falhou; dividindo", mode, len(batch))
+            middle = len(batch) // 2
+            loaded = await self._load_batch(batch[:middle], stats, mode=mode, debug=debug)
+            return loaded + await self._load_batch(batch[middle:], stats, mode=mode, debug=debug)
+        stats["processed"] += len(batch)
+        stats["inserted"] += inserted
+        stats["updated"] += updated
+        stats["skipped"] += skipped
+        if debug:
+            logger.debug(
+                "%s: %d registros (inserted=%d updated=%d skipped=%d)",
+                mode,
+                len(batch),
+                inserted,
+                updated,
+                skipped,
+            )
+        return len(batch)
+
+    async def _write_batch(self, batch: list[tuple[Any, ...]], mode: str) -> tuple[int, int, int]:
+        """Grava o lote no modo pedido. Retorna (inserted, updated, skipped)."""
+        if mode == "orm":
+            results = await self._persist_batch([self._from_record(record) for record in batch])
+            return results.count("inserted"), results.count("updated"), results.count("skipped")
+        if mode == "copy":
+            if self._partitions is None:
+                await copy_records(self.session, self.target_table, self.columns, batch)
+            else:
+                # Em sequência, na transação do arquivo; em paralelo só entre writers (--writers)
+                for partition, records in self._partitions.route(batch, self.columns).items():
+                    await copy_records(self.session, partition, self.columns, records)
+            return len(batch), 0, 0
+        return await upsert_records(self.session, self.model.__table__, self.columns, batch, self._upsert_stmt)
+
+    async def _persist_batch(self, models: list[Any]) -> list[str]:
+        """
+        Modo "orm": uma consulta dos existentes, comparação em memória e um único flush.
+        Retorna 'inserted', 'updated' ou 'skipped' para cada modelo, na ordem recebida.
+        """
+        if self.has_row_hash:
+            return await self._persist_batch_by_hash(models)
+        existing = await self.fetch_existing([self._key(m) for m in models])
+        results: list[str] = []
+        new: list[Any] = []
+        for model in models:
+            current = existing.get(self._key(model))
+            if current is None:
+                new.append(model)
+                results.append("inserted")
+            elif self._merge(current, model):
+                results.append("updated")
+            else:
+                results.append("skipped")
+        await self.save_batch(new)
+        return results
+
+    async def _persist_batch_by_hash(self, models: list[Any]) -> list[str]:
+        """Modo "orm" com row_hash: insere os novos e reescreve só os de hash diferente."""
+        known = await self.fetch_hashes([self._key(m) for m in models])
+        results: list[str] = []
+        new: list[Any] = []
+        changed: list[Any] = []
+        for model in models:
+            key = self._key(model)
+            if key not in known:
+                new.append(model)
+                results.append("inserted")
+            elif known[key] == model.row_hash:
+                results.append("skipped")
+            else:
+                changed.append(model)
+                results.append("updated")
+        await self.save_batch(new)
+        await self.update_batch(changed)
+        return results
+
+    def _reject(self, stats: dict[str, int], line_num: int | None, reason: str, row: Sequence[str]) -> None:
+        """Envia a linha para a quarentena e conta o motivo em stats (rejects.<motivo>)."""
+        key = f"rejects.{reason}"
+        stats[key] = stats.get(key, 0) + 1
+        if self._rejects is not None:
+            self._rejects.write(line_num, reason, row)
+        self.on_row_error(row)
+
+    def _error_reason(self, row: Sequence[str]) -> str:
+        """Motivo de uma linha cuja conversão levantou exceção."""
+        return "short_row" if len(row) < self._row_width else "parse_error"
+
+    @cached_property
+    def _row_width(self) -> int:
+        """Campos esperados por linha (maior posição usada pelas column_specs + 1)."""
+        return max(spec.index for spec in self.column_specs) + 1
+
+    def _convert(self, row: Sequence[str]) -> tuple[Any, ...] | None:
+        """Linha do csv.reader -> tupla na ordem de columns, com row_hash (ou None para pular)."""
+        record = self._converter(row)
+        if record is None:
             return None
+        for index, _, codes in self._code_checks:
+            value = record[index]
+            if value is not None and value not in codes:
+                return None
+        if self.has_row_hash:
+            return (*record, compute_row_hash(record))
+        return record
+
+    def _rejection_reason(self, row: Sequence[str]) -> str:
+        """Motivo de uma linha que _convert pulou (unknown_<coluna>: código fora do domínio)."""
+        reason = rejection_reason(self.column_specs, row)
+        record = self._converter(row) if reason == "rejected" else None
+        if record is not None:
+            for index, column, codes in self._code_checks:
+                if record[index] is not None and record[index] not in codes:
+                    return f"unknown_{column}"
+        return reason
+
+    @cached_property
+    def _converter(self) -> Callable[[Sequence[str]], tuple[Any, ...] | None]:
+        return compile_converter(self.column_specs, self._hashed_columns)
+
+    def _key(self, model: Any) -> tuple[Any, ...]:
+        return tuple(getattr(model, name) for name in self.key_columns)
+
+    def _merge(self, current: Any, model: Any) -> bool:
+        """Copia as colunas não-chave de model para current se alguma mudou. Retorna True se atualizou."""
+        if all(getattr(current, c) == getattr(model, c) for c in self.compare_columns):
+            return False
+        for name in self.update_columns:
+            setattr(current, name, getattr(model, name))
+        return True
+
+    @property
+    def table_name(self) -> str:
+        return self.model.__table__.name
+
+    @property
+    def target_table(self) -> str:
+        """Tabela que recebe a carga: target_table de run ou a do modelo."""
+        return self._target or self.table_name
+
+    @cached_property
+    def key_columns(self) -> list[str]:
+        """Colunas da chave primária do modelo."""
+        return [c.name for c in self.model.__table__.primary_key.columns]
+
+    @cached_property
+    def update_columns(self) -> list[str]:
+        """Colunas não-chave (copiadas no update do modo "orm")."""
+        return [c for c in self.columns if c not in self.key_columns]
+
+    @property
+    def diff_key_fields(self) -> Sequence[str]:
+        """Campos do CSV que formam a chave no diff entre releases (por padrão, key_columns)."""
+        return self.key_columns
+
+    @property
+    def compare_columns(self) -> Sequence[str]:
+        """Colunas comparadas para decidir entre 'updated' e 'skipped' no modo "orm"."""
+        return self.update_columns
+
+    @cached_property
+    def has_row_hash(self) -> bool:
+        return ROW_HASH_COLUMN in self.model.__table__.columns
+
+    @cached_property
+    def _hashed_columns(self) -> list[str]:
+        """Colunas que entram no row_hash (todas, exceto o próprio hash), na ordem do modelo."""
+        return [c.name for c in self.model.__table__.columns if c.name != ROW_HASH_COLUMN]
+
+    @cached_property
+    def _upsert_stmt(self) -> Any:
+        return build_upsert(self.model.__table__, self.columns)
+
+    @cached_property
+    def columns(self) -> list[str]:
+        """Colunas dos registros (tuplas): as do modelo, com row_hash (se houver) por último."""
+        return self._hashed_columns + ([ROW_HASH_COLUMN] if self.has_row_hash else [])
+
+    def _from_record(self, record: tuple[Any, ...]) -> Any:
+        """Constrói o modelo do ORM a partir da tupla (modo "orm")."""
+        return self.model(**dict(zip(self.columns, record)))
 
     @property
     def delimiter(self) -> str:
@@ -128,19 +951,45 @@ class BaseCSVPipeline(ABC):
         pass
 
     @abstractmethod
-    def transform_row(self, row: dict[str, str]) -> Any | None:
-        """Converte uma linha do CSV no modelo SQLAlchemy (ou None para pular)."""
+    async def fetch_existing(self, keys: Sequence[tuple[Any, ...]]) -> dict[tuple[Any, ...], Any]:
+        """Busca via repository, numa única consulta, os registros existentes do lote: {chave: modelo}."""
         ...
 
     @abstractmethod
-    async def _persist_one(self, model: Any) -> str:
-        """
-        Persiste um único registro via repository (insert ou update).
-        Retorna 'inserted', 'updated' ou 'skipped'.
-        Implementado em cada pipeline usando o repository da entidade.
-        """
+    async def save_batch(self, models: Sequence[Any]) -> None:
+        """Adiciona os novos modelos do lote e faz um único flush via repository."""
         ...
 
-    def on_row_error(self, row: dict[str, str]) -> None:
-        """Callback opcional quando uma linha falha na transformação."""
+    async def fetch_hashes(self, keys: Sequence[tuple[Any, ...]]) -> dict[tuple[Any, ...], int | None]:
+        """Modelos com row_hash: {chave: row_hash} dos registros já existentes do lote, numa única consulta."""
+        table = self.model.__table__
+        result = await self.session.execute(
+            select(*[table.c[c] for c in self.key_columns], table.c[ROW_HASH_COLUMN]).where(self._has_key(keys))
+        )
+        return {tuple(row[:-1]): row[-1] for row in result.tuples()}
+
+    async def update_batch(self, models: Sequence[Any]) -> None:
+        """Reescreve os registros alterados do lote pela chave primária (bulk UPDATE do ORM, sem carregá-los)."""
+        if not models:
+            return
+        await self.session.execute(
+            update(self.model), [{c: getattr(m, c) for c in self.columns} for m in models]
+        )
+
+    async def delete_batch(self, keys: Sequence[tuple[Any, ...]]) -> int:
+        """Remove os registros das chaves num único DELETE (--since). Retorna quantos foram removidos."""
+        if not keys:
+            return 0
+        result = await self.session.execute(delete(self.model.__table__).where(self._has_key(keys)))
+        return result.rowcount
+
+    def _has_key(self, keys: Sequence[tuple[Any, ...]]) -> Any:
+        """Condição WHERE para as chaves (na ordem de key_columns)."""
+        columns = [self.model.__table__.c[c] for c in self.key_columns]
+        if len(columns) == 1:
+            return columns[0] == any_([key for (key,) in keys])
+        return tuple_(*columns).in_(list(keys))
+
+    def on_row_error(self, row: Sequence[str]) -> None:
+        """Callback opcional para cada linha rejeitada (também gravada na quarentena)."""
         pass
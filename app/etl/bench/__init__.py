@@ -0,0 +1,2 @@
+# Benchmark do ETL: releases sintéticas (generator) e medição de vazão por modo (runner).
+# Rode via python -m app.etl.bench generate|run.
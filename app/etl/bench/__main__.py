@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Raiz do projeto (para resolver caminhos relativos)
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+# Garante que o projeto está no path (rodar de qualquer diretório)
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.etl.base import LOAD_MODES
+from app.etl.bench.generator import DatasetSpec, generate_release
+from app.etl.bench.runner import DEFAULT_TOLERANCE, compare, run_benchmark
+
+logger = logging.getLogger("app.etl.bench")
+
+
+def _cmd_generate(args: argparse.Namespace) -> int:
+    spec = DatasetSpec(
+        rows=args.rows,
+        duplicate_ratio=args.duplicates,
+        dirty_ratio=args.dirty,
+        seed=args.seed,
+        tag=args.tag,
+    )
+    summaries = generate_release(Path(args.directory), spec, progress=logger.info)
+    for name, summary in summaries.items():
+        dirty = sum(summary.dirty.values())
+        print(f"{name}: {summary.file} ({summary.rows} linhas, {summary.duplicates} duplicadas, {dirty} sujas)")
+    return 0
+
+
+def _cmd_run(args: argparse.Namespace) -> int:
+    if not args.yes:
+        print("O benchmark esvazia (TRUNCATE) todas as tabelas do ETL; confirme com --yes", file=sys.stderr)
+        return 2
+    etl_args: list[str] = []
+    for workers in args.workers or ():
+        etl_args += ["--workers", workers]
+    if args.concurrency:
+        etl_args += ["--concurrency", str(args.concurrency)]
+    if args.writers:
+        etl_args += ["--writers", str(args.writers)]
+
+    try:
+        result = asyncio.run(run_benchmark(Path(args.directory), args.modes, repeat=args.repeat, etl_args=etl_args))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    print(f"{'modo':<8} {'linhas':>10} {'segundos':>9} {'linhas/s':>10} {'RSS MB':>8} {'workers MB':>10} {'idas':>8}")
+    for mode, r in result["results"].items():
+        if not r["ok"]:
+            print(f"{mode:<8} falhou: {r['error']}")
+            continue
+        print(
+            f"{mode:<8} {r['rows']:>10} {r['seconds']:>9.2f} {r['rows_per_sec']:>10.0f} "
+            f"{r['peak_rss_bytes'] / 1e6:>8.0f} {r['peak_rss_workers_bytes'] / 1e6:>10.0f} {r['round_trips']:>8}"
+        )
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2) + "\n")
+
+    failed = any(not r["ok"] for r in result["results"].values())
+    if args.baseline and not args.save_baseline:
+        baseline_path = Path(args.baseline)
+        if not baseline_path.exists():
+            print(f"Baseline {baseline_path} não existe; grave um com --save-baseline", file=sys.stderr)
+            return 2
+        try:
+            regressions = compare(result, json.loads(baseline_path.read_text()), args.tolerance)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        for regression in regressions:
+            print(f"REGRESSÃO {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"Sem regressões em relação a {baseline_path} (tolerância {args.tolerance:.0%})")
+    elif args.save_baseline:
+        if failed:
+            print("Há modos com falha; baseline não gravado", file=sys.stderr)
+            return 1
+        Path(args.baseline).write_text(json.dumps(result, indent=2) + "\n")
+        print(f"Baseline gravado em {args.baseline}")
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do ETL CNPJ API")
+    parser.add_argument("--quiet", "-q", action="store_true", help="Sem logging")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("generate", help="Gerar uma release sintética no formato da Receita")
+    p.add_argument("directory", help="Diretório de saída (criado se não existir)")
+    p.add_argument("--rows", type=int, default=DatasetSpec.rows, help="Linhas de empresas e estabelecimentos")
+    p.add_argument("--duplicates", type=float, default=0.0, help="Fração de linhas com chave repetida (ex.: 0.01)")
+    p.add_argument("--dirty", type=float, default=0.0, help="Fração de linhas sujas, rejeitadas pelo ETL")
+    p.add_argument("--seed", type=int, default=0, help="Semente (mesmos parâmetros geram os mesmos arquivos)")
+    p.add_argument("--tag", default=DatasetSpec.tag, help="Parte da data nos nomes dos arquivos (ex.: D60110)")
+    p.set_defaults(func=_cmd_generate)
+
+    p = sub.add_parser(
+        "run",
+        help="Carregar a release em cada modo e medir vazão, memória e idas ao banco",
+        description=(
+            "Esvazia as tabelas do ETL e carrega a release (python -m app.etl all) em cada modo. "
+            "Com --baseline, compara com um resultado anterior e sai com 1 se houver regressão."
+        ),
+    )
+    p.add_argument("directory", help="Release gerada por 'generate'")
+    p.add_argument("--modes", nargs="+", choices=LOAD_MODES, default=list(LOAD_MODES), help="Modos a medir")
+    p.add_argument("--repeat", type=int, default=1, help="Execuções por modo (fica a de maior vazão)")
+    p.add_argument("--workers", action="append", metavar="N|PIPELINE=N", help="Repassado ao ETL (repetível)")
+    p.add_argument("--concurrency", type=int, help="Repassado ao ETL (--concurrency N)")
+    p.add_argument("--writers", type=int, help="Repassado ao ETL (--writers N)")
+    p.add_argument("--output", metavar="ARQUIVO", help="Gravar o resultado em JSON")
+    p.add_argument("--baseline", metavar="ARQUIVO", help="Baseline para comparar (ou gravar, com --save-baseline)")
+    p.add_argument("--save-baseline", action="store_true", help="Gravar o resultado como baseline em --baseline")
+    p.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f"Variação aceita em relação ao baseline (padrão: {DEFAULT_TOLERANCE})",
+    )
+    p.add_argument("--yes", action="store_true", help="Confirma que as tabelas do ETL podem ser esvaziadas")
+    p.set_defaults(func=_cmd_run)
+
+    args = parser.parse_args()
+    if getattr(args, "save_baseline", False) and not args.baseline:
+        parser.error("--save-baseline requer --baseline")
+    if not args.quiet:
+        logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
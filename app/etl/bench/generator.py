@@ -0,0 +1,305 @@
+"""
+Gerador determinístico de releases sintéticas no formato da Receita.
+
+Escreve, para cada pipeline, um arquivo com o nome e o layout dos oficiais (Latin-1, separador
+;, todos os campos entre aspas, sem cabeçalho, na ordem de fieldnames): as seis tabelas de
+domínio com o tamanho real aproximado (DOMAIN_SIZES) e empresas, estabelecimentos e simples
+com `rows` linhas (simples: metade). As FKs são consistentes: todo estabelecimento e todo
+simples aponta para uma empresa gerada e para códigos de domínio existentes.
+
+- duplicate_ratio: fração de linhas que repetem a chave de uma linha recente (até
+  DUPLICATE_WINDOW linhas antes, quase sempre no mesmo lote) com outros valores;
+- dirty_ratio: fração de linhas sujas, de um dos tipos de DIRTY_KINDS (obrigatória vazia, data
+  inválida, código de domínio inexistente ou linha curta), que o ETL deve rejeitar. São linhas
+  a mais: as `rows` chaves limpas continuam todas presentes, e as FKs entre arquivos, válidas.
+
+A mesma semente e os mesmos parâmetros geram arquivos idênticos byte a byte. O manifesto
+(MANIFEST_NAME, ignorado pelo ETL por começar com ponto) registra parâmetros e contagens.
+"""
+import csv
+import json
+import random
+import zlib
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+MANIFEST_NAME = ".bench-dataset.json"
+
+# Tamanho aproximado das tabelas de domínio numa release real
+DOMAIN_SIZES = {
+    "paises": 255,
+    "municipios": 5_571,
+    "cnaes": 1_358,
+    "motivos": 63,
+    "naturezas": 90,
+    "qualificacoes": 68,
+}
+
+# (faixa dos códigos, dígitos) de cada tabela de domínio
+_CODE_RANGES = {
+    "paises": (range(1, 1_000), 3),
+    "municipios": (range(1, 10_000), 4),
+    "cnaes": (range(111_301, 9_900_000), 7),
+    "motivos": (range(0, 100), 2),
+    "naturezas": (range(1_000, 10_000), 4),
+    "qualificacoes": (range(0, 100), 2),
+}
+
+# Nomes no padrão dos arquivos da Receita (tag da release no lugar de D60110)
+FILE_NAMES = {
+    "paises": "F.K03200$Z.{tag}.PAISCSV",
+    "municipios": "F.K03200$Z.{tag}.MUNICCSV",
+    "cnaes": "F.K03200$Z.{tag}.CNAECSV",
+    "motivos": "F.K03200$Z.{tag}.MOTICSV",
+    "naturezas": "F.K03200$Z.{tag}.NATJUCSV",
+    "qualificacoes": "F.K03200$Z.{tag}.QUALSCSV",
+    "empresas": "K3241.K03200Y0.{tag}.EMPRECSV",
+    "estabelecimentos": "K3241.K03200Y0.{tag}.ESTABELE",
+    "simples": "F.K03200$W.SIMPLES.CSV.{tag}",
+}
+
+DIRTY_KINDS = ("empty_required", "invalid_date", "unknown_code", "short_row")
+
+# Tipos de linha suja possíveis em cada arquivo (simples não tem data obrigatória nem FK de domínio)
+_DIRTY_BY_PIPELINE = {
+    "empresas": ("empty_required", "unknown_code", "short_row"),
+    "estabelecimentos": DIRTY_KINDS,
+    "simples": ("empty_required", "short_row"),
+}
+
+# Distância máxima (em linhas) entre uma duplicata e a linha original
+DUPLICATE_WINDOW = 1_000
+
+# cnpj_basico = índice da empresa * _SPREAD mod 10^8 (bijeção): chaves espalhadas, não em ordem
+_SPREAD = 7_919
+
+_WORDS = (
+    "COMÉRCIO", "SERVIÇOS", "INDÚSTRIA", "CONSTRUÇÕES", "TRANSPORTES", "ALIMENTAÇÃO", "SÃO",
+    "JOÃO", "MARIA", "SILVA", "SOUZA", "OLIVEIRA", "PEREIRA", "TECNOLOGIA", "AGRÍCOLA", "SAÚDE",
+    "EDUCAÇÃO", "MÓVEIS", "CONFECÇÕES", "ELETRÔNICOS", "DISTRIBUIDORA", "GRÁFICA", "PANIFICAÇÃO",
+)
+_SUFFIXES = ("LTDA", "S.A.", "EIRELI", "ME", "EPP", "")
+_STREET_TYPES = ("RUA", "AVENIDA", "TRAVESSA", "ALAMEDA", "RODOVIA", "PRAÇA", "ESTRADA")
+_UFS = (
+    "AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO", "MA", "MG", "MS", "MT", "PA", "PB",
+    "PE", "PI", "PR", "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO",
+)
+
+
+@dataclass
+class DatasetSpec:
+    """Parâmetros de uma release sintética (ver o docstring do módulo)."""
+
+    rows: int = 10_000
+    duplicate_ratio: float = 0.0
+    dirty_ratio: float = 0.0
+    seed: int = 0
+    tag: str = "D00000"
+
+
+@dataclass
+class FileSummary:
+    """Arquivo gerado: linhas escritas, duplicatas e linhas sujas por tipo."""
+
+    file: str
+    rows: int = 0
+    duplicates: int = 0
+    dirty: dict[str, int] = field(default_factory=dict)
+
+
+def cnpj_dv(basico: str, ordem: str) -> str:
+    """Dígitos verificadores do CNPJ (módulo 11) para cnpj_basico + cnpj_ordem."""
+    digits = [int(c) for c in basico + ordem]
+    for weights in ((5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2), (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)):
+        remainder = sum(d * w for d, w in zip(digits, weights)) % 11
+        digits.append(0 if remainder < 2 else 11 - remainder)
+    return f"{digits[-2]}{digits[-1]}"
+
+
+def _basico(index: int) -> str:
+    return f"{index * _SPREAD % 100_000_000:08d}"
+
+
+def _name(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _date(rng: random.Random, start_year: int = 1970) -> str:
+    return f"{rng.randint(start_year, 2025)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+
+
+class _Generator:
+    """Estado da geração de uma release: RNG por arquivo e códigos de domínio."""
+
+    def __init__(self, spec: DatasetSpec) -> None:
+        self.spec = spec
+        self.codes: dict[str, list[str]] = {}
+        for table, size in DOMAIN_SIZES.items():
+            values, digits = _CODE_RANGES[table]
+            sample = sorted(self._rng(table).sample(values, size))
+            self.codes[table] = [f"{value:0{digits}d}" for value in sample]
+
+    def _rng(self, name: str) -> random.Random:
+        # Semente estável por arquivo (hash() de str varia entre processos)
+        return random.Random(self.spec.seed * 1_000_003 + zlib.crc32(name.encode()))
+
+    def _unknown(self, table: str) -> str:
+        """Código com o formato da tabela que não existe nela."""
+        values, digits = _CODE_RANGES[table]
+        known = set(self.codes[table])
+        return next(f"{v:0{digits}d}" for v in reversed(values) if f"{v:0{digits}d}" not in known)
+
+    def domain(self, table: str) -> Iterator[list[str]]:
+        label = {"paises": "PAÍS", "municipios": "MUNICÍPIO", "cnaes": "ATIVIDADE"}.get(table, table.upper())
+        rng = self._rng(table + ".descricao")
+        for code in self.codes[table]:
+            yield [code, f"{label} {_name(rng, 2)} {code}"]
+
+    def empresa(self, rng: random.Random, index: int) -> list[str]:
+        return [
+            _basico(index),
+            f"{_name(rng, rng.randint(2, 4))} {rng.choice(_SUFFIXES)}".strip(),
+            rng.choice(self.codes["naturezas"]),
+            rng.choice(self.codes["qualificacoes"]),
+            f"{rng.choice((0, 1_000, 5_000, 10_000, rng.randint(1, 10_000_000)))},00",
+            rng.choice(("00", "01", "03", "05")),
+            "" if rng.random() < 0.99 else rng.choice(_UFS),
+        ]
+
+    def estabelecimento(self, rng: random.Random, index: int) -> list[str]:
+        empresas = self.spec.rows
+        basico = _basico(index % empresas)
+        ordem = f"{index // empresas + 1:04d}"
+        exterior = rng.random() < 0.005
+        secondary = rng.sample(self.codes["cnaes"], rng.randint(0, 5))
+        return [
+            basico,
+            ordem,
+            cnpj_dv(basico, ordem),
+            "1" if ordem == "0001" else "2",
+            _name(rng, 2) if rng.random() < 0.4 else "",
+            rng.choice(("02", "02", "02", "04", "08", "01", "03")),
+            _date(rng, 2000),
+            rng.choice(self.codes["motivos"]),
+            _name(rng, 1) if exterior else "",
+            rng.choice(self.codes["paises"]) if exterior else "",
+            _date(rng),
+            rng.choice(self.codes["cnaes"]),
+            ",".join(secondary),
+            rng.choice(_STREET_TYPES),
+            _name(rng, rng.randint(1, 3)),
+            str(rng.randint(1, 9_999)) if rng.random() < 0.9 else "S/N",
+            f"SALA {rng.randint(1, 999)}" if rng.random() < 0.3 else "",
+            _name(rng, 1),
+            f"{rng.randint(1_000_000, 99_999_999):08d}",
+            rng.choice(_UFS),
+            rng.choice(self.codes["municipios"]),
+            f"{rng.randint(11, 99)}",
+            f"{rng.randint(20_000_000, 99_999_999)}",
+            "",
+            "",
+            "",
+            "",
+            f"contato{index}@example.com" if rng.random() < 0.5 else "",
+            "",
+            "",
+        ]
+
+    def simples(self, rng: random.Random, index: int) -> list[str]:
+        mei = rng.random() < 0.3
+        return [
+            _basico(2 * index % self.spec.rows),
+            "S" if rng.random() < 0.7 else "N",
+            _date(rng, 2007),
+            "00000000",
+            "S" if mei else "N",
+            _date(rng, 2009) if mei else "00000000",
+            "00000000",
+        ]
+
+    def dirty(self, rng: random.Random, pipeline: str, row: list[str]) -> str:
+        """Suja a linha (in place) com um dos tipos possíveis no arquivo; retorna o tipo."""
+        kind = rng.choice(_DIRTY_BY_PIPELINE[pipeline])
+        if kind == "empty_required":
+            # razao_social / logradouro / cnpj_basico
+            row[{"empresas": 1, "estabelecimentos": 14, "simples": 0}[pipeline]] = ""
+        elif kind == "invalid_date":
+            row[6] = "20231345"  # data_situacao_cadastral
+        elif kind == "unknown_code":
+            if pipeline == "empresas":
+                row[2] = self._unknown("naturezas")
+            else:
+                row[20] = self._unknown("municipios")
+        else:
+            del row[3:]
+        return kind
+
+
+def _sizes(spec: DatasetSpec) -> dict[str, int]:
+    return {"empresas": spec.rows, "estabelecimentos": spec.rows, "simples": spec.rows // 2}
+
+
+def _write(path: Path, rows: Iterator[list[str]]) -> None:
+    with path.open("w", encoding="latin-1", newline="") as f:
+        csv.writer(f, delimiter=";", quoting=csv.QUOTE_ALL, lineterminator="\n").writerows(rows)
+
+
+def generate_release(
+    directory: Path,
+    spec: DatasetSpec,
+    *,
+    progress: Callable[[str], None] | None = None,
+) -> dict[str, FileSummary]:
+    """Gera a release em directory (criado se preciso) e grava o manifesto; retorna o resumo por pipeline."""
+    directory.mkdir(parents=True, exist_ok=True)
+    generator = _Generator(spec)
+    summaries: dict[str, FileSummary] = {}
+
+    for table in DOMAIN_SIZES:
+        summary = summaries[table] = FileSummary(FILE_NAMES[table].format(tag=spec.tag), DOMAIN_SIZES[table])
+        _write(directory / summary.file, generator.domain(table))
+
+    builders = {
+        "empresas": generator.empresa,
+        "estabelecimentos": generator.estabelecimento,
+        "simples": generator.simples,
+    }
+    for pipeline, count in _sizes(spec).items():
+        if progress is not None:
+            progress(f"{pipeline}: {count} linhas")
+        summary = summaries[pipeline] = FileSummary(FILE_NAMES[pipeline].format(tag=spec.tag))
+        _write(directory / summary.file, _rows(generator, pipeline, builders[pipeline], count, summary))
+
+    manifest = {"spec": asdict(spec), "files": {name: asdict(s) for name, s in summaries.items()}}
+    (directory / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, ensure_ascii=False) + "\n")
+    return summaries
+
+
+def _rows(
+    generator: _Generator,
+    pipeline: str,
+    build: Callable[[random.Random, int], list[str]],
+    count: int,
+    summary: FileSummary,
+) -> Iterator[list[str]]:
+    """Linhas de um arquivo grande: count chaves distintas, mais duplicatas e linhas sujas."""
+    spec = generator.spec
+    rng = generator._rng(pipeline)
+    index = 0
+    while index < count:
+        roll = rng.random()
+        if roll < spec.dirty_ratio:
+            # Linha a mais, com a chave da próxima, que o ETL rejeita
+            row = build(rng, index)
+            kind = generator.dirty(rng, pipeline, row)
+            summary.dirty[kind] = summary.dirty.get(kind, 0) + 1
+        elif index and roll < spec.dirty_ratio + spec.duplicate_ratio:
+            # Mesma chave de uma linha recente, demais campos sorteados de novo
+            row = build(rng, rng.randrange(max(0, index - DUPLICATE_WINDOW), index))
+            summary.duplicates += 1
+        else:
+            row = build(rng, index)
+            index += 1
+        summary.rows += 1
+        yield row
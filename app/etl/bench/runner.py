@@ -0,0 +1,161 @@
+"""
+Benchmark de vazão do ETL sobre uma release sintética (ver app.etl.bench.generator).
+
+Para cada modo de carga, esvazia as tabelas do ETL (TRUNCATE ... CASCADE, inclusive
+etl_checkpoints) e roda a release completa (python -m app.etl all) num subprocesso, para que o
+pico de memória seja só daquela execução. Do relatório de métricas (--metrics-json, ver
+app.etl.metrics) saem, por modo:
+
+- rows_per_sec: linhas lidas de todos os arquivos / duração da release (do início da primeira
+  carga ao fim da última);
+- peak_rss_bytes / peak_rss_workers_bytes: maior pico de memória do processo e dos workers;
+- round_trips: idas ao banco (comandos SQL e COPYs) somadas.
+
+Com repeat > 1, fica a melhor das execuções de cada modo (maior vazão). compare confronta o
+resultado com um baseline gravado antes (mesma release): vazão abaixo ou memória/idas ao banco
+acima da tolerância contam como regressão.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import pkgutil
+import subprocess
+import sys
+import tempfile
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import text
+
+from app import models
+from app.core.database import Base
+from app.etl.bench.generator import MANIFEST_NAME
+from app.etl.session import get_async_session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOLERANCE = 0.10
+
+
+@dataclass
+class ModeResult:
+    """Resultado de um modo de carga sobre a release."""
+
+    mode: str
+    ok: bool
+    rows: int = 0
+    seconds: float = 0.0
+    rows_per_sec: float = 0.0
+    peak_rss_bytes: int = 0
+    peak_rss_workers_bytes: int = 0
+    round_trips: int = 0
+    error: str | None = None
+
+
+def load_manifest(dataset: Path) -> dict[str, Any]:
+    """Manifesto da release sintética (parâmetros do gerador e contagens)."""
+    path = dataset / MANIFEST_NAME
+    if not path.exists():
+        raise ValueError(f"{dataset} não tem {MANIFEST_NAME}; gere a release com 'python -m app.etl.bench generate'")
+    return json.loads(path.read_text())
+
+
+async def truncate_tables() -> None:
+    """Esvazia todas as tabelas dos modelos (e etl_checkpoints), em um único TRUNCATE."""
+    for module in pkgutil.iter_modules(models.__path__):
+        importlib.import_module(f"app.models.{module.name}")
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    async with get_async_session() as session:
+        await session.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
+def _summarize(mode: str, report: dict[str, Any]) -> ModeResult:
+    runs = report["runs"]
+    starts = [datetime.fromisoformat(run["started_at"]).timestamp() for run in runs]
+    seconds = max(start + run["seconds"] for start, run in zip(starts, runs)) - min(starts)
+    rows = sum(run["rows"] for run in runs)
+    return ModeResult(
+        mode=mode,
+        ok=all(run["ok"] for run in runs),
+        rows=rows,
+        seconds=round(seconds, 3),
+        rows_per_sec=round(rows / seconds, 1) if seconds else 0.0,
+        peak_rss_bytes=max(run["peak_rss_bytes"] for run in runs),
+        peak_rss_workers_bytes=max(run["peak_rss_workers_bytes"] for run in runs),
+        round_trips=sum(run["round_trips"] for run in runs),
+    )
+
+
+async def run_mode(dataset: Path, mode: str, etl_args: Sequence[str] = ()) -> ModeResult:
+    """Carrega a release do zero num modo (tabelas esvaziadas antes) e resume as métricas."""
+    await truncate_tables()
+    with tempfile.TemporaryDirectory(prefix="etl-bench-") as workdir:
+        report_path = Path(workdir) / "metrics.json"
+        command = [
+            sys.executable, "-m", "app.etl", "all", str(dataset),
+            "--mode", mode, "-q", "--metrics-json", str(report_path), *etl_args,
+        ]
+        logger.info("%s: %s", mode, " ".join(command))
+        completed = await asyncio.to_thread(subprocess.run, command, capture_output=True, text=True)
+        if completed.returncode != 0 or not report_path.exists():
+            error = (completed.stderr or completed.stdout).strip().splitlines()
+            return ModeResult(mode, ok=False, error=error[-1] if error else f"exit {completed.returncode}")
+        result = _summarize(mode, json.loads(report_path.read_text()))
+    logger.info(
+        "%s: %d linhas em %.2fs (%.0f linhas/s), RSS %.0f MB, %d idas ao banco",
+        mode, result.rows, result.seconds, result.rows_per_sec, result.peak_rss_bytes / 1e6, result.round_trips,
+    )
+    return result
+
+
+async def run_benchmark(
+    dataset: Path,
+    modes: Sequence[str],
+    *,
+    repeat: int = 1,
+    etl_args: Sequence[str] = (),
+) -> dict[str, Any]:
+    """Executa os modos sobre a release (repeat vezes cada) e retorna o resultado gravável como baseline."""
+    manifest = load_manifest(dataset)
+    results: dict[str, ModeResult] = {}
+    for mode in modes:
+        for _ in range(repeat):
+            result = await run_mode(dataset, mode, etl_args)
+            best = results.get(mode)
+            if best is None or (result.ok and (not best.ok or result.rows_per_sec > best.rows_per_sec)):
+                results[mode] = result
+    return {
+        "dataset": manifest["spec"],
+        "etl_args": list(etl_args),
+        "results": {mode: asdict(result) for mode, result in results.items()},
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """
+    Regressões do resultado atual em relação ao baseline (lista vazia se nenhuma). Só compara
+    os modos presentes nos dois; ValueError se as releases ou os argumentos do ETL diferirem.
+    """
+    for key in ("dataset", "etl_args"):
+        if current.get(key) != baseline.get(key):
+            raise ValueError(
+                f"baseline com outro {key}: {baseline.get(key)} (atual: {current.get(key)}); gere um novo baseline"
+            )
+    regressions = []
+    for mode, result in current["results"].items():
+        base = baseline["results"].get(mode)
+        if base is None:
+            continue
+        if not result["ok"]:
+            regressions.append(f"{mode}: falhou ({result['error']})")
+            continue
+        if result["rows_per_sec"] < base["rows_per_sec"] * (1 - tolerance):
+            regressions.append(f"{mode}: vazão {result['rows_per_sec']:.0f} linhas/s (baseline {base['rows_per_sec']:.0f})")
+        for key in ("peak_rss_bytes", "peak_rss_workers_bytes", "round_trips"):
+            if result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{mode}: {key} {result[key]} (baseline {base[key]})")
+    return regressions
@@ -0,0 +1,108 @@
+"""
+Cargas em lote (set-based) para o ETL: COPY e upsert via tabela de staging.
+
+- copy_records: envia tuplas com o protocolo COPY (asyncpg copy_records_to_table).
+- upsert_records: COPY do lote para uma tabela temporária de staging e um único
+  INSERT ... SELECT ... ON CONFLICT (pk) DO UPDATE ... WHERE (cols) IS DISTINCT FROM (excluded)
+  por lote. Só reescreve linhas que mudaram; inserted/updated/skipped vêm do RETURNING (xmax;
+  em tabelas particionadas, que não expõem colunas de sistema, de uma CTE com as chaves que já
+  existiam).
+"""
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import Column, MetaData, Table, and_, exists, literal_column, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Executable
+
+from app.etl.metrics import count_round_trip
+from app.etl.session import get_driver_connection
+
+# Coluna opcional do modelo com o hash do registro (ver app.etl.base.compute_row_hash)
+ROW_HASH_COLUMN = "row_hash"
+
+
+def staging_table_name(table: Table) -> str:
+    """Nome da tabela temporária de staging de uma tabela (ex.: _stg_empresas)."""
+    return f"_stg_{table.name}"
+
+
+def build_upsert(table: Table, columns: Sequence[str]) -> Executable:
+    """
+    INSERT ... SELECT da staging com ON CONFLICT na PK, atualizando só as linhas
+    cujas colunas não-PK mudaram (IS DISTINCT FROM; se a tabela tiver row_hash, compara só
+    o hash). Retorna, por linha gravada, se ela foi inserida (True) ou atualizada (False);
+    linhas iguais não retornam.
+
+    O indicador é RETURNING (xmax = 0). Tabelas particionadas não aceitam colunas de sistema
+    no RETURNING; nelas o INSERT vai numa CTE que retorna a PK, e o SELECT final confere se a
+    chave já existia (CTEs enxergam o mesmo snapshot, de antes do INSERT).
+    """
+    pk = [c.name for c in table.primary_key.columns]
+    update_cols = [c for c in columns if c not in pk]
+    staging = Table(
+        staging_table_name(table),
+        MetaData(),
+        *[Column(c, table.c[c].type) for c in columns],
+    )
+    stmt = pg_insert(table).from_select(list(columns), select(*[staging.c[c] for c in columns]))
+    if ROW_HASH_COLUMN in update_cols:
+        # Tabelas com row_hash: basta comparar o hash
+        changed = table.c[ROW_HASH_COLUMN].is_distinct_from(stmt.excluded[ROW_HASH_COLUMN])
+    else:
+        changed = tuple_(*[table.c[c] for c in update_cols]).is_distinct_from(
+            tuple_(*[stmt.excluded[c] for c in update_cols])
+        )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=pk,
+        set_={c: stmt.excluded[c] for c in update_cols},
+        where=changed,
+    )
+    if not table.dialect_options["postgresql"].get("partition_by"):
+        return stmt.returning(literal_column("xmax = 0").label("inserted"))
+
+    keys = [staging.c[c] for c in pk]
+    existing = select(*[table.c[c] for c in pk]).where(tuple_(*[table.c[c] for c in pk]).in_(select(*keys)))
+    existing = existing.cte("existing")
+    written = stmt.returning(*[table.c[c] for c in pk]).cte("written")
+    inserted = ~exists().where(and_(*[existing.c[c] == written.c[c] for c in pk]))
+    return select(inserted.label("inserted")).select_from(written)
+
+
+async def copy_records(
+    session: AsyncSession,
+    table_name: str,
+    columns: Sequence[str],
+    records: Sequence[tuple[Any, ...]],
+) -> None:
+    """Envia registros via COPY na transação corrente da sessão."""
+    conn = await get_driver_connection(session)
+    await conn.copy_records_to_table(table_name, records=records, columns=list(columns))
+    count_round_trip()
+
+
+async def upsert_records(
+    session: AsyncSession,
+    table: Table,
+    columns: Sequence[str],
+    records: Sequence[tuple[Any, ...]],
+    stmt: Executable,
+) -> tuple[int, int, int]:
+    """
+    Upsert de um lote via staging. Retorna (inserted, updated, skipped).
+
+    A staging é TEMP (some ao fim da conexão) e é esvaziada após cada lote; se a
+    transação sofrer rollback, o CREATE também é desfeito e ela é recriada no próximo lote.
+    """
+    staging = staging_table_name(table)
+    await session.execute(
+        text(f'CREATE TEMP TABLE IF NOT EXISTS "{staging}" (LIKE "{table.name}" INCLUDING DEFAULTS)')
+    )
+    await copy_records(session, staging, columns, records)
+    result = await session.execute(stmt)
+    flags = result.scalars().all()
+    await session.execute(text(f'TRUNCATE "{staging}"'))
+    inserted = sum(1 for f in flags if f)
+    updated = len(flags) - inserted
+    return inserted, updated, len(records) - len(flags)
@@ -0,0 +1,37 @@
+"""
+Conjuntos de códigos das tabelas de domínio, para validar as FKs sem ir ao banco.
+
+As tabelas de domínio da Receita (cnaes, motivos, municipios, paises, naturezas e
+qualificacoes) têm poucos milhares de códigos. No início da carga, os códigos das que o
+modelo referencia são lidos uma vez (uma consulta por tabela) para frozensets; cada registro
+convertido é conferido contra eles, e um código inexistente vai para a quarentena
+(rejects.unknown_<coluna>) sem chegar ao banco, em vez de falhar o lote inteiro com
+IntegrityError no flush/COPY e forçar a bisseção (rejects.db_23503).
+
+FKs para tabelas grandes (ex.: estabelecimentos -> empresas) continuam a cargo do banco.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DOMAIN_TABLES = ("cnaes", "motivos", "municipios", "paises", "naturezas", "qualificacoes")
+
+
+def domain_references(model: type) -> dict[str, tuple[str, str]]:
+    """Colunas do modelo com FK para uma tabela de domínio: {coluna: (tabela, coluna referenciada)}."""
+    return {
+        fk.parent.name: (fk.column.table.name, fk.column.name)
+        for fk in model.__table__.foreign_keys
+        if fk.column.table.name in DOMAIN_TABLES
+    }
+
+
+async def load_code_sets(session: AsyncSession, model: type) -> dict[str, frozenset[str]]:
+    """Códigos válidos de cada coluna do modelo que referencia uma tabela de domínio."""
+    code_sets: dict[str, frozenset[str]] = {}
+    loaded: dict[tuple[str, str], frozenset[str]] = {}
+    for column, (table, remote) in domain_references(model).items():
+        if (table, remote) not in loaded:
+            referenced = model.metadata.tables[table].c[remote]
+            loaded[table, remote] = frozenset((await session.execute(select(referenced))).scalars())
+        code_sets[column] = loaded[table, remote]
+    return code_sets
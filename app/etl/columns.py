@@ -0,0 +1,172 @@
+"""
+Especificação declarativa das colunas do CSV e conversão posicional das linhas.
+
+Cada pipeline descreve suas colunas com ColumnSpec (nome da coluna do modelo, posição no
+CSV, conversor, tamanho máximo, obrigatoriedade e valor padrão). compile_converter gera a
+partir delas uma única função que recebe a lista de campos do csv.reader e devolve a tupla
+do registro na ordem pedida (ou None se a linha deve ser ignorada), sem dict por linha nem
+objeto do ORM.
+
+Regras aplicadas a cada campo, nesta ordem:
+1. strip() do texto;
+2. se não vazio e houver conversor (type), aplica-o ao texto; o conversor devolve None
+   quando o valor é inválido ou vazio;
+3. valor vazio (ou None após o conversor): linha ignorada se required, senão default;
+4. senão, strings são truncadas em max_len.
+
+Colunas de baixa cardinalidade (datas, UF, município, códigos) podem usar cache=True: o
+resultado é memorizado por texto bruto do campo, então valores repetidos não passam de novo
+pelas regras e todas as linhas compartilham o mesmo objeto (str/date/Decimal), o que também
+reduz a memória dos lotes em andamento. O cache é limitado a CACHE_SIZE valores por coluna;
+depois de cheio, valores novos são apenas convertidos.
+"""
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+# Converte um campo (texto já sem espaços) em um tipo de destino
+Converter = Callable[[str], Any]
+
+# Máximo de valores distintos memorizados por coluna com cache=True
+CACHE_SIZE = 65_536
+
+# Marca, no cache, valores que descartam a linha (coluna required vazia)
+_DROP = object()
+_MISS = object()
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """Uma coluna do modelo e como obtê-la da linha do CSV."""
+
+    name: str
+    index: int
+    type: Converter | None = None
+    max_len: int | None = None
+    required: bool = False
+    default: Any = None
+    cache: bool = False
+
+
+def parse_date(raw: str) -> date | None:
+    """Converte YYYYMMDD para date; valor inválido retorna None."""
+    if len(raw) != 8:
+        return None
+    try:
+        return date(int(raw[:4]), int(raw[4:6]), int(raw[6:8]))
+    except ValueError:
+        return None
+
+
+def parse_decimal(raw: str) -> Decimal | None:
+    """Converte valor com vírgula decimal (ex.: '1000,00') para Decimal; inválido retorna None."""
+    try:
+        return Decimal(raw.replace(",", "."))
+    except InvalidOperation:
+        return None
+
+
+def compile_converter(
+    specs: Sequence[ColumnSpec],
+    order: Sequence[str],
+) -> Callable[[Sequence[str]], tuple[Any, ...] | None]:
+    """
+    Gera a função posicional fields -> tupla (colunas na ordem de order) ou None.
+    O corpo é montado como código Python (como dataclasses/namedtuple fazem), para que cada
+    linha passe por uma única chamada, sem laços nem lookups por nome.
+    Uma linha com menos campos que o esperado levanta IndexError (conta como erro).
+    """
+    by_name = {spec.name: spec for spec in specs}
+    missing = [name for name in order if name not in by_name]
+    if missing:
+        raise ValueError(f"Colunas sem ColumnSpec: {missing}")
+    extra = set(by_name) - set(order)
+    if extra:
+        raise ValueError(f"ColumnSpec de colunas inexistentes no modelo: {sorted(extra)}")
+
+    namespace: dict[str, Any] = {"_DROP": _DROP, "_MISS": _MISS, "CACHE_SIZE": CACHE_SIZE}
+    lines = ["def convert(fields):"]
+    for i, name in enumerate(order):
+        spec = by_name[name]
+        if spec.type is not None:
+            namespace[f"type{i}"] = spec.type
+        namespace[f"default{i}"] = spec.default
+        if not spec.cache:
+            lines.extend(_field_lines(spec, i, f"fields[{spec.index}]", "return None", indent=1))
+            continue
+        # Com cache: consulta pelo texto bruto; na falta, aplica as regras e memoriza
+        namespace[f"cache{i}"] = {}
+        lines.extend(
+            [
+                f"    raw{i} = fields[{spec.index}]",
+                f"    v{i} = cache{i}.get(raw{i}, _MISS)",
+                f"    if v{i} is _MISS:",
+                *_field_lines(spec, i, f"raw{i}", f"v{i} = _DROP", indent=2),
+                f"        if len(cache{i}) < CACHE_SIZE:",
+                f"            cache{i}[raw{i}] = v{i}",
+                f"    if v{i} is _DROP:",
+                "        return None",
+            ]
+        )
+    lines.append(f"    return ({', '.join(f'v{i}' for i in range(len(order)))},)")
+    exec("\n".join(lines), namespace)
+    return namespace["convert"]
+
+
+def _field_lines(spec: ColumnSpec, i: int, source: str, on_missing: str, indent: int) -> list[str]:
+    """Código que calcula v{i} a partir de source (regras do módulo); on_missing se required vazio."""
+    pad = "    " * indent
+    value = f"v{i}"
+    lines = [f"{pad}{value} = {source}.strip()"]
+    if spec.type is not None:
+        lines.append(f"{pad}{value} = type{i}({value}) if {value} else None")
+        empty = f"{value} is None"
+    else:
+        empty = f"not {value}"
+    lines.append(f"{pad}if {empty}:")
+    lines.append(f"{pad}    {on_missing if spec.required else f'{value} = default{i}'}")
+    if spec.max_len is not None:
+        lines.append(f"{pad}else:")
+        lines.append(f"{pad}    {value} = {value}[:{spec.max_len}]")
+    return lines
+
+
+def rejection_reason(specs: Sequence[ColumnSpec], fields: Sequence[str]) -> str:
+    """
+    Código do motivo pelo qual o conversor descartou a linha (retornou None):
+    empty_<coluna> (obrigatória vazia) ou invalid_<coluna> (obrigatória inválida).
+    Caminho lento, usado só para linhas rejeitadas.
+    """
+    for spec in specs:
+        if not spec.required:
+            continue
+        raw = fields[spec.index].strip()
+        if not raw:
+            return f"empty_{spec.name}"
+        if spec.type is not None and spec.type(raw) is None:
+            return f"invalid_{spec.name}"
+    return "rejected"
+
+
+def render_fields(specs: Sequence[ColumnSpec], values: dict[str, Any], width: int) -> list[str]:
+    """
+    Inverso do conversor: campos no layout do CSV (width posições) a partir dos valores
+    convertidos, de forma que convertê-los de novo produza o mesmo registro.
+    Usado para gravar na quarentena registros recusados pelo banco.
+    """
+    fields = [""] * width
+    for spec in specs:
+        value = values[spec.name]
+        if value is None:
+            continue
+        if isinstance(value, date):
+            fields[spec.index] = value.strftime("%Y%m%d")
+        elif isinstance(value, Decimal):
+            fields[spec.index] = str(value).replace(".", ",")
+        elif isinstance(value, list):
+            fields[spec.index] = ",".join(value)
+        else:
+            fields[spec.index] = str(value)
+    return fields
@@ -0,0 +1,218 @@
+"""
+Modo incremental (--since): diff entre duas releases mensais da Receita.
+
+A maior parte dos registros não muda de um mês para o outro; em vez de reprocessar a
+release inteira, comparamos os arquivos novos com os da release anterior e aplicamos
+só o delta. O diff é feito em disco, por particionamento por hash, com memória limitada:
+
+1. Cada release (um ou mais arquivos, CSV ou .zip) é lida uma vez e cada linha vai para
+   um de N buckets pelo hash da chave. Da release anterior guarda-se só (chave, hash da
+   linha); da nova, a chave e a linha inteira.
+2. Cada bucket é comparado em memória: as chaves anteriores vão para um dict
+   {chave: hash} e as linhas novas são classificadas em inseridas, alteradas ou iguais;
+   o que sobra no dict são as chaves removidas. Uma chave repetida na release nova é
+   comparada com a ocorrência anterior dela (na carga, a última ocorrência prevalece).
+
+N é escolhido para que cada bucket tenha ~bucket_bytes de dados (só um bucket fica em
+memória por vez). O resultado é um CSV com as linhas inseridas/alteradas, no formato do
+arquivo original (carregado pelo pipeline normalmente), e um CSV com as chaves removidas
+(aplicadas com delete_batch do pipeline).
+"""
+import csv
+import hashlib
+import logging
+import math
+import zlib
+from collections.abc import Iterator, Sequence
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.etl.base import BaseCSVPipeline
+from app.etl.readers.archive import input_size, open_input
+from app.etl.session import get_async_session
+
+logger = logging.getLogger(__name__)
+
+# Dados (descomprimidos) por bucket; o dict de um bucket ocupa algumas vezes isso em memória
+BUCKET_BYTES = 256 * 1024 * 1024
+
+# Chaves removidas por DELETE
+DELETE_BATCH_SIZE = 5_000
+
+# Encoding dos buckets intermediários (texto já decodificado da release)
+_BUCKET_ENCODING = "utf-8"
+
+
+@dataclass
+class SnapshotDiff:
+    """Resultado do diff: arquivos com o delta e contagens."""
+
+    changes_path: Path
+    removed_path: Path
+    inserted: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+    @property
+    def summary(self) -> dict[str, int]:
+        return {
+            "inserted": self.inserted,
+            "changed": self.changed,
+            "unchanged": self.unchanged,
+            "removed": self.removed,
+        }
+
+
+def _line_hash(fields: Sequence[str]) -> str:
+    return hashlib.blake2b("\x1f".join(fields).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _bucket_of(key: Sequence[str], buckets: int) -> int:
+    return zlib.crc32("\x1f".join(key).encode("utf-8")) % buckets
+
+
+def _iter_release(
+    pipeline: BaseCSVPipeline,
+    paths: Sequence[Path],
+    header: list[str] | None,
+) -> Iterator[tuple[tuple[str, ...], list[str]]]:
+    """
+    (chave, linha) de todas as linhas dos arquivos da release. Arquivos com cabeçalho
+    (fieldnames=None) têm a primeira linha lida em header (preenchido na primeira vez).
+    """
+    for path in paths:
+        with open_input(path, pipeline.encoding, pipeline.file_patterns) as source:
+            reader = csv.reader(source.text, delimiter=pipeline.delimiter)
+            names = list(pipeline.fieldnames or next(reader, []))
+            if header is not None and not header:
+                header.extend(names)
+            positions = [names.index(k) for k in pipeline.diff_key_fields]
+            for row in reader:
+                if not row:
+                    continue
+                try:
+                    key = tuple(row[p].strip() for p in positions)
+                except IndexError:
+                    # Linha malformada: segue como alterada para o pipeline contabilizar o erro
+                    key = ("",) * len(positions)
+                yield key, row
+
+
+def _partition(
+    rows: Iterator[tuple[tuple[str, ...], list[str]]],
+    bucket_paths: Sequence[Path],
+    *,
+    full: bool,
+) -> None:
+    """Distribui as linhas nos buckets: chave + linha (full=True) ou chave + hash da linha."""
+    with ExitStack() as stack:
+        writers = [
+            csv.writer(stack.enter_context(p.open("w", newline="", encoding=_BUCKET_ENCODING)))
+            for p in bucket_paths
+        ]
+        for key, row in rows:
+            writer = writers[_bucket_of(key, len(writers))]
+            writer.writerow((*key, *row) if full else (*key, _line_hash(row)))
+
+
+def diff_snapshots(
+    pipeline: BaseCSVPipeline,
+    old_paths: Sequence[Path],
+    new_paths: Sequence[Path],
+    workdir: Path,
+    *,
+    bucket_bytes: int = BUCKET_BYTES,
+) -> SnapshotDiff:
+    """
+    Compara a release anterior (old_paths) com a nova (new_paths), gravando em workdir o
+    CSV de linhas inseridas/alteradas e o de chaves removidas. Ver docstring do módulo.
+    """
+    total = sum(input_size(p, pipeline.file_patterns) for p in new_paths)
+    buckets = max(1, math.ceil(total / bucket_bytes))
+    old_buckets = [workdir / f"old-{i:04d}.csv" for i in range(buckets)]
+    new_buckets = [workdir / f"new-{i:04d}.csv" for i in range(buckets)]
+    key_len = len(pipeline.diff_key_fields)
+
+    logger.info("diff: particionando release anterior (%d arquivo(s), %d buckets)", len(old_paths), buckets)
+    _partition(_iter_release(pipeline, old_paths, None), old_buckets, full=False)
+    logger.info("diff: particionando release nova (%d arquivo(s))", len(new_paths))
+    header: list[str] = []
+    _partition(_iter_release(pipeline, new_paths, header), new_buckets, full=True)
+
+    diff = SnapshotDiff(changes_path=workdir / "changes.csv", removed_path=workdir / "removed.csv")
+    with (
+        diff.changes_path.open("w", newline="", encoding=pipeline.encoding) as changes_file,
+        diff.removed_path.open("w", newline="", encoding=_BUCKET_ENCODING) as removed_file,
+    ):
+        changes = csv.writer(changes_file, delimiter=pipeline.delimiter, quoting=csv.QUOTE_ALL)
+        removed = csv.writer(removed_file)
+        if pipeline.fieldnames is None:
+            changes.writerow(header)
+        for old_path, new_path in zip(old_buckets, new_buckets):
+            with old_path.open(newline="", encoding=_BUCKET_ENCODING) as f:
+                previous = {tuple(r[:key_len]): r[key_len] for r in csv.reader(f)}
+            seen: dict[tuple[str, ...], str] = {}
+            with new_path.open(newline="", encoding=_BUCKET_ENCODING) as f:
+                for record in csv.reader(f):
+                    key, row = tuple(record[:key_len]), record[key_len:]
+                    line_hash = _line_hash(row)
+                    old_hash = seen[key] if key in seen else previous.pop(key, None)
+                    seen[key] = line_hash
+                    if old_hash == line_hash:
+                        diff.unchanged += 1
+                        continue
+                    if old_hash is None:
+                        diff.inserted += 1
+                    else:
+                        diff.changed += 1
+                    changes.writerow(row)
+            removed.writerows(previous)
+            diff.removed += len(previous)
+            old_path.unlink()
+            new_path.unlink()
+    logger.info("diff: %s", diff.summary)
+    return diff
+
+
+def _iter_removed(path: Path, batch_size: int) -> Iterator[list[tuple[str, ...]]]:
+    with path.open(newline="", encoding=_BUCKET_ENCODING) as f:
+        batch: list[tuple[str, ...]] = []
+        for row in csv.reader(f):
+            batch.append(tuple(row))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+async def apply_removals(
+    pipeline_cls: type[BaseCSVPipeline],
+    diff: SnapshotDiff,
+    *,
+    batch_size: int = DELETE_BATCH_SIZE,
+    debug: bool = False,
+) -> dict[str, Any]:
+    """
+    Remove do banco as chaves que saíram da release (delete_batch do pipeline), com um
+    commit por lote. Lotes que falham (ex.: registro ainda referenciado por FK) contam
+    em errors. Retorna {"deleted": n, "errors": n}.
+    """
+    stats = {"deleted": 0, "errors": 0}
+    if not diff.removed:
+        return stats
+    async with get_async_session() as session:
+        pipeline = pipeline_cls(session)
+        for batch in _iter_removed(diff.removed_path, batch_size):
+            try:
+                stats["deleted"] += await pipeline.delete_batch(batch)
+                await session.commit()
+            except Exception:
+                stats["errors"] += len(batch)
+                if debug:
+                    logger.exception("delete: lote de %d chaves falhou", len(batch))
+                await session.rollback()
+    return stats
@@ -0,0 +1,473 @@
+"""
+Carga completa rápida (--fast-full-load): sem índices nem constraints durante o COPY.
+
+Numa primeira carga (ou recarga completa), manter a PK, os índices secundários e as FKs
+linha a linha domina o custo da carga. fast_full_load prepara a tabela antes e a restaura
+depois:
+
+1. lê do catálogo (pg_constraint/pg_index) as definições atuais, criadas pelas migrations:
+   PK/UNIQUE, índices secundários, FKs da tabela e FKs de outras tabelas que apontam para ela;
+2. remove FKs, PK/UNIQUE e índices e esvazia a tabela (TRUNCATE);
+3. após a carga, recria os índices (inclusive os da PK/UNIQUE) em paralelo, um por conexão,
+   e religa PK/UNIQUE com ADD CONSTRAINT ... USING INDEX;
+4. recria as FKs como NOT VALID (sem varrer as tabelas) e as valida em paralelo com
+   VALIDATE CONSTRAINT, que não bloqueia leituras nem escritas; por fim, ANALYZE.
+
+Em tabela particionada (ver app.etl.partitions), PK, índices e FKs são criados em cada partição,
+em paralelo, e depois na tabela mãe, que apenas liga os das partições. O mesmo vale para as FKs
+de uma tabela particionada que apontam para a recarregada (ex.: estabelecimentos -> empresas):
+a tabela mãe não aceita FK NOT VALID. As cópias dessas FKs nas partições não são lidas do
+catálogo; seguem a da mãe.
+
+Cada conexão da reconstrução usa maintenance_work_mem elevado. Uma FK cuja validação falha
+(ex.: estabelecimento de município inexistente) continua NOT VALID, valendo para as linhas
+novas, e é informada em FastLoadReport.invalid.
+
+As definições removidas ficam num arquivo de estado (.etl-<tabela>.ddl.json, ao lado dos
+arquivos de entrada) até a reconstrução terminar: se ela falhar (ex.: chave duplicada na
+release) ou o processo morrer no meio, a próxima execução com --fast-full-load as reaproveita
+em vez de ler do catálogo uma tabela já sem índices. Se a remoção falhar, nada muda e o arquivo
+volta ao que era.
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.etl.partitions import partitions_of
+from app.etl.session import get_async_session
+from app.repositories import EtlCheckpointRepository
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_WORK_MEM = "1GB"
+
+_CONSTRAINTS_SQL = text(
+    """
+    SELECT c.conrelid::regclass::text AS "table",
+           quote_ident(c.conname) AS name,
+           c.contype::text AS kind,
+           pg_get_constraintdef(c.oid) AS definition,
+           CASE WHEN c.contype IN ('p', 'u') THEN pg_get_indexdef(c.conindid) END AS index_def,
+           CASE WHEN c.contype IN ('p', 'u') THEN c.conindid::regclass::text END AS index_name
+    FROM pg_constraint c
+    JOIN pg_class r ON r.oid = c.conrelid
+    -- Constraints de partições (clones das da mãe ou sobras de uma recarga) seguem as da mãe
+    WHERE c.conparentid = 0 AND NOT r.relispartition
+      AND ((c.conrelid = CAST(:table AS regclass) AND c.contype IN ('p', 'u', 'f'))
+        OR (c.confrelid = CAST(:table AS regclass) AND c.contype = 'f'))
+    ORDER BY c.conname
+    """
+)
+
+# Índices que não pertencem a uma constraint (PK/UNIQUE/EXCLUDE) da própria tabela
+_INDEXES_SQL = text(
+    """
+    SELECT i.indexrelid::regclass::text AS name, pg_get_indexdef(i.indexrelid) AS definition
+    FROM pg_index i
+    WHERE i.indrelid = CAST(:table AS regclass)
+      AND NOT EXISTS (
+          SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+      )
+    ORDER BY 1
+    """
+)
+
+_INDEX_TARGET = re.compile(r"^(CREATE (?:UNIQUE )?INDEX )(\S+)( ON )(?:ONLY )?(\S+)")
+
+
+@dataclass
+class Constraint:
+    """Constraint lida do catálogo; index_def/index_name só para PK e UNIQUE."""
+
+    table: str
+    name: str
+    kind: str
+    definition: str
+    index_def: str | None = None
+    index_name: str | None = None
+
+
+@dataclass
+class TableDDL:
+    """Definições removidas de uma tabela para a carga, na forma de recriá-las."""
+
+    table: str
+    keys: list[Constraint] = field(default_factory=list)
+    foreign_keys: list[Constraint] = field(default_factory=list)
+    # (nome, CREATE INDEX ...)
+    indexes: list[tuple[str, str]] = field(default_factory=list)
+
+    def restore_statements(self) -> list[str]:
+        """SQL que recria tudo (usado para o log e para a restauração manual)."""
+        statements = [definition for _, definition in self.indexes]
+        for key in self.keys:
+            statements.append(key.index_def)
+            statements.append(_add_key_sql(key))
+        for fk in self.foreign_keys:
+            definition = fk.definition.removesuffix(" NOT VALID")
+            statements.append(f"ALTER TABLE {fk.table} ADD CONSTRAINT {fk.name} {definition}")
+        return statements
+
+    def merged(self, other: "TableDDL") -> "TableDDL":
+        """
+        Estas definições mais as de other que não existem aqui (mesmo nome). Um índice com o
+        nome do índice de uma PK/UNIQUE (criado por uma reconstrução que parou antes do ADD
+        CONSTRAINT) fica só na constraint.
+        """
+        keys = {(k.table, k.name) for k in self.keys + self.foreign_keys}
+        merged_keys = self.keys + [k for k in other.keys if (k.table, k.name) not in keys]
+        key_indexes = {_unqualified(k.index_name) for k in merged_keys if k.index_name}
+        indexes = set()
+        merged_indexes = []
+        for name, definition in self.indexes + other.indexes:
+            if name not in indexes and _unqualified(name) not in key_indexes:
+                indexes.add(name)
+                merged_indexes.append((name, definition))
+        return TableDDL(
+            table=self.table,
+            keys=merged_keys,
+            foreign_keys=self.foreign_keys + [k for k in other.foreign_keys if (k.table, k.name) not in keys],
+            indexes=merged_indexes,
+        )
+
+
+@dataclass
+class FastLoadReport:
+    """
+    Resultado da reconstrução: FKs que ficaram NOT VALID (tabela.constraint: erro) e, em
+    tabela particionada, FKs que não puderam ser criadas na tabela mãe (tabela.constraint).
+    """
+
+    invalid: list[str] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)
+
+
+def state_path_for(table: str, paths: Sequence[Path]) -> Path:
+    """Arquivo de estado da recarga: .etl-<tabela>.ddl.json no diretório dos arquivos."""
+    return paths[0].parent / f".etl-{table}.ddl.json"
+
+
+_PARTITION_TABLES_SQL = text("SELECT c.oid::regclass::text FROM pg_class c WHERE c.relispartition")
+
+
+def _load_state(path: Path) -> TableDDL | None:
+    try:
+        data = json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+    return TableDDL(
+        table=data["table"],
+        keys=[Constraint(**k) for k in data["keys"]],
+        foreign_keys=[Constraint(**k) for k in data["foreign_keys"]],
+        indexes=[tuple(i) for i in data["indexes"]],
+    )
+
+
+def _unqualified(name: str) -> str:
+    return name.rsplit(".", 1)[-1]
+
+
+def _add_key_sql(key: Constraint) -> str:
+    kind = "PRIMARY KEY" if key.kind == "p" else "UNIQUE"
+    return f"ALTER TABLE {key.table} ADD CONSTRAINT {key.name} {kind} USING INDEX {key.index_name}"
+
+
+def index_on(definition: str, name: str | None, table: str) -> str:
+    """
+    CREATE INDEX de pg_get_indexdef com outro nome e outra tabela (sem ONLY); sem nome
+    (name=None), o Postgres escolhe um que não esteja em uso.
+    """
+    if name is None:
+        return _INDEX_TARGET.sub(lambda m: f"{m[1]}ON {table}", definition, count=1)
+    return _INDEX_TARGET.sub(lambda m: f"{m[1]}{name}{m[3]}{table}", definition, count=1)
+
+
+def _partition_name(name: str, table: str, partition: str) -> str:
+    """
+    Nome da FK na partição: estabelecimentos_pais_fkey -> estabelecimentos_p00_pais_fkey.
+    O prefixo trocado é o maior trecho do nome da tabela com que o nome começa (na
+    estabelecimentos_next, estabelecimentos_pais_fkey -> estabelecimentos_p00_next_pais_fkey).
+    """
+    name = name.rsplit(".", 1)[-1]
+    prefix = table.rsplit(".", 1)[-1]
+    while prefix and not name.startswith(f"{prefix}_"):
+        prefix = prefix.rpartition("_")[0]
+    return partition + name[len(prefix) :] if prefix else f"{partition}_{name}"
+
+
+def foreign_key_statements(fk: Constraint, partitions: Sequence[str]) -> list[str]:
+    """
+    Cria a FK como NOT VALID (sem varrer a tabela), para validar depois (validate_foreign_keys).
+    A tabela mãe de uma tabela particionada não aceita FK NOT VALID: se fk.table tiver
+    partições, a FK vai em cada uma (removendo a sobra de uma recarga anterior cuja FK não foi
+    criada na mãe), e a da mãe só é criada depois da validação.
+    """
+    definition = fk.definition.removesuffix(" NOT VALID")
+    if not partitions:
+        return [f"ALTER TABLE {fk.table} ADD CONSTRAINT {fk.name} {definition} NOT VALID"]
+    statements = []
+    for partition in partitions:
+        name = _partition_name(fk.name, fk.table, partition)
+        statements.append(f"ALTER TABLE {partition} DROP CONSTRAINT IF EXISTS {name}")
+        statements.append(f"ALTER TABLE {partition} ADD CONSTRAINT {name} {definition} NOT VALID")
+    return statements
+
+
+async def validate_foreign_keys(
+    foreign_keys: Sequence[Constraint],
+    partitions: dict[str, Sequence[str]],
+    *,
+    concurrency: int,
+    maintenance_work_mem: str,
+) -> FastLoadReport:
+    """
+    Valida em paralelo (VALIDATE CONSTRAINT, que não bloqueia leituras nem escritas) as FKs
+    criadas por foreign_key_statements; partitions tem as partições de cada tabela (fk.table).
+    Nas tabelas particionadas, cria então a FK na mãe, que encontra as das partições validadas
+    e apenas as liga; se alguma partição não validou, a FK não é criada na mãe (report.missing).
+    """
+    report = FastLoadReport()
+    # (fk, tabela, nome): a FK em cada tabela (ou partição) em que foi criada
+    checks = []
+    for fk in foreign_keys:
+        targets = partitions.get(fk.table) or ()
+        if targets:
+            checks += [(fk, p, _partition_name(fk.name, fk.table, p)) for p in targets]
+        else:
+            checks.append((fk, fk.table, fk.name))
+
+    validations = [f"ALTER TABLE {target} VALIDATE CONSTRAINT {name}" for _, target, name in checks]
+    results = await execute_parallel(validations, concurrency=concurrency, maintenance_work_mem=maintenance_work_mem)
+    failed = set()
+    for (fk, target, name), error in zip(checks, results):
+        if error is not None:
+            logger.warning("%s: FK %s continua NOT VALID: %s", target, name, error)
+            report.invalid.append(f"{target}.{name}: {type(error).__name__}")
+            failed.add((fk.table, fk.name))
+
+    attach = [fk for fk in foreign_keys if partitions.get(fk.table)]
+    if attach:
+        async with get_async_session() as session:
+            for fk in attach:
+                if (fk.table, fk.name) in failed:
+                    logger.warning("%s: FK %s não criada na tabela (há partições com violações)", fk.table, fk.name)
+                    report.missing.append(f"{fk.table}.{fk.name}")
+                    continue
+                definition = fk.definition.removesuffix(" NOT VALID")
+                await session.execute(text(f"ALTER TABLE {fk.table} ADD CONSTRAINT {fk.name} {definition}"))
+    return report
+
+
+async def referencing_partitions(session: AsyncSession, foreign_keys: Sequence[Constraint]) -> dict[str, list[str]]:
+    """Partições de cada tabela com FK em foreign_keys (lista vazia se ela não for particionada)."""
+    return {table: await partitions_of(session, table) for table in {fk.table for fk in foreign_keys}}
+
+
+async def capture_ddl(session: AsyncSession, table: str) -> TableDDL:
+    """Lê do catálogo as constraints e os índices da tabela (e as FKs que apontam para ela)."""
+    ddl = TableDDL(table=table)
+    for row in (await session.execute(_CONSTRAINTS_SQL, {"table": table})).mappings():
+        constraint = Constraint(**row)
+        (ddl.foreign_keys if constraint.kind == "f" else ddl.keys).append(constraint)
+    ddl.indexes = [tuple(row) for row in await session.execute(_INDEXES_SQL, {"table": table})]
+    return ddl
+
+
+async def _drop(session: AsyncSession, ddl: TableDDL, saved: TableDDL) -> None:
+    """
+    Remove as constraints e os índices atuais (ddl). As FKs de saved (o que será recriado)
+    vindas de tabelas particionadas são removidas também das partições: sobras de uma
+    recarga anterior cuja FK não foi criada na mãe (ver validate_foreign_keys).
+    """
+    # FKs primeiro: as que apontam para a tabela dependem do índice da PK
+    for fk in ddl.foreign_keys:
+        await session.execute(text(f"ALTER TABLE {fk.table} DROP CONSTRAINT {fk.name}"))
+    fk_partitions = await referencing_partitions(session, saved.foreign_keys)
+    for fk in saved.foreign_keys:
+        for partition in fk_partitions[fk.table]:
+            name = _partition_name(fk.name, fk.table, partition)
+            await session.execute(text(f"ALTER TABLE {partition} DROP CONSTRAINT IF EXISTS {name}"))
+    for key in ddl.keys:
+        await session.execute(text(f"ALTER TABLE {key.table} DROP CONSTRAINT {key.name}"))
+    for name, _ in ddl.indexes:
+        await session.execute(text(f"DROP INDEX {name}"))
+
+
+async def execute_parallel(
+    statements: Sequence[str],
+    *,
+    concurrency: int,
+    maintenance_work_mem: str,
+) -> list[BaseException | None]:
+    """Executa cada instrução numa conexão própria (até concurrency ao mesmo tempo)."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def execute(statement: str) -> None:
+        async with semaphore, get_async_session() as session:
+            await session.execute(
+                text("SELECT set_config('maintenance_work_mem', :value, false)"),
+                {"value": maintenance_work_mem},
+            )
+            started = time.perf_counter()
+            await session.execute(text(statement))
+            logger.info("%s (%.1fs)", statement, time.perf_counter() - started)
+
+    return await asyncio.gather(*(execute(s) for s in statements), return_exceptions=True)
+
+
+async def rebuild(
+    ddl: TableDDL,
+    *,
+    concurrency: int,
+    maintenance_work_mem: str = MAINTENANCE_WORK_MEM,
+) -> FastLoadReport:
+    """Recria índices, PK/UNIQUE e FKs (NOT VALID + VALIDATE) e roda ANALYZE na tabela."""
+    async with get_async_session() as session:
+        partitions = await partitions_of(session, ddl.table)
+    options = dict(concurrency=concurrency, maintenance_work_mem=maintenance_work_mem)
+    if partitions:
+        return await _rebuild_partitioned(ddl, partitions, **options)
+
+    # Índices (inclusive os das chaves) em paralelo: CREATE INDEX não bloqueia outro CREATE INDEX
+    index_defs = [definition for _, definition in ddl.indexes] + [key.index_def for key in ddl.keys]
+    errors = [e for e in await execute_parallel(index_defs, **options) if e is not None]
+    if errors:
+        # Sem o índice da PK não dá para religar as FKs; a tabela fica como está
+        raise errors[0]
+
+    async with get_async_session() as session:
+        for key in ddl.keys:
+            await session.execute(text(_add_key_sql(key)))
+        # FKs de outras tabelas que apontam para esta podem vir de uma tabela particionada
+        fk_partitions = await referencing_partitions(session, ddl.foreign_keys)
+        for fk in ddl.foreign_keys:
+            for statement in foreign_key_statements(fk, fk_partitions[fk.table]):
+                await session.execute(text(statement))
+
+    report = await validate_foreign_keys(ddl.foreign_keys, fk_partitions, **options)
+    async with get_async_session() as session:
+        await session.execute(text(f"ANALYZE {ddl.table}"))
+    return report
+
+
+async def _rebuild_partitioned(
+    ddl: TableDDL,
+    partitions: Sequence[str],
+    *,
+    concurrency: int,
+    maintenance_work_mem: str,
+) -> FastLoadReport:
+    """
+    rebuild de tabela particionada. Na tabela mãe não há ADD CONSTRAINT ... USING INDEX nem FK
+    NOT VALID, e um CREATE INDEX nela percorre as partições uma a uma; por isso PK/UNIQUE,
+    índices e FKs (NOT VALID + VALIDATE) são criados em cada partição, em paralelo, e só depois
+    na mãe, que encontra os equivalentes prontos nas partições e apenas os liga.
+    Uma FK que não valida em alguma partição fica NOT VALID nela e não é criada na mãe.
+    """
+    options = dict(concurrency=concurrency, maintenance_work_mem=maintenance_work_mem)
+    table = ddl.table
+
+    # Sem nome: o Postgres usa <partição>_pkey etc. ou, se o nome for de uma cópia _old da
+    # recarga blue/green (índices têm nome único no schema), um livre
+    local = []
+    for partition in partitions:
+        local += [f"ALTER TABLE {partition} ADD {key.definition}" for key in ddl.keys]
+        local += [index_on(definition, None, partition) for _, definition in ddl.indexes]
+    errors = [e for e in await execute_parallel(local, **options) if e is not None]
+    if errors:
+        raise errors[0]
+
+    async with get_async_session() as session:
+        for key in ddl.keys:
+            await session.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {key.name} {key.definition}"))
+        for _, definition in ddl.indexes:
+            await session.execute(text(definition.replace(" ON ONLY ", " ON ", 1)))
+        # As FKs da própria tabela vão nas suas partições; as de outras tabelas, conforme a tabela
+        fk_partitions = await referencing_partitions(session, ddl.foreign_keys)
+        for fk in ddl.foreign_keys:
+            for statement in foreign_key_statements(fk, fk_partitions[fk.table]):
+                await session.execute(text(statement))
+
+    report = await validate_foreign_keys(ddl.foreign_keys, fk_partitions, **options)
+    async with get_async_session() as session:
+        await session.execute(text(f"ANALYZE {table}"))
+    return report
+
+
+@asynccontextmanager
+async def fast_full_load(
+    table: str,
+    *,
+    state_path: Path,
+    concurrency: int,
+    maintenance_work_mem: str = MAINTENANCE_WORK_MEM,
+) -> AsyncIterator[FastLoadReport]:
+    """
+    Remove índices e constraints da tabela e a esvazia; ao sair (mesmo com erro na carga),
+    recria tudo (ver rebuild). O relatório entregue é preenchido na saída.
+    Os checkpoints da tabela são apagados junto com os dados.
+    """
+    async with get_async_session() as session:
+        current = await capture_ddl(session, table)
+        partition_tables = set((await session.execute(_PARTITION_TABLES_SQL)).scalars())
+    saved = _load_state(state_path)
+    if saved is None:
+        ddl = current
+    else:
+        logger.warning(
+            "%s: a recarga anterior não recriou índices e constraints; usando as definições de %s",
+            table,
+            state_path.name,
+        )
+        # FKs de partições vêm das da tabela mãe (estados gravados antes de capture_ddl ignorá-las)
+        saved.foreign_keys = [fk for fk in saved.foreign_keys if fk.table not in partition_tables]
+        ddl = saved.merged(current)
+    state_path.write_text(json.dumps(asdict(ddl), indent=2))
+    logger.info("%s: removendo índices e constraints; para restaurar manualmente:", table)
+    for statement in ddl.restore_statements():
+        logger.info("  %s;", statement)
+    try:
+        async with get_async_session() as session:
+            await _drop(session, current, ddl)
+            await session.execute(text(f"TRUNCATE {table}"))
+            await EtlCheckpointRepository(session).delete_table(table)
+    except BaseException:
+        # Transação desfeita: nada foi removido, e o estado volta a ser o de antes
+        if saved is None:
+            state_path.unlink(missing_ok=True)
+        else:
+            state_path.write_text(json.dumps(asdict(saved), indent=2))
+        raise
+
+    report = FastLoadReport()
+    try:
+        yield report
+    finally:
+        started = time.perf_counter()
+        try:
+            result = await rebuild(ddl, concurrency=concurrency, maintenance_work_mem=maintenance_work_mem)
+        except Exception:
+            logger.error(
+                "%s: falha ao recriar índices e constraints; definições mantidas em %s "
+                "(corrija a causa e repita a recarga)",
+                table,
+                state_path,
+            )
+            raise
+        report.invalid = result.invalid
+        report.missing = result.missing
+        if result.missing:
+            # A próxima recarga com --fast-full-load recria as que faltam a partir do estado
+            logger.warning("%s: definições mantidas em %s", table, state_path)
+        else:
+            state_path.unlink()
+        logger.info("%s: índices e constraints recriados em %.1fs", table, time.perf_counter() - started)
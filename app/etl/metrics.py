@@ -0,0 +1,244 @@
+"""
+Instrumentação da carga: tempo por etapa, vazão, latência dos lotes e memória.
+
+Cada run de um pipeline preenche um RunMetrics (pipeline.metrics) com:
+
+- stages: segundos em cada etapa (STAGES). read é a leitura do arquivo com a decodificação;
+  parse, o csv.reader; transform, a conversão das linhas (column_specs, códigos de domínio,
+  row_hash); queue_wait, o tempo em que a escrita esperou por lotes convertidos (da thread de
+  leitura ou, com --workers N, dos workers); reader_wait, o tempo em que a thread de leitura
+  esperou a escrita, com a fila cheia; write, os lotes no banco (ORM, COPY ou upsert, com a
+  bisseção; com writers > 1, somando as conexões); commit, os commits com checkpoint. Leitura
+  e escrita correm em paralelo, e com workers read/parse/transform somam o tempo de todos eles:
+  as etapas podem passar da duração;
+- a série de linhas/s e bytes/s (um ponto a cada SAMPLE_INTERVAL segundos, no máximo);
+- percentis da latência dos lotes gravados (write) e o pico de memória (RSS) do processo e
+  dos workers;
+- round_trips: idas ao banco (comandos SQL e COPYs) da run, contadas por count_round_trip
+  na task em que ela roda (ver current_metrics e app.etl.session).
+
+Os timers são por bloco de linhas e por lote, não por linha, para não pesar na carga.
+write_json_report e write_prometheus gravam os resultados de uma execução (um ou mais
+arquivos) como JSON e no formato de textfile do node_exporter.
+"""
+import json
+import os
+import resource
+import sys
+import time
+from collections.abc import Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+STAGES = ("read", "parse", "transform", "queue_wait", "reader_wait", "write", "commit")
+
+# Intervalo mínimo (segundos) entre dois pontos da série de vazão
+SAMPLE_INTERVAL = 1.0
+
+PERCENTILES = (50, 90, 99)
+
+# Prefixo das métricas no textfile do Prometheus
+METRIC_PREFIX = "cnpj_etl"
+
+# ru_maxrss vem em KiB no Linux e em bytes no macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def _percentile(ordered: Sequence[float], percent: int) -> float:
+    """Percentil (nearest-rank) de valores já ordenados; 0 sem valores."""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[rank - 1]
+
+
+@dataclass
+class RunMetrics:
+    """Métricas da carga de um arquivo (ver o docstring do módulo)."""
+
+    table: str
+    source: str
+    mode: str
+    workers: int = 1
+    # Posição (bytes, linha) de onde a carga começou (retomada: a do checkpoint)
+    start: tuple[int, int] = (0, 0)
+    started_at: float = field(default_factory=time.time)
+    seconds: float = 0.0
+    stages: dict[str, float] = field(default_factory=lambda: dict.fromkeys(STAGES, 0.0))
+    batch_seconds: list[float] = field(default_factory=list)
+    # (segundos desde o início, linhas lidas, bytes lidos)
+    series: list[tuple[float, int, int]] = field(default_factory=list)
+    rows: int = 0
+    bytes: int = 0
+    stats: dict[str, int] = field(default_factory=dict)
+    ok: bool = False
+    peak_rss_bytes: int = 0
+    peak_rss_workers_bytes: int = 0
+    round_trips: int = 0
+    _clock: float = field(default_factory=time.perf_counter, repr=False)
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] += seconds
+
+    def batch(self, seconds: float) -> None:
+        """Um lote gravado no banco (etapa write)."""
+        self.stages["write"] += seconds
+        self.batch_seconds.append(seconds)
+
+    def sample(self, position: tuple[int, int], *, force: bool = False) -> None:
+        """Registra a posição (bytes, linha) já carregada; vira ponto da série a cada SAMPLE_INTERVAL."""
+        self.bytes = position[0] - self.start[0]
+        self.rows = position[1] - self.start[1]
+        elapsed = time.perf_counter() - self._clock
+        if force or not self.series or elapsed - self.series[-1][0] >= SAMPLE_INTERVAL:
+            self.series.append((elapsed, self.rows, self.bytes))
+
+    def finish(self, stats: dict[str, int], *, ok: bool) -> None:
+        self.seconds = time.perf_counter() - self._clock
+        self.stats = dict(stats)
+        self.ok = ok
+        if not self.series or self.series[-1][1:] != (self.rows, self.bytes):
+            self.series.append((self.seconds, self.rows, self.bytes))
+        if not self.rows:
+            # Sem posição no arquivo (ex.: --replay-rejects): linhas que passaram pela carga
+            rejects = sum(v for k, v in stats.items() if k.startswith("rejects."))
+            self.rows = stats.get("processed", 0) + stats.get("duplicates", 0) + rejects
+        self.peak_rss_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+        self.peak_rss_workers_bytes = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * _RSS_UNIT
+
+    def batch_percentiles(self) -> dict[str, float]:
+        ordered = sorted(self.batch_seconds)
+        result = {f"p{p}": _percentile(ordered, p) for p in PERCENTILES}
+        result["max"] = ordered[-1] if ordered else 0.0
+        return result
+
+    def rate(self, value: int) -> float:
+        return value / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        series = []
+        last_t, last_rows, last_bytes = 0.0, 0, 0
+        for t, rows, size in self.series:
+            if t > last_t:
+                series.append(
+                    {
+                        "t": round(t, 3),
+                        "rows_per_sec": round((rows - last_rows) / (t - last_t), 1),
+                        "bytes_per_sec": round((size - last_bytes) / (t - last_t), 1),
+                    }
+                )
+                last_t, last_rows, last_bytes = t, rows, size
+        return {
+            "table": self.table,
+            "source": self.source,
+            "mode": self.mode,
+            "workers": self.workers,
+            "ok": self.ok,
+            "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            "seconds": round(self.seconds, 3),
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "rows_per_sec": round(self.rate(self.rows), 1),
+            "bytes_per_sec": round(self.rate(self.bytes), 1),
+            "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+            "batches": {"count": len(self.batch_seconds), **self.batch_percentiles()},
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "peak_rss_workers_bytes": self.peak_rss_workers_bytes,
+            "round_trips": self.round_trips,
+            "stats": self.stats,
+            "series": series,
+        }
+
+    def summary(self) -> str:
+        """Linha de log: tempo por etapa, vazão e p99 dos lotes."""
+        stages = " ".join(f"{name}={seconds:.2f}s" for name, seconds in self.stages.items() if seconds)
+        return (
+            f"{self.seconds:.2f}s ({stages}); {self.rate(self.rows):.0f} linhas/s, "
+            f"{self.rate(self.bytes) / 1e6:.1f} MB/s; lote p99={self.batch_percentiles()['p99'] * 1000:.0f}ms"
+        )
+
+
+# Métricas da run em andamento na task atual (cada arquivo de run_files roda na sua task)
+current_metrics: ContextVar[RunMetrics | None] = ContextVar("etl_current_metrics", default=None)
+
+
+def count_round_trip() -> None:
+    """Conta uma ida ao banco na run em andamento, se houver."""
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.round_trips += 1
+
+
+def write_json_report(path: Path, runs: Sequence[RunMetrics]) -> None:
+    """Relatório JSON da execução: um item por arquivo carregado."""
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "runs": [run.to_dict() for run in runs],
+    }
+    _write_atomic(path, json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+
+
+def _labels(labels: dict[str, str]) -> str:
+    """Rótulos no formato de exposição do Prometheus (valores com \\, " e \n escapados)."""
+    pairs = []
+    for name, value in labels.items():
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def write_prometheus(path: Path, runs: Sequence[RunMetrics]) -> None:
+    """
+    Métricas no formato de textfile do node_exporter (--collector.textfile.directory), com os
+    rótulos table e file. O arquivo é substituído atomicamente (o coletor nunca lê pela metade).
+    """
+    families: dict[str, tuple[str, str, list[str]]] = {}
+
+    def metric(name: str, kind: str, help_text: str, labels: dict[str, str], value: float) -> None:
+        full = f"{METRIC_PREFIX}_{name}"
+        family = families.setdefault(full.removesuffix("_sum").removesuffix("_count"), (kind, help_text, []))
+        family[2].append(f"{full}{_labels(labels)} {value if isinstance(value, int) else round(value, 6)!r}")
+
+    for run in runs:
+        labels = {"table": run.table, "file": Path(run.source).name}
+        metric("success", "gauge", "1 se a última carga do arquivo concluiu", labels, int(run.ok))
+        metric("last_run_timestamp_seconds", "gauge", "Início da última carga (epoch)", labels, run.started_at)
+        metric("duration_seconds", "gauge", "Duração da carga", labels, run.seconds)
+        for stage, seconds in run.stages.items():
+            metric("stage_seconds", "gauge", "Tempo por etapa da carga", {**labels, "stage": stage}, seconds)
+        metric("rows", "gauge", "Linhas lidas do arquivo", labels, run.rows)
+        metric("bytes", "gauge", "Bytes lidos do arquivo", labels, run.bytes)
+        metric("db_round_trips", "gauge", "Idas ao banco (comandos SQL e COPYs)", labels, run.round_trips)
+        metric("rows_per_second", "gauge", "Vazão média em linhas/s", labels, run.rate(run.rows))
+        metric("bytes_per_second", "gauge", "Vazão média em bytes/s", labels, run.rate(run.bytes))
+        for key in ("processed", "inserted", "updated", "skipped", "errors", "duplicates"):
+            metric("records", "gauge", "Registros por resultado", {**labels, "result": key}, run.stats.get(key, 0))
+        for key, value in run.stats.items():
+            if key.startswith("rejects."):
+                reason = key.removeprefix("rejects.")
+                metric("rejects", "gauge", "Linhas rejeitadas por motivo", {**labels, "reason": reason}, value)
+        percentiles = run.batch_percentiles()
+        for p in PERCENTILES:
+            quantile = {**labels, "quantile": str(p / 100)}
+            metric("batch_seconds", "summary", "Latência dos lotes gravados", quantile, percentiles[f"p{p}"])
+        metric("batch_seconds_sum", "summary", "", labels, sum(run.batch_seconds))
+        metric("batch_seconds_count", "summary", "", labels, len(run.batch_seconds))
+        metric("peak_rss_bytes", "gauge", "Pico de memória (RSS)", {**labels, "process": "main"}, run.peak_rss_bytes)
+        metric("peak_rss_bytes", "gauge", "", {**labels, "process": "workers"}, run.peak_rss_workers_bytes)
+
+    lines = []
+    for name, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(content, encoding="utf-8")
+    os.replace(tmp, path)
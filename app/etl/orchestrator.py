@@ -0,0 +1,185 @@
+"""
+Carga de uma release completa da Receita (python -m app.etl all <diretório>).
+
+Os arquivos do diretório são atribuídos aos pipelines pelos padrões de nome (file_patterns) e
+cada pipeline com arquivos vira uma etapa. A ordem vem das FKs dos modelos (metadata do
+SQLAlchemy): uma etapa começa assim que terminam as etapas das tabelas que ela referencia, e
+etapas independentes rodam ao mesmo tempo. Na release completa:
+
+    paises, municipios, cnaes, motivos, naturezas, qualificacoes  (juntas)
+    -> empresas (assim que naturezas e qualificacoes terminam)
+    -> estabelecimentos e simples (juntas)
+
+Uma tabela referenciada que não tem arquivo na release não gera dependência (já está no banco).
+Se uma etapa falha, as que dependem dela não rodam: suas linhas violariam as FKs. As conexões
+de todas as etapas em andamento (uma por writer de cada arquivo), somadas, respeitam o pool do
+banco (max_concurrency).
+"""
+import asyncio
+import fnmatch
+import logging
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from graphlib import TopologicalSorter
+from pathlib import Path
+from typing import Any
+
+from app.etl.base import BaseCSVPipeline
+from app.etl.metrics import RunMetrics
+from app.etl.runner import FileSetReport, input_files, max_concurrency, run_files, status_path_for
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Stage:
+    """Etapa da release: um pipeline, seus arquivos e as etapas de que depende (FKs)."""
+
+    name: str
+    pipeline_cls: type[BaseCSVPipeline]
+    paths: list[Path]
+    depends_on: set[str] = field(default_factory=set)
+
+
+@dataclass
+class StageResult:
+    """Resultado de uma etapa; report é None se ela não rodou (skipped diz por quê)."""
+
+    stage: Stage
+    report: FileSetReport | None = None
+    seconds: float = 0.0
+    skipped: str | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.report is not None and self.error is None and not self.report.failed
+
+
+@dataclass
+class ReleaseReport:
+    """Resultado da release: uma entrada por etapa, na ordem em que começaram."""
+
+    results: list[StageResult] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def totals(self) -> dict[str, int]:
+        totals: dict[str, int] = {}
+        for result in self.results:
+            if result.report is not None:
+                for key, value in result.report.totals.items():
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+    @property
+    def failed(self) -> list[StageResult]:
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def metrics(self) -> list[RunMetrics]:
+        return [m for result in self.results if result.report is not None for m in result.report.metrics]
+
+
+def _referenced_tables(pipeline_cls: type[BaseCSVPipeline]) -> set[str]:
+    table = pipeline_cls.model.__table__
+    return {fk.column.table.name for fk in table.foreign_keys} - {table.name}
+
+
+def detect_stages(
+    directory: Path,
+    pipelines: Mapping[str, type[BaseCSVPipeline]],
+) -> tuple[list[Stage], list[Path]]:
+    """
+    Etapas da release no diretório (pipelines com ao menos um arquivo) e os arquivos que não
+    casam com nenhum pipeline. ValueError se um arquivo casar com mais de um.
+    """
+    files = input_files(directory, ["*"])
+    owner: dict[Path, str] = {}
+    stages = []
+    for name, pipeline_cls in pipelines.items():
+        paths = [f for f in files if any(fnmatch.fnmatch(f.name, p) for p in pipeline_cls.file_patterns)]
+        for path in paths:
+            if path in owner:
+                raise ValueError(f"{path.name} casa com os pipelines {owner[path]} e {name}")
+            owner[path] = name
+        if paths:
+            stages.append(Stage(name, pipeline_cls, paths))
+
+    by_table = {stage.pipeline_cls.model.__tablename__: stage.name for stage in stages}
+    for stage in stages:
+        stage.depends_on = {by_table[t] for t in _referenced_tables(stage.pipeline_cls) if t in by_table}
+    return stages, [f for f in files if f not in owner]
+
+
+async def run_release(
+    stages: Sequence[Stage],
+    *,
+    concurrency: int = 4,
+    workers: int = 1,
+    stage_workers: Mapping[str, int] | None = None,
+    retry_failed: bool = False,
+    **run_kwargs: Any,
+) -> ReleaseReport:
+    """
+    Executa as etapas na ordem das dependências, com as independentes ao mesmo tempo.
+    Cada etapa importa seus arquivos com run_files (até concurrency por vez) e workers
+    processos de leitura por arquivo (ou o valor de stage_workers para a etapa). O status de
+    cada etapa vai para .etl-<tabela>.status.json, para retry_failed.
+    """
+    stage_workers = stage_workers or {}
+    by_name = {stage.name: stage for stage in stages}
+    sorter = TopologicalSorter({stage.name: stage.depends_on for stage in stages})
+    sorter.prepare()
+    # Uma vaga por arquivo em andamento, que ocupa uma conexão por writer
+    connections = asyncio.Semaphore(max(1, max_concurrency() // run_kwargs.get("writers", 1)))
+    results: dict[str, StageResult] = {}
+    order: list[str] = []
+    started = time.perf_counter()
+
+    async def run_stage(stage: Stage) -> StageResult:
+        logger.info("%s: iniciando (%d arquivo(s))", stage.name, len(stage.paths))
+        result = StageResult(stage)
+        stage_started = time.perf_counter()
+        try:
+            result.report = await run_files(
+                stage.pipeline_cls,
+                stage.paths,
+                concurrency=concurrency,
+                show_progress=False,
+                status_path=status_path_for(stage.pipeline_cls, stage.paths),
+                retry_failed=retry_failed,
+                connections=connections,
+                workers=stage_workers.get(stage.name, workers),
+                **run_kwargs,
+            )
+        except Exception as exc:
+            logger.exception("%s: etapa falhou", stage.name)
+            result.error = f"{type(exc).__name__}: {exc}"
+        result.seconds = time.perf_counter() - stage_started
+        logger.info("%s: %s em %.1fs", stage.name, "concluída" if result.ok else "FALHOU", result.seconds)
+        return result
+
+    running: dict[asyncio.Task[StageResult], str] = {}
+    while sorter.is_active():
+        for name in sorter.get_ready():
+            stage = by_name[name]
+            failed = sorted(d for d in stage.depends_on if not results[d].ok)
+            if failed:
+                logger.warning("%s: não executada (dependência com falha: %s)", name, ", ".join(failed))
+                results[name] = StageResult(stage, skipped=f"dependência com falha: {', '.join(failed)}")
+                order.append(name)
+                sorter.done(name)
+                continue
+            running[asyncio.create_task(run_stage(stage))] = name
+            order.append(name)
+        if not running:
+            continue
+        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            name = running.pop(task)
+            results[name] = task.result()
+            sorter.done(name)
+
+    return ReleaseReport([results[name] for name in order], time.perf_counter() - started)
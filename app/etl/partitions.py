@@ -0,0 +1,135 @@
+"""
+Tabelas particionadas no ETL.
+
+estabelecimentos é particionada por HASH(cnpj_basico) com a classe de operadores
+cnpj_basico_partition_ops (ver a migration a4f2c81d6b37), em que a partição de um cnpj_basico
+numérico é int(cnpj_basico) % modulus. Com isso o ETL sabe, sem ir ao banco, a partição de cada
+registro:
+
+- no modo "copy", cada lote é separado por partição e vai num COPY direto para cada uma (sem o
+  roteamento de tuplas da tabela mãe e com locks só nas partições tocadas). Os COPYs de um
+  lote rodam um após o outro, na sessão e na transação do arquivo (a do checkpoint);
+- com writers > 1, cada partição fica com um só writer (ver BaseCSVPipeline._split_by_writer),
+  e partições de writers diferentes são gravadas ao mesmo tempo, cada uma na sua conexão;
+- fast_full_load recria PK, índices e FKs partição a partição, em paralelo, e só então os liga
+  à tabela mãe (ver app.etl.fastload);
+- --swap cria <tabela>_next com o mesmo particionamento e troca as partições junto com a tabela
+  (ver app.etl.swap).
+"""
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Classe de operadores cuja partição é calculável em Python (ver HashPartitions.partition_of)
+PARTITION_OPCLASS = "cnpj_basico_partition_ops"
+
+_PARTITIONS_SQL = text(
+    """
+    SELECT c.oid::regclass::text AS name, pg_get_expr(c.relpartbound, c.oid) AS bound
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = CAST(:table AS regclass)
+    ORDER BY 1
+    """
+)
+
+_PARTKEY_SQL = text("SELECT pg_get_partkeydef(CAST(:table AS regclass))")
+
+_KEY_SQL = text(
+    """
+    SELECT p.partstrat::text AS strategy, a.attname AS column, o.opcname AS opclass
+    FROM pg_partitioned_table p
+    JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+    JOIN pg_opclass o ON o.oid = p.partclass[0]
+    WHERE p.partrelid = CAST(:table AS regclass) AND p.partnatts = 1
+    """
+)
+
+# Conferência da fórmula com o próprio Postgres (a função de hash é definida pela migration)
+_CHECK_SQL = text(
+    "SELECT satisfies_hash_partition(CAST(:table AS regclass), :modulus, :remainder, CAST(:value AS text))"
+)
+_CHECK_VALUE = "33683111"
+
+_HASH_BOUND = re.compile(r"FOR VALUES WITH \(modulus (\d+), remainder (\d+)\)")
+
+
+@dataclass
+class HashPartitions:
+    """Partições (por resto) de uma tabela particionada por HASH com PARTITION_OPCLASS."""
+
+    table: str
+    column: str
+    modulus: int
+    names: list[str]
+
+    def remainder(self, value: str) -> int | None:
+        """Resto (índice da partição) do valor da chave; None se não numérico."""
+        if value.isascii() and value.isdigit():
+            return int(value) % self.modulus
+        return None
+
+    def partition_of(self, value: str) -> str:
+        """Partição do valor da chave; valores não numéricos ficam com a tabela mãe (roteamento do banco)."""
+        if value.isascii() and value.isdigit():
+            return self.names[int(value) % self.modulus]
+        return self.table
+
+    def route(self, records: Sequence[tuple[Any, ...]], columns: Sequence[str]) -> dict[str, list[tuple[Any, ...]]]:
+        """Separa os registros (tuplas na ordem de columns) pela partição de destino."""
+        index = list(columns).index(self.column)
+        groups: dict[str, list[tuple[Any, ...]]] = {}
+        for record in records:
+            groups.setdefault(self.partition_of(record[index]), []).append(record)
+        return groups
+
+
+async def partitions_of(session: AsyncSession, table: str) -> list[str]:
+    """Partições da tabela (vazio se ela não for particionada)."""
+    return [row.name for row in await session.execute(_PARTITIONS_SQL, {"table": table})]
+
+
+async def partition_layout(session: AsyncSession, table: str) -> tuple[str, dict[str, str]] | None:
+    """
+    Chave de particionamento (ex.: "HASH (cnpj_basico cnpj_basico_partition_ops)") e limites de
+    cada partição (ex.: "FOR VALUES WITH (modulus 16, remainder 0)"); None se a tabela não for
+    particionada. É o que falta a um CREATE TABLE ... (LIKE tabela) para reproduzi-la.
+    """
+    key = (await session.execute(_PARTKEY_SQL, {"table": table})).scalar_one()
+    if key is None:
+        return None
+    bounds = {row.name: row.bound for row in await session.execute(_PARTITIONS_SQL, {"table": table})}
+    return key, bounds
+
+
+async def hash_partitions(session: AsyncSession, table: str) -> HashPartitions | None:
+    """
+    Partições da tabela se ela for particionada por HASH de uma coluna com PARTITION_OPCLASS,
+    todas com o mesmo modulus; senão None (a carga vai para a própria tabela).
+    """
+    key = (await session.execute(_KEY_SQL, {"table": table})).one_or_none()
+    if key is None or key.strategy != "h" or key.opclass != PARTITION_OPCLASS:
+        return None
+    bounds = {}
+    for row in await session.execute(_PARTITIONS_SQL, {"table": table}):
+        match = _HASH_BOUND.fullmatch(row.bound)
+        if match is None:
+            return None
+        bounds[int(match[1]), int(match[2])] = row.name
+    moduli = {modulus for modulus, _ in bounds}
+    if len(moduli) != 1:
+        return None
+    modulus = moduli.pop()
+    if len(bounds) != modulus:
+        return None
+    partitions = HashPartitions(table, key.column, modulus, [bounds[modulus, r] for r in range(modulus)])
+
+    remainder = int(_CHECK_VALUE) % modulus
+    check = {"table": table, "modulus": modulus, "remainder": remainder, "value": _CHECK_VALUE}
+    if not (await session.execute(_CHECK_SQL, check)).scalar_one():
+        raise RuntimeError(f"{table}: a partição calculada pelo ETL difere da do banco ({PARTITION_OPCLASS})")
+    return partitions
@@ -11,6 +11,7 @@ from decimal import Decimal
 from collections.abc import Sequence
 
 from app.etl.base import BaseCSVPipeline
+from app.etl.columns import ColumnSpec, parse_decimal
 from app.models.empresa import Empresa
 from app.repositories.empresa import EmpresaRepository
 
@@ -28,7 +29,18 @@ class EmpresasPipeline(BaseCSVPipeline):
         "ente_federativo",
     )
     encoding = "latin-1"  # Arquivos Receita Federal
+    model = Empresa
+    file_patterns = ("*EMPRECSV*", "Empresas*.zip")
     expected_columns = set(fieldnames)
+    column_specs = (
+        ColumnSpec("cnpj_basico", 0, max_len=10, required=True),
+        ColumnSpec("razao_social", 1, required=True),
+        ColumnSpec("natureza_juridica", 2, max_len=7, default="", cache=True),
+        ColumnSpec("qualificacao_responsavel", 3, max_len=7, default="", cache=True),
+        ColumnSpec("capital_social", 4, type=parse_decimal, default=Decimal("0.00"), cache=True),
+        ColumnSpec("porte_empresa", 5, max_len=2, default="00", cache=True),
+        ColumnSpec("ente_federativo", 6, cache=True),
+    )
 
     def __init__(self, session):
         super().__init__(session)
@@ -39,60 +51,10 @@ class EmpresasPipeline(BaseCSVPipeline):
         if missing:
             raise ValueError(f"Colunas obrigatórias ausentes no CSV: {missing}")
 
-    def _parse_capital_social(self, raw: str) -> Decimal:
-        """Converte valor com vírgula decimal (ex: '1000,00') para Decimal."""
-        if not raw or not raw.strip():
-            return Decimal("0.00")
-        # Remove espaços e troca vírgula por ponto
-        normalized = (raw.strip()).replace(",", ".")
-        try:
-            return Decimal(normalized)
-        except Exception:
-            return Decimal("0.00")
-
-    def transform_row(self, row: dict[str, str]) -> Empresa | None:
-        cnpj_basico = (row.get("cnpj_basico") or "").strip()
-        razao_social = (row.get("razao_social") or "").strip()
-        if not cnpj_basico or not razao_social:
-            return None
-
-        natureza_juridica = (row.get("natureza_juridica") or "").strip()
-        qualificacao_responsavel = (row.get("qualificacao_responsavel") or "").strip()
-        capital_social = self._parse_capital_social(row.get("capital_social") or "0,00")
-        porte_empresa = (row.get("porte_empresa") or "").strip() or "00"
-        ente_raw = (row.get("ente_federativo") or "").strip()
-        ente_federativo = ente_raw if ente_raw else None
-
-        return Empresa(
-            cnpj_basico=cnpj_basico[:10],
-            razao_social=razao_social,
-            natureza_juridica=natureza_juridica[:7],
-            qualificacao_responsavel=qualificacao_responsavel[:7],
-            capital_social=capital_social,
-            porte_empresa=porte_empresa[:2],
-            ente_federativo=ente_federativo,
-        )
+    async def fetch_existing(self, keys: Sequence[tuple[str]]) -> dict[tuple[str], Empresa]:
+        """Busca os registros já existentes do lote por cnpj_basico, numa única consulta."""
+        found = await self._repo.get_many_by_cnpj_basico([cnpj_basico for (cnpj_basico,) in keys])
+        return {(m.cnpj_basico,): m for m in found}
 
-    async def _persist_one(self, model: Empresa) -> str:
-        """Insere ou atualiza uma empresa por cnpj_basico via repository."""
-        existing = await self._repo.get_by_cnpj_basico(model.cnpj_basico)
-        if existing is not None:
-            if (
-                existing.razao_social == model.razao_social
-                and existing.natureza_juridica == model.natureza_juridica
-                and existing.qualificacao_responsavel == model.qualificacao_responsavel
-                and existing.capital_social == model.capital_social
-                and existing.porte_empresa == model.porte_empresa
-                and existing.ente_federativo == model.ente_federativo
-            ):
-                return "skipped"
-            existing.razao_social = model.razao_social
-            existing.natureza_juridica = model.natureza_juridica
-            existing.qualificacao_responsavel = model.qualificacao_responsavel
-            existing.capital_social = model.capital_social
-            existing.porte_empresa = model.porte_empresa
-            existing.ente_federativo = model.ente_federativo
-            await self._repo.update(existing)
-            return "updated"
-        await self._repo.create(model)
-        return "inserted"
+    async def save_batch(self, models: Sequence[Empresa]) -> None:
+        await self._repo.create_many(models)
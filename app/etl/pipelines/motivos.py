@@ -9,6 +9,7 @@ Arquivo sem cabeçalho (encoding Latin-1, separador ;, aspas duplas):
 from collections.abc import Sequence
 
 from app.etl.base import BaseCSVPipeline
+from app.etl.columns import ColumnSpec
 from app.models.motivo import Motivo
 from app.repositories.motivo import MotivoRepository
 
@@ -18,7 +19,13 @@ class MotivosPipeline(BaseCSVPipeline):
 
     fieldnames = ("codigo", "descricao")
     encoding = "latin-1"  # Arquivos Receita Federal
+    model = Motivo
+    file_patterns = ("*MOTICSV*", "Motivos*.zip")
     expected_columns = {"codigo", "descricao"}
+    column_specs = (
+        ColumnSpec("codigo", 0, max_len=7, required=True),
+        ColumnSpec("descricao", 1, required=True),
+    )
 
     def __init__(self, session):
         super().__init__(session)
@@ -29,21 +36,10 @@ class MotivosPipeline(BaseCSVPipeline):
         if missing:
             raise ValueError(f"Colunas obrigatórias ausentes no CSV: {missing}")
 
-    def transform_row(self, row: dict[str, str]) -> Motivo | None:
-        codigo = (row.get("codigo") or "").strip()
-        descricao = (row.get("descricao") or "").strip()
-        if not codigo or not descricao:
-            return None
-        return Motivo(codigo=codigo[:7], descricao=descricao)
-
-    async def _persist_one(self, model: Motivo) -> str:
-        """Insere ou atualiza um motivo por código via repository; ignora se já estiver igual (skipped)."""
-        existing = await self._repo.get_by_codigo(model.codigo)
-        if existing is not None:
-            if existing.descricao == model.descricao:
-                return "skipped"
-            existing.descricao = model.descricao
-            await self._repo.update(existing)
-            return "updated"
-        await self._repo.create(model)
-        return "inserted"
+    async def fetch_existing(self, keys: Sequence[tuple[str]]) -> dict[tuple[str], Motivo]:
+        """Busca os registros já existentes do lote por código, numa única consulta."""
+        found = await self._repo.get_many_by_codigo([codigo for (codigo,) in keys])
+        return {(m.codigo,): m for m in found}
+
+    async def save_batch(self, models: Sequence[Motivo]) -> None:
+        await self._repo.create_many(models)
@@ -0,0 +1 @@
+# Leitores de arquivos de entrada do ETL (faixas de bytes em paralelo etc.).
@@ -0,0 +1,116 @@
+"""
+Abertura dos arquivos de entrada do ETL: CSV em disco ou direto do .zip oficial da Receita.
+
+Para .zip, o membro é lido em streaming (zipfile + TextIOWrapper, que decodifica de forma
+incremental), sem extrair para disco. O progresso é medido em bytes comprimidos: a posição
+do arquivo .zip subjacente avança conforme o membro é descomprimido.
+"""
+import codecs
+import fnmatch
+import io
+import mmap
+import time
+import zipfile
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, TextIO
+
+# Bytes lidos por vez em OffsetLines
+_READ_BYTES = 64 * 1024
+
+
+@dataclass
+class InputSource:
+    """
+    Entrada aberta: texto decodificado, posição atual em bytes e tamanho total (em disco).
+    binary é o fluxo de bytes sob o texto (o CSV ou o membro do .zip), para quem precisa dos
+    offsets dos registros (ver OffsetLines); use text ou binary, não os dois.
+    """
+
+    text: TextIO
+    position: Callable[[], int]
+    size: int
+    compressed: bool = False
+    binary: BinaryIO | None = None
+
+
+class OffsetLines:
+    """
+    Linhas decodificadas de um fluxo binário, mantendo em offset a posição (em bytes do
+    fluxo) logo após a última linha entregue. Como o csv.reader só puxa as linhas de que
+    precisa, depois de cada registro lido offset é exatamente o fim desse registro.
+    seconds acumula o tempo gasto lendo e decodificando as linhas (etapa read, ver app.etl.metrics).
+    """
+
+    def __init__(self, binary: BinaryIO, encoding: str, offset: int = 0) -> None:
+        self.offset = offset
+        self.seconds = 0.0
+        self._binary = binary
+        self._decode = codecs.getincrementaldecoder(encoding)().decode
+
+    def __iter__(self) -> Iterator[str]:
+        decode = self._decode
+        readlines = self._binary.readlines
+        clock = time.perf_counter
+        # Lê e decodifica em blocos de ~_READ_BYTES: um timer por bloco, não por linha
+        while True:
+            started = clock()
+            raws = readlines(_READ_BYTES)
+            lines = [decode(raw) for raw in raws]
+            self.seconds += clock() - started
+            if not raws:
+                return
+            for raw, line in zip(raws, lines):
+                self.offset += len(raw)
+                yield line
+
+
+def is_zip(path: Path) -> bool:
+    return path.suffix.lower() == ".zip"
+
+
+def _pick_member(zf: zipfile.ZipFile, patterns: Sequence[str]) -> zipfile.ZipInfo:
+    """Membro a importar: o único arquivo do .zip ou o primeiro que casa com patterns."""
+    members = [m for m in zf.infolist() if not m.is_dir()]
+    if len(members) == 1:
+        return members[0]
+    for member in members:
+        if any(fnmatch.fnmatch(member.filename, p) for p in patterns):
+            return member
+    raise ValueError(f"Não foi possível escolher o arquivo dentro do zip: {[m.filename for m in members]}")
+
+
+def input_size(path: Path, patterns: Sequence[str] = ()) -> int:
+    """Tamanho dos dados em bytes: o do arquivo ou, no .zip, o do membro descomprimido."""
+    if not is_zip(path):
+        return path.stat().st_size
+    with zipfile.ZipFile(path) as zf:
+        return _pick_member(zf, patterns).file_size
+
+
+def count_lines(path: Path, chunk_bytes: int = 64 * 1024 * 1024) -> int:
+    """
+    Número exato de linhas (b"\\n") de um arquivo em disco, contado em blocos sobre um mmap,
+    sem decodificar o texto. A carga não usa (o progresso é em bytes); serve quando a
+    contagem exata for necessária.
+    """
+    if path.stat().st_size == 0:
+        return 0
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return sum(mm[i : i + chunk_bytes].count(b"\n") for i in range(0, len(mm), chunk_bytes))
+
+
+@contextmanager
+def open_input(path: Path, encoding: str, patterns: Sequence[str] = ()) -> Iterator[InputSource]:
+    """Abre o CSV (ou o membro do .zip) como texto para csv.reader, com newline=""."""
+    size = path.stat().st_size
+    if not is_zip(path):
+        with path.open(newline="", encoding=encoding) as f:
+            yield InputSource(text=f, position=f.buffer.tell, size=size, binary=f.buffer)
+        return
+    with path.open("rb") as raw, zipfile.ZipFile(raw) as zf:
+        member = _pick_member(zf, patterns)
+        with zf.open(member) as binary, io.TextIOWrapper(binary, encoding=encoding, newline="") as text:
+            yield InputSource(text=text, position=raw.tell, size=size, compressed=True, binary=binary)
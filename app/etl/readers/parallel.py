@@ -0,0 +1,252 @@
+"""
+Leitura paralela de arquivos grandes da Receita por faixas de bytes.
+
+O arquivo é dividido em faixas de ~parallel_chunk_bytes alinhadas ao início de um
+registro; cada faixa é decodificada, lida com csv.reader e convertida (column_specs do
+pipeline) num processo do ProcessPoolExecutor, que devolve apenas as tuplas dos registros.
+O processo principal fica livre para a carga no banco.
+
+Alinhamento: nos arquivos da Receita todos os campos vêm entre aspas, então um fim de
+registro é um \\n precedido por aspas de fechamento. Uma sequência de aspas antes do \\n
+fecha o campo se tiver tamanho ímpar (aspas de fechamento, após zero ou mais aspas escapadas)
+ou se começar logo após o delimitador (campo vazio ou só de aspas, ex.: ;""\\n); além
+disso, o próximo registro precisa começar com aspas.
+Arquivos sem aspas usam qualquer \\n como fronteira.
+"""
+import asyncio
+import csv
+import io
+import os
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from app.etl.readers.archive import OffsetLines
+
+if TYPE_CHECKING:
+    from app.etl.base import BaseCSVPipeline
+
+_SCAN_BYTES = 1024 * 1024
+_QUOTE = ord('"')
+# Linhas lidas e convertidas por vez (granularidade dos timers de etapa, ver app.etl.metrics)
+_BLOCK_ROWS = 1_000
+
+# Pipelines instanciados em cada worker (um por classe), sem sessão: só a conversão das linhas
+_worker_pipelines: dict[type, "BaseCSVPipeline"] = {}
+
+
+@dataclass
+class RangeResult:
+    """
+    Resultado de uma faixa: tuplas convertidas, tamanho e fim (offset) em bytes, linhas
+    lidas e linhas rejeitadas (número da linha dentro da faixa, motivo, campos).
+    marks tem, a cada ~every registros (o lote do modo de carga), (registros até ali, offset
+    e linha logo após a última linha lida até ali, relativos à faixa, e erros até ali): pontos
+    em que a carga pode fazer commit (checkpoint). timings traz os segundos de read, parse e
+    transform no worker.
+    """
+
+    records: list[tuple[Any, ...]]
+    size: int
+    end: int = 0
+    lines: int = 0
+    errors: int = 0
+    rejects: list[tuple[int, str, list[str]]] = field(default_factory=list)
+    marks: list[tuple[int, int, int, int]] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+def _is_record_end(buf: bytes, nl: int, delimiter: int) -> bool:
+    """Indica se o \\n em buf[nl] encerra um registro (arquivo com campos entre aspas)."""
+    end = nl - 1 if nl > 0 and buf[nl - 1] == 0x0D else nl  # ignora \\r de \\r\\n
+    run = 0
+    i = end - 1
+    while i >= 0 and buf[i] == _QUOTE:
+        run += 1
+        i -= 1
+    if run == 0:
+        return False
+    if run % 2 == 1:
+        return True
+    return i >= 0 and buf[i] == delimiter
+
+
+def _next_boundary(f: io.BufferedReader, offset: int, size: int, quoted: bool, delimiter: int) -> int:
+    """Primeira posição >= offset que começa um registro (ou size, se não houver)."""
+    # Recuamos um pouco para enxergar as aspas antes do \\n candidato
+    pos = max(offset - 64, 0)
+    f.seek(pos)
+    buf = b""
+    while True:
+        data = f.read(_SCAN_BYTES)
+        buf += data
+        # O \\n logo antes de offset conta: offset já pode ser o início de um registro
+        start = max(offset - pos - 1, 0)
+        while True:
+            nl = buf.find(b"\n", start)
+            if nl < 0 or nl + 1 >= len(buf):
+                break
+            if not quoted or (_is_record_end(buf, nl, delimiter) and buf[nl + 1] == _QUOTE):
+                return pos + nl + 1
+            start = nl + 1
+        if not data:
+            return size
+        # Mantém o final do buffer (o \\n pode estar na borda), com as aspas antes dele
+        keep = max(len(buf) - 64, 0)
+        pos += keep
+        buf = buf[keep:]
+        offset = max(offset, pos)
+
+
+def split_ranges(
+    path: Path | str,
+    chunk_bytes: int,
+    *,
+    start: int = 0,
+    delimiter: str = ";",
+) -> list[tuple[int, int]]:
+    """Divide o arquivo em faixas [início, fim) de ~chunk_bytes alinhadas a registros."""
+    size = os.path.getsize(path)
+    if start >= size:
+        return []
+    delim = ord(delimiter)
+    ranges: list[tuple[int, int]] = []
+    with open(path, "rb") as f:
+        f.seek(start)
+        quoted = f.read(1) == b'"'
+        begin = start
+        while begin < size:
+            end = size
+            if begin + chunk_bytes < size:
+                end = _next_boundary(f, begin + chunk_bytes, size, quoted, delim)
+            ranges.append((begin, end))
+            begin = end
+    return ranges
+
+
+def _init_worker(pipeline_cls: type["BaseCSVPipeline"], code_checks: list[tuple[int, str, frozenset[str]]]) -> None:
+    """Inicializa o worker com o pipeline da carga e os códigos das tabelas de domínio (sem sessão)."""
+    pipeline = _worker_pipelines[pipeline_cls] = pipeline_cls(None)
+    pipeline._code_checks = code_checks
+
+
+def parse_range(
+    pipeline_cls: type["BaseCSVPipeline"],
+    path: str,
+    start: int,
+    end: int,
+    every: int,
+) -> RangeResult:
+    """
+    Executado no worker: decodifica, lê e converte uma faixa do arquivo, em blocos de linhas,
+    marcando um ponto de commit a cada ~every registros (ver RangeResult.marks).
+    """
+    pipeline = _worker_pipelines.get(pipeline_cls)
+    if pipeline is None:
+        pipeline = _worker_pipelines[pipeline_cls] = pipeline_cls(None)
+    clock = time.perf_counter
+    started = clock()
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines = OffsetLines(io.BytesIO(data), pipeline.encoding)
+    lines.seconds = clock() - started
+    reader = csv.reader(lines, delimiter=pipeline.delimiter)
+    rows = (row for row in reader if row)
+    convert = pipeline._convert
+    result = RangeResult(records=[], size=end - start, end=end)
+    parse = transform = 0.0
+    marked = 0
+    while True:
+        started = clock()
+        read = lines.seconds
+        block = [(reader.line_num, row) for row in islice(rows, _BLOCK_ROWS)]
+        pulled = clock()
+        parse += pulled - started - (lines.seconds - read)
+        for line_num, row in block:
+            try:
+                record = convert(row)
+            except Exception:
+                result.errors += 1
+                result.rejects.append((line_num, pipeline._error_reason(row), row))
+                continue
+            if record is None:
+                result.rejects.append((line_num, pipeline._rejection_reason(row), row))
+                continue
+            result.records.append(record)
+        transform += clock() - pulled
+        if not block:
+            break
+        if len(result.records) - marked >= every:
+            marked = len(result.records)
+            result.marks.append((marked, lines.offset, reader.line_num, result.errors))
+    result.lines = reader.line_num
+    result.timings = {"read": lines.seconds, "parse": parse, "transform": transform}
+    return result
+
+
+def _read_header(pipeline: "BaseCSVPipeline", path: Path) -> tuple[list[str], int]:
+    """Colunas do CSV e offset do primeiro registro (após o cabeçalho, se houver)."""
+    if pipeline.fieldnames:
+        return list(pipeline.fieldnames), 0
+    with path.open("rb") as f:
+        line = f.readline()
+    header = next(csv.reader([line.decode(pipeline.encoding)], delimiter=pipeline.delimiter))
+    return header, len(line)
+
+
+async def iter_parallel_ranges(
+    pipeline: "BaseCSVPipeline",
+    path: Path,
+    *,
+    workers: int,
+    batch_size: int,
+    start: int = 0,
+) -> AsyncIterator[RangeResult]:
+    """
+    Processa o arquivo em workers processos e entrega os resultados na ordem das faixas.
+    Mantém no máximo 2 * workers faixas em andamento (limita a memória).
+    batch_size é o lote da carga (intervalo entre as marks de cada faixa); start é o offset
+    de um início de registro a partir do qual ler (retomada).
+    Use com contextlib.aclosing: ao fechar, as faixas que não começaram são canceladas.
+    """
+    fieldnames, first = _read_header(pipeline, path)
+    pipeline._validate_header(fieldnames)
+    start = max(start, first)
+    ranges = iter(split_ranges(path, pipeline.parallel_chunk_bytes, start=start, delimiter=pipeline.delimiter))
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(type(pipeline), pipeline._code_checks),
+    )
+    pending: deque[asyncio.Future[RangeResult]] = deque()
+
+    def submit() -> bool:
+        item = next(ranges, None)
+        if item is None:
+            return False
+        pending.append(
+            loop.run_in_executor(pool, parse_range, type(pipeline), str(path), item[0], item[1], batch_size)
+        )
+        return True
+
+    try:
+        for _ in range(workers * 2):
+            if not submit():
+                break
+        while pending:
+            result = await pending.popleft()
+            submit()
+            yield result
+    finally:
+        # Interrompido (ex.: erro na carga): descarta as faixas que ainda não começaram e espera
+        # as em andamento fora do event loop
+        for future in pending:
+            future.cancel()
+        await asyncio.to_thread(pool.shutdown, cancel_futures=True)
@@ -0,0 +1,153 @@
+"""
+Quarentena das linhas rejeitadas pelo ETL.
+
+Cada linha descartada (campo obrigatório vazio ou inválido, erro de conversão ou registro
+recusado pelo banco) é gravada em <arquivo>.rejects.csv.gz, ao lado do arquivo de entrada,
+com o número da linha na entrada e um código de motivo seguidos dos campos originais:
+
+    linha;motivo;campo1;campo2;...
+
+(sem cabeçalho, no encoding e separador do pipeline). Registros recusados pelo banco são
+regravados a partir dos valores convertidos (ver app.etl.columns.render_fields) e não têm
+número de linha. As linhas são acumuladas em memória e gravadas em blocos; o arquivo só
+é criado se houver rejeição e substitui o da execução anterior ao final (commit).
+
+O modo --replay-rejects relê esse arquivo e reprocessa só essas linhas (ver
+BaseCSVPipeline.run); as que falharem de novo formam o novo arquivo de rejeitos.
+
+Com checkpoints (ver BaseCSVPipeline.run, resume), o temporário é sincronizado a cada commit e
+mantido se a carga for interrompida; --resume aproveita as linhas até o último checkpoint.
+"""
+import csv
+import gzip
+import itertools
+import os
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.etl.readers.archive import InputSource
+
+REJECTS_SUFFIX = ".rejects.csv.gz"
+# Temporários do RejectWriter: <destino>.new e, durante resume, <destino>.new.old
+_TMP_SUFFIX = ".new"
+_OLD_SUFFIX = ".old"
+
+
+def rejects_path_for(path: Path) -> Path:
+    """Arquivo de rejeitos de uma entrada: <arquivo>.rejects.csv.gz no mesmo diretório."""
+    return path.with_name(path.name + REJECTS_SUFFIX)
+
+
+def is_rejects_file(path: Path) -> bool:
+    """Arquivo de rejeitos ou temporário de um RejectWriter (nunca uma entrada do ETL)."""
+    tmp = REJECTS_SUFFIX + _TMP_SUFFIX
+    return path.name.endswith((REJECTS_SUFFIX, tmp, tmp + _OLD_SUFFIX))
+
+
+class RejectWriter:
+    """
+    Grava rejeitos em blocos de buffer_size linhas num arquivo temporário (<destino>.new),
+    que substitui o destino em commit(). Sem nenhuma rejeição, commit() remove o destino.
+    """
+
+    def __init__(self, path: Path, *, encoding: str, delimiter: str, buffer_size: int = 1_000) -> None:
+        self.path = path
+        self.count = 0
+        self._tmp = path.with_name(path.name + _TMP_SUFFIX)
+        self._encoding = encoding
+        self._delimiter = delimiter
+        self._buffer_size = buffer_size
+        self._buffer: list[list[str]] = []
+        self._file = None
+        self._writer = None
+
+    def write(self, line: int | None, reason: str, fields: Sequence[str]) -> None:
+        self._buffer.append(["" if line is None else str(line), reason, *fields])
+        self.count += 1
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        if self._writer is None:
+            self._file = gzip.open(self._tmp, "wt", encoding=self._encoding, newline="")
+            self._writer = csv.writer(self._file, delimiter=self._delimiter, quoting=csv.QUOTE_ALL)
+        self._writer.writerows(self._buffer)
+        self._buffer.clear()
+
+    def sync(self) -> None:
+        """Grava o buffer e esvazia o gzip até um ponto de sincronização (antes de um checkpoint)."""
+        self.flush()
+        if self._file is not None:
+            self._file.flush()
+
+    def resume(self, keep: int) -> bool:
+        """
+        Retomada: reabre o temporário de uma execução interrompida mantendo só as `keep`
+        primeiras linhas (as confirmadas no checkpoint); as próximas são acrescentadas.
+        Retorna False, sem alterar nada, se o temporário com essas linhas não existe mais.
+        """
+        if not keep:
+            self._tmp.unlink(missing_ok=True)
+            return True
+        if not self._tmp.exists():
+            return False
+        old = self._tmp.with_name(self._tmp.name + _OLD_SUFFIX)
+        os.replace(self._tmp, old)
+        self._file = gzip.open(self._tmp, "wt", encoding=self._encoding, newline="")
+        self._writer = csv.writer(self._file, delimiter=self._delimiter, quoting=csv.QUOTE_ALL)
+        with gzip.open(old, "rt", encoding=self._encoding, newline="") as f:
+            try:
+                for row in itertools.islice(csv.reader(f, delimiter=self._delimiter), keep):
+                    self._writer.writerow(row)
+                    self.count += 1
+            except EOFError:
+                # Fim truncado (processo morto): fica o que foi sincronizado
+                pass
+        old.unlink()
+        return True
+
+    def commit(self) -> None:
+        """Fecha o arquivo e o coloca no lugar do destino (ou remove o destino, sem rejeitos)."""
+        self.flush()
+        self._close()
+        if self.count:
+            os.replace(self._tmp, self.path)
+        else:
+            self._tmp.unlink(missing_ok=True)
+            self.path.unlink(missing_ok=True)
+
+    def discard(self) -> None:
+        """Descarta o que foi gravado (execução falhou); o destino anterior é mantido."""
+        self._buffer.clear()
+        self._close()
+        self._tmp.unlink(missing_ok=True)
+
+    def suspend(self) -> None:
+        """Execução falhou após algum checkpoint: fecha mantendo o temporário para --resume."""
+        self.sync()
+        self._close()
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+@contextmanager
+def open_rejects(path: Path, encoding: str) -> Iterator[InputSource]:
+    """Abre um arquivo de rejeitos para leitura (progresso em bytes comprimidos)."""
+    size = path.stat().st_size
+    with path.open("rb") as raw, gzip.open(raw, "rt", encoding=encoding, newline="") as text:
+        yield InputSource(text=text, position=raw.tell, size=size, compressed=True)
+
+
+def iter_rejected_rows(rows: Iterator[list[str]]) -> Iterator[tuple[int | None, list[str]]]:
+    """(linha original, campos) das linhas de um arquivo de rejeitos lido com csv.reader."""
+    for row in rows:
+        if len(row) < 2:
+            continue
+        yield (int(row[0]) if row[0] else None), row[2:]
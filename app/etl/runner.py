@@ -0,0 +1,173 @@
+"""
+Execução de um pipeline sobre um conjunto de arquivos (ex.: Estabelecimentos0..9).
+
+Cada arquivo roda numa sessão própria (uma conexão do pool do engine, ou uma por writer), com
+no máximo `concurrency` arquivos ao mesmo tempo. As estatísticas são somadas e o resultado de
+cada arquivo é gravado num arquivo de status JSON, para que apenas os que falharam sejam
+reprocessados (retry_failed=True).
+"""
+import asyncio
+import json
+import logging
+from collections.abc import Sequence
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from tqdm import tqdm
+
+from app.core.config import settings
+from app.etl.base import BaseCSVPipeline
+from app.etl.metrics import RunMetrics
+from app.etl.rejects import is_rejects_file
+from app.etl.session import get_async_session
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FileResult:
+    """Resultado da importação de um arquivo (metrics: ver app.etl.metrics)."""
+
+    path: Path
+    ok: bool
+    stats: dict[str, int] = field(default_factory=dict)
+    error: str | None = None
+    metrics: RunMetrics | None = None
+
+
+@dataclass
+class FileSetReport:
+    """Resultado agregado de um conjunto de arquivos."""
+
+    results: list[FileResult] = field(default_factory=list)
+
+    @property
+    def totals(self) -> dict[str, int]:
+        totals: dict[str, int] = {}
+        for result in self.results:
+            for key, value in result.stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    @property
+    def failed(self) -> list[FileResult]:
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def metrics(self) -> list[RunMetrics]:
+        return [r.metrics for r in self.results if r.metrics is not None]
+
+
+def max_concurrency() -> int:
+    """Máximo de conexões simultâneas que o pool do engine entrega (pool_size + max_overflow)."""
+    return settings.db_pool_size + settings.db_max_overflow
+
+
+def status_path_for(pipeline_cls: type[BaseCSVPipeline], paths: Sequence[Path]) -> Path:
+    """Arquivo de status do conjunto: .etl-<tabela>.status.json no diretório dos arquivos."""
+    return paths[0].parent / f".etl-{pipeline_cls.model.__tablename__}.status.json"
+
+
+def is_input_file(path: Path) -> bool:
+    """
+    Falso para o que o próprio ETL grava ao lado das entradas: rejeitos
+    (<arquivo>.rejects.csv.gz e os temporários .new/.new.old) e arquivos .etl-* de status/estado.
+    """
+    return path.is_file() and not path.name.startswith(".") and not is_rejects_file(path)
+
+
+def input_files(directory: Path, patterns: Sequence[str]) -> list[Path]:
+    """Arquivos do diretório que casam com patterns (ver is_input_file)."""
+    found = {f for pattern in patterns for f in directory.glob(pattern)}
+    return sorted(f for f in found if is_input_file(f))
+
+
+def _load_status(path: Path) -> dict[str, Any]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+async def run_files(
+    pipeline_cls: type[BaseCSVPipeline],
+    paths: Sequence[Path],
+    *,
+    concurrency: int = 4,
+    show_progress: bool = True,
+    status_path: Path | None = None,
+    retry_failed: bool = False,
+    connections: asyncio.Semaphore | None = None,
+    **run_kwargs: Any,
+) -> FileSetReport:
+    """
+    Importa os arquivos em paralelo (até concurrency por vez, limitado a max_concurrency(), em
+    conexões: com writers=N em run_kwargs, cada arquivo usa N).
+    Com um único arquivo, mostra a barra de progresso do próprio pipeline; com vários,
+    uma barra agregada por arquivo concluído.
+    Se status_path for informado, o status de cada arquivo é gravado nele; com
+    retry_failed=True, arquivos já concluídos com sucesso são ignorados.
+    connections limita as conexões somadas de vários run_files simultâneos (ver app.etl.orchestrator).
+    """
+    status = _load_status(status_path) if status_path is not None else {}
+    if retry_failed:
+        done = {name for name, entry in status.items() if entry.get("status") == "ok"}
+        skipped = [p for p in paths if p.name in done]
+        paths = [p for p in paths if p.name not in done]
+        for p in skipped:
+            logger.info("%s: já importado com sucesso, ignorando", p.name)
+
+    # Cada arquivo usa uma conexão por writer (ver BaseCSVPipeline.run)
+    writers = run_kwargs.get("writers", 1)
+    if writers > max_concurrency():
+        raise ValueError(f"writers={writers} excede o pool do banco ({max_concurrency()} conexões)")
+    limit = max(1, min(concurrency, max_concurrency() // writers, len(paths) or 1))
+    semaphore = asyncio.Semaphore(limit)
+    report = FileSetReport()
+    single = len(paths) == 1
+    progress = None
+    if show_progress and not single:
+        progress = tqdm(total=len(paths), unit=" arquivos", desc="ETL", leave=True)
+
+    async def run_one(path: Path) -> None:
+        async with semaphore, connections or nullcontext():
+            pipeline = None
+            try:
+                async with get_async_session() as session:
+                    pipeline = pipeline_cls(session)
+                    stats = await pipeline.run(
+                        path,
+                        show_progress=show_progress and single,
+                        **run_kwargs,
+                    )
+                result = FileResult(path=path, ok=True, stats=stats, metrics=pipeline.metrics)
+                logger.info("%s: %s", path.name, stats)
+            except Exception as exc:
+                logger.exception("%s: importação falhou", path.name)
+                result = FileResult(
+                    path=path,
+                    ok=False,
+                    error=f"{type(exc).__name__}: {exc}",
+                    metrics=pipeline.metrics if pipeline is not None else None,
+                )
+        report.results.append(result)
+        if status_path is not None:
+            status[path.name] = {
+                "status": "ok" if result.ok else "failed",
+                "stats": result.stats,
+                "error": result.error,
+            }
+            status_path.write_text(json.dumps(status, indent=2, ensure_ascii=False))
+        if progress is not None:
+            progress.update(1)
+            progress.set_postfix(processed=report.totals.get("processed", 0), falhas=len(report.failed))
+
+    try:
+        await asyncio.gather(*(run_one(p) for p in paths))
+    finally:
+        if progress is not None:
+            progress.close()
+    report.results.sort(key=lambda r: str(r.path))
+    return report
@@ -3,13 +3,24 @@ Sessão SQLAlchemy para ETL.
 
 O ETL usa a mesma sessão async da API (AsyncSession) para poder
 utilizar os repositories e manter a lógica de persistência centralizada.
+Para cargas em massa (COPY), get_driver_connection expõe a conexão asyncpg
+subjacente, dentro da mesma transação da sessão.
+Cada comando executado pelo engine conta como ida ao banco nas métricas da carga em
+andamento (ver app.etl.metrics.count_round_trip).
 """
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
 
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, engine
+from app.etl.metrics import count_round_trip
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_statement(*_: Any) -> None:
+    count_round_trip()
 
 
 @asynccontextmanager
@@ -22,3 +33,19 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
         except Exception:
             await session.rollback()
             raise
+
+
+async def get_driver_connection(session: AsyncSession) -> Any:
+    """
+    Retorna a conexão asyncpg da sessão (para copy_records_to_table etc.).
+
+    O adapter asyncpg do SQLAlchemy só emite BEGIN no primeiro execute; se a transação
+    ainda não começou, executamos um SELECT 1 antes, garantindo que o COPY rode na transação
+    da sessão (commit/rollback da sessão passam a valer também para ele). Nos lotes
+    seguintes da mesma transação não há essa ida a mais ao banco.
+    """
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    if not raw.driver_connection.is_in_transaction():
+        await session.execute(text("SELECT 1"))
+    return raw.driver_connection
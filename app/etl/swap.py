@@ -0,0 +1,284 @@
+"""
+Recarga blue/green (--swap): a API nunca lê uma tabela carregada pela metade.
+
+A carga vai para <tabela>_next, criada UNLOGGED (LIKE <tabela>, sem índices nem FKs), via
+COPY, enquanto a API continua lendo <tabela> sem disputar locks com o ETL. Depois:
+
+1. build_next recria em <tabela>_next os índices da atual (em paralelo, nomes com _next) e a
+   PK (USING INDEX), faz SET LOGGED (a tabela passa a ir para o WAL e as réplicas), recria
+   as FKs como NOT VALID + VALIDATE CONSTRAINT e roda ANALYZE;
+2. swap troca os nomes numa transação curta: <tabela> vira <tabela>_old e <tabela>_next vira
+   <tabela> (índices e constraints acompanham), e as FKs de outras tabelas que apontavam
+   para a antiga são religadas à nova como NOT VALID (e também as da substituta que divergem
+   das atuais); a validação delas roda depois, fora da transação. A transação usa
+   lock_timeout e é repetida se uma consulta longa segurar a tabela, para não enfileirar as
+   leituras da API atrás do ALTER TABLE.
+
+Uma tabela particionada (estabelecimentos) ganha uma <tabela>_next com a mesma chave de
+particionamento e uma partição <partição>_next (UNLOGGED) para cada uma das atuais, com os
+mesmos limites. PK e índices são criados em cada partição, em paralelo e com nomes escolhidos
+pelo Postgres (únicos ao lado dos da tabela viva), e depois na mãe, que apenas os liga; as
+partições são renomeadas junto com a tabela na troca.
+
+A versão anterior fica em <tabela>_old até a próxima recarga, para rollback instantâneo
+(swap com rollback=True troca as duas de novo). LIKE não copia privilégios (GRANT).
+"""
+import asyncio
+import logging
+import re
+from dataclasses import replace
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.etl.fastload import (
+    MAINTENANCE_WORK_MEM,
+    Constraint,
+    FastLoadReport,
+    TableDDL,
+    capture_ddl,
+    execute_parallel,
+    foreign_key_statements,
+    index_on,
+    referencing_partitions,
+    validate_foreign_keys,
+)
+from app.etl.partitions import partition_layout, partitions_of
+from app.etl.session import get_async_session
+from app.repositories import EtlCheckpointRepository
+
+logger = logging.getLogger(__name__)
+
+NEXT_SUFFIX = "_next"
+OLD_SUFFIX = "_old"
+# Nome temporário da tabela atual durante um rollback
+_PARK_SUFFIX = "_swap"
+
+LOCK_TIMEOUT = "5s"
+SWAP_ATTEMPTS = 5
+
+_LOCK_NOT_AVAILABLE = "55P03"
+
+_REFERENCES_COPY = re.compile(rf"(REFERENCES \S+?)(?:{NEXT_SUFFIX}|{OLD_SUFFIX}|{_PARK_SUFFIX})\(")
+
+
+def next_table_for(table: str) -> str:
+    return table + NEXT_SUFFIX
+
+
+def _is_copy(table: str) -> bool:
+    """Tabela _next/_old de uma recarga blue/green (de qualquer entidade)."""
+    return table.endswith((NEXT_SUFFIX, OLD_SUFFIX, _PARK_SUFFIX))
+
+
+def _incoming(table: str, ddl: TableDDL) -> list[Constraint]:
+    """FKs de outras tabelas (vivas) que apontam para a tabela."""
+    return [fk for fk in ddl.foreign_keys if fk.table != table and not _is_copy(fk.table)]
+
+
+def _suffixed(name: str, suffix: str) -> str:
+    """Nome (de índice/constraint, talvez entre aspas ou com schema) com o sufixo."""
+    name = name.rsplit(".", 1)[-1]
+    return f"{name[:-1]}{suffix}\"" if name.endswith('"') else name + suffix
+
+
+def _live_definition(fk: Constraint) -> str:
+    """Definição da FK apontando para a tabela viva (não para uma _next/_old), sem NOT VALID."""
+    return _REFERENCES_COPY.sub(r"\1(", fk.definition.removesuffix(" NOT VALID"))
+
+
+def _index_names(ddl: TableDDL) -> list[str]:
+    """Índices da tabela (os das PK/UNIQUE têm o nome da constraint), sem schema."""
+    return [key.name for key in ddl.keys] + [_suffixed(name, "") for name, _ in ddl.indexes]
+
+
+async def create_next(table: str) -> TableDDL:
+    """
+    (Re)cria <tabela>_next vazia e UNLOGGED, com as colunas, defaults e CHECKs da atual.
+    Retorna as definições da tabela atual, usadas por build_next e swap.
+    Se a atual for particionada, a _next tem a mesma chave e uma partição <partição>_next
+    para cada uma das atuais; a mãe não guarda dados, e só as partições são UNLOGGED.
+    """
+    target = next_table_for(table)
+    like = f"(LIKE {table} INCLUDING ALL EXCLUDING INDEXES)"
+    async with get_async_session() as session:
+        ddl = await capture_ddl(session, table)
+        layout = await partition_layout(session, table)
+        await session.execute(text(f"DROP TABLE IF EXISTS {target}"))
+        if layout is None:
+            await session.execute(text(f"CREATE UNLOGGED TABLE {target} {like}"))
+        else:
+            key, bounds = layout
+            await session.execute(text(f"CREATE TABLE {target} {like} PARTITION BY {key}"))
+            for partition, bound in bounds.items():
+                await session.execute(
+                    text(f"CREATE UNLOGGED TABLE {_suffixed(partition, NEXT_SUFFIX)} PARTITION OF {target} {bound}")
+                )
+        await EtlCheckpointRepository(session).delete_table(target)
+    return ddl
+
+
+async def drop_next(table: str) -> None:
+    async with get_async_session() as session:
+        await session.execute(text(f"DROP TABLE IF EXISTS {next_table_for(table)}"))
+
+
+async def build_next(
+    table: str,
+    ddl: TableDDL,
+    *,
+    concurrency: int,
+    maintenance_work_mem: str = MAINTENANCE_WORK_MEM,
+) -> FastLoadReport:
+    """Índices, PK, SET LOGGED, FKs (NOT VALID + VALIDATE) e ANALYZE em <tabela>_next."""
+    target = next_table_for(table)
+    options = dict(concurrency=concurrency, maintenance_work_mem=maintenance_work_mem)
+    async with get_async_session() as session:
+        partitions = await partitions_of(session, target)
+
+    if partitions:
+        # Como em fastload._rebuild_partitioned: nas partições, em paralelo; a mãe só os liga
+        local = [f"ALTER TABLE {p} ADD {key.definition}" for p in partitions for key in ddl.keys]
+        local += [index_on(d, None, p) for p in partitions for _, d in ddl.indexes]
+        parent = [
+            f"ALTER TABLE {target} ADD CONSTRAINT {_suffixed(key.name, NEXT_SUFFIX)} {key.definition}"
+            for key in ddl.keys
+        ]
+        parent += [index_on(d, _suffixed(name, NEXT_SUFFIX), target) for name, d in ddl.indexes]
+    else:
+        local = [index_on(d, _suffixed(name, NEXT_SUFFIX), target) for name, d in ddl.indexes]
+        local += [index_on(key.index_def, _suffixed(key.name, NEXT_SUFFIX), target) for key in ddl.keys]
+        parent = []
+        for key in ddl.keys:
+            name = _suffixed(key.name, NEXT_SUFFIX)
+            kind = "PRIMARY KEY" if key.kind == "p" else "UNIQUE"
+            parent.append(f"ALTER TABLE {target} ADD CONSTRAINT {name} {kind} USING INDEX {name}")
+    errors = [e for e in await execute_parallel(local, **options) if e is not None]
+    if errors:
+        raise errors[0]
+    async with get_async_session() as session:
+        for statement in parent:
+            await session.execute(text(statement))
+
+    logged = [f"ALTER TABLE {t} SET LOGGED" for t in partitions or [target]]
+    errors = [e for e in await execute_parallel(logged, **options) if e is not None]
+    if errors:
+        raise errors[0]
+
+    outgoing = [
+        replace(fk, table=target, definition=_live_definition(fk)) for fk in ddl.foreign_keys if fk.table == table
+    ]
+    async with get_async_session() as session:
+        for fk in outgoing:
+            for statement in foreign_key_statements(fk, partitions):
+                await session.execute(text(statement))
+    report = await validate_foreign_keys(outgoing, {target: partitions}, **options)
+
+    async with get_async_session() as session:
+        await session.execute(text(f"ANALYZE {target}"))
+    return report
+
+
+def _relinked(table: str, ddl: TableDDL, replacement: TableDDL) -> list[Constraint]:
+    """
+    FKs a religar na troca: as de outras tabelas que apontam para a atual e as da própria
+    tabela que, na substituta, diferem das atuais (ex.: uma _old cujo pai também foi trocado
+    aponta para o _old do pai).
+    """
+    current = {fk.name: fk.definition.removesuffix(" NOT VALID") for fk in replacement.foreign_keys}
+    outgoing = []
+    for fk in ddl.foreign_keys:
+        if fk.table != table:
+            continue
+        definition = _live_definition(fk)
+        if current.get(fk.name) != definition:
+            outgoing.append(replace(fk, definition=definition))
+    return _incoming(table, ddl) + outgoing
+
+
+def _swap_statements(
+    table: str,
+    ddl: TableDDL,
+    rollback: bool,
+    relink: list[Constraint],
+    fk_partitions: dict[str, list[str]],
+    partitions: list[str],
+) -> list[str]:
+    """
+    Troca <tabela> pela substituta (_next, ou _old no rollback); a atual vai para _old.
+    Renomear o índice de uma PK renomeia também a constraint. fk_partitions: partições das
+    tabelas das FKs de relink (ver foreign_key_statements); partitions: as da própria tabela,
+    trocadas junto com ela (os índices e constraints delas têm nomes próprios e ficam como estão).
+    """
+    replacement, park = (OLD_SUFFIX, _PARK_SUFFIX) if rollback else (NEXT_SUFFIX, OLD_SUFFIX)
+    # CASCADE: só FKs de outras tabelas _old ainda apontam para a _old (as vivas foram religadas)
+    statements = [] if rollback else [f"DROP TABLE IF EXISTS {table}{OLD_SUFFIX} CASCADE"]
+    statements += [
+        f"ALTER TABLE {table} RENAME TO {table}{park}",
+        f"ALTER TABLE {table}{replacement} RENAME TO {table}",
+    ]
+    for partition in partitions:
+        statements.append(f"ALTER TABLE {partition} RENAME TO {_suffixed(partition, park)}")
+        statements.append(f"ALTER TABLE {_suffixed(partition, replacement)} RENAME TO {_suffixed(partition, '')}")
+    for name in _index_names(ddl):
+        statements.append(f"ALTER INDEX {name} RENAME TO {_suffixed(name, park)}")
+        statements.append(f"ALTER INDEX {_suffixed(name, replacement)} RENAME TO {name}")
+    if rollback:
+        statements.append(f"ALTER TABLE {table}{park} RENAME TO {table}{OLD_SUFFIX}")
+        for partition in partitions:
+            statements.append(
+                f"ALTER TABLE {_suffixed(partition, park)} RENAME TO {_suffixed(partition, OLD_SUFFIX)}"
+            )
+        for name in _index_names(ddl):
+            statements.append(f"ALTER INDEX {_suffixed(name, park)} RENAME TO {_suffixed(name, OLD_SUFFIX)}")
+    # FKs seguem a tabela referenciada por OID: religa as de relink, sem validar aqui
+    for fk in relink:
+        statements.append(f"ALTER TABLE {fk.table} DROP CONSTRAINT IF EXISTS {fk.name}")
+        statements += foreign_key_statements(fk, fk_partitions[fk.table])
+    return statements
+
+
+async def swap(
+    table: str,
+    *,
+    rollback: bool = False,
+    concurrency: int = 1,
+    lock_timeout: str = LOCK_TIMEOUT,
+    attempts: int = SWAP_ATTEMPTS,
+) -> FastLoadReport:
+    """
+    Coloca <tabela>_next (ou, com rollback=True, <tabela>_old) no lugar de <tabela> numa
+    única transação curta e valida em seguida as FKs religadas. Se o lock não vier em
+    lock_timeout, desfaz e tenta de novo (até attempts vezes).
+    """
+    async with get_async_session() as session:
+        ddl = await capture_ddl(session, table)
+        replacement = table + (OLD_SUFFIX if rollback else NEXT_SUFFIX)
+        exists = await session.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": replacement})
+        if not exists.scalar_one():
+            raise ValueError(f"Tabela {replacement} não existe; nada para trocar")
+        partitions = await partitions_of(session, table)
+        expected = {_suffixed(p, replacement[len(table) :]) for p in partitions}
+        if {_suffixed(p, "") for p in await partitions_of(session, replacement)} != expected:
+            raise ValueError(f"As partições de {replacement} não correspondem às de {table}")
+        relink = _relinked(table, ddl, await capture_ddl(session, replacement))
+        fk_partitions = await referencing_partitions(session, relink)
+    statements = _swap_statements(table, ddl, rollback, relink, fk_partitions, partitions)
+
+    for attempt in range(1, attempts + 1):
+        try:
+            async with get_async_session() as session:
+                await session.execute(text("SELECT set_config('lock_timeout', :value, true)"), {"value": lock_timeout})
+                for statement in statements:
+                    await session.execute(text(statement))
+            break
+        except DBAPIError as exc:
+            if getattr(exc.orig, "sqlstate", None) != _LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            logger.warning("%s: tabela ocupada; nova tentativa de troca (%d/%d)", table, attempt, attempts)
+            await asyncio.sleep(attempt)
+    logger.info("%s: %s no lugar da atual (anterior em %s%s)", table, replacement, table, OLD_SUFFIX)
+
+    return await validate_foreign_keys(
+        relink, fk_partitions, concurrency=concurrency, maintenance_work_mem=MAINTENANCE_WORK_MEM
+    )
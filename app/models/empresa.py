@@ -1,6 +1,7 @@
 from enum import Enum as PyEnum
 
 from sqlalchemy import (
+    BigInteger,
     Column,
     ForeignKey,
     Numeric,
@@ -37,5 +38,7 @@ class Empresa(Base):
     capital_social = Column(Numeric(15, 2), nullable=False, default=0.00)
     porte_empresa = Column(String(2), nullable=False, default=PorteEmpresa.NAO_INFORMADO)
     ente_federativo = Column(String, nullable=True)
+    # Hash de 64 bits do registro normalizado (ETL: detecção de mudança na reimportação)
+    row_hash = Column(BigInteger, nullable=True)
     
 
@@ -1,11 +1,14 @@
 from enum import Enum as PyEnum
 
 from sqlalchemy import (
+    BigInteger,
     Column,
     ForeignKey,
+    Index,
     String,
     Date
 )
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from app.core.database import Base
 
@@ -31,8 +34,19 @@ class Estabelecimento(Base):
     Estabelecimento (matriz/filial) da empresa.
     cnpj_basico pode repetir (uma empresa tem vários estabelecimentos).
     A combinação (cnpj_basico, cnpj_ordem, cnpj_dv) é única.
+    Particionada por HASH(cnpj_basico) em estabelecimentos_p00..p15 (criadas pela migration);
+    consultas com cnpj_basico na condição leem só as partições correspondentes.
+    cnae_fiscal_secundaria é um array de códigos CNAE com índice GIN (busca por @>).
     """
     __tablename__ = 'estabelecimentos'
+    __table_args__ = (
+        Index(
+            'ix_estabelecimentos_cnae_fiscal_secundaria',
+            'cnae_fiscal_secundaria',
+            postgresql_using='gin',
+        ),
+        {'postgresql_partition_by': 'HASH (cnpj_basico cnpj_basico_partition_ops)'},
+    )
 
     # Chave primária composta: os 3 juntos são únicos;
     cnpj_basico = Column(String(10), ForeignKey('empresas.cnpj_basico'), nullable=False, primary_key=True)
@@ -59,7 +73,8 @@ class Estabelecimento(Base):
         ForeignKey('cnaes.codigo'),
         nullable=False,
     )
-    cnae_fiscal_secundaria = Column(String, nullable=True)
+    # Códigos das atividades secundárias (sem FK: o Postgres não tem FK por elemento de array)
+    cnae_fiscal_secundaria = Column(ARRAY(String(7)), nullable=True)
     tipo_logradouro = Column(String, nullable=False)
     logradouro = Column(String, nullable=False)
     numero = Column(String, nullable=False)
@@ -80,4 +95,6 @@ class Estabelecimento(Base):
     fax = Column(String, nullable=True)
     correio_eletronico = Column(String, nullable=True)
     situacao_especial = Column(String, nullable=True)
-    data_situacao_especial = Column(Date, nullable=True)
\ No newline at end of file
+    data_situacao_especial = Column(Date, nullable=True)
+    # Hash de 64 bits do registro normalizado (ETL: detecção de mudança na reimportação)
+    row_hash = Column(BigInteger, nullable=True)
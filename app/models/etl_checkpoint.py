@@ -0,0 +1,34 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    String,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.core.database import Base
+
+
+class EtlCheckpoint(Base):
+    """
+    Progresso de uma importação do ETL, gravado na mesma transação de cada commit de lote.
+    Permite retomar (--resume) a partir do último offset confirmado.
+    """
+    __tablename__ = 'etl_checkpoints'
+
+    # Tabela de destino e caminho absoluto do arquivo de entrada
+    table_name = Column(String, primary_key=True, nullable=False)
+    source = Column(String, primary_key=True, nullable=False)
+    # Identidade do arquivo: o checkpoint só vale para o mesmo arquivo (tamanho e mtime)
+    file_size = Column(BigInteger, nullable=False)
+    file_mtime_ns = Column(BigInteger, nullable=False)
+    # Posição após o último registro confirmado (bytes do CSV; no .zip, do membro descomprimido)
+    byte_offset = Column(BigInteger, nullable=False)
+    line_number = Column(BigInteger, nullable=False)
+    # Linhas já gravadas no arquivo de rejeitos até este ponto
+    rejects = Column(BigInteger, nullable=False, default=0)
+    stats = Column(JSONB, nullable=False)
+    # running | done
+    status = Column(String(10), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
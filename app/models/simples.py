@@ -1,6 +1,7 @@
 from enum import Enum as PyEnum
 
 from sqlalchemy import (
+    BigInteger,
     Column,
     ForeignKey,
     String,
@@ -40,4 +41,6 @@ class Simples(Base):
     opcao_mei = Column(String(1), nullable=False, default=OpcaoMei.OUTROS)
     data_opcao_mei = Column(Date, nullable=True)
     data_exclusao_mei = Column(Date, nullable=True)
+    # Hash de 64 bits do registro normalizado (ETL: detecção de mudança na reimportação)
+    row_hash = Column(BigInteger, nullable=True)
 
@@ -6,6 +6,7 @@ from app.repositories.cnae import CnaeRepository
 from app.repositories.empresa import EmpresaRepository
 from app.repositories.estabelecimento import EstabelecimentoRepository
 from app.repositories.simples import SimplesRepository
+from app.repositories.etl_checkpoint import EtlCheckpointRepository
 
 __all__ = [
     "PaisRepository",
@@ -16,4 +17,5 @@ __all__ = [
     "EmpresaRepository",
     "EstabelecimentoRepository",
     "SimplesRepository",
+    "EtlCheckpointRepository",
 ]
@@ -1,4 +1,6 @@
-from sqlalchemy import select
+from collections.abc import Sequence
+
+from sqlalchemy import any_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.pagination import paginate
@@ -15,6 +17,12 @@ class CnaeRepository:
         )
         return result.scalar_one_or_none()
 
+    async def get_many_by_codigo(self, codigos: Sequence[str]) -> list[Cnae]:
+        result = await self.session.execute(
+            select(Cnae).where(Cnae.codigo == any_(list(codigos)))
+        )
+        return list(result.scalars().all())
+
     async def get_all(
         self,
         page: int = 1,
@@ -35,6 +43,11 @@ class CnaeRepository:
         await self.session.refresh(cnae)
         return cnae
 
+    async def create_many(self, cnaes: Sequence[Cnae]) -> None:
+        """Adiciona vários registros e faz um único flush (sem refresh); inclui alterações pendentes."""
+        self.session.add_all(cnaes)
+        await self.session.flush()
+
     async def delete(self, cnae: Cnae) -> None:
         await self.session.delete(cnae)
         await self.session.flush()
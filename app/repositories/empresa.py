@@ -1,4 +1,6 @@
-from sqlalchemy import select
+from collections.abc import Sequence
+
+from sqlalchemy import any_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.pagination import paginate
@@ -15,6 +17,12 @@ class EmpresaRepository:
         )
         return result.scalar_one_or_none()
 
+    async def get_many_by_cnpj_basico(self, cnpjs_basicos: Sequence[str]) -> list[Empresa]:
+        result = await self.session.execute(
+            select(Empresa).where(Empresa.cnpj_basico == any_(list(cnpjs_basicos)))
+        )
+        return list(result.scalars().all())
+
     async def get_all(
         self,
         page: int = 1,
@@ -34,6 +42,11 @@ class EmpresaRepository:
         await self.session.refresh(empresa)
         return empresa
 
+    async def create_many(self, empresas: Sequence[Empresa]) -> None:
+        """Adiciona vários registros e faz um único flush (sem refresh); inclui alterações pendentes."""
+        self.session.add_all(empresas)
+        await self.session.flush()
+
     async def delete(self, empresa: Empresa) -> None:
         await self.session.delete(empresa)
         await self.session.flush()
@@ -1,14 +1,28 @@
-from sqlalchemy import select
+from collections.abc import Sequence
+
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.pagination import paginate
 from app.models.estabelecimento import Estabelecimento
 
 
+# estabelecimentos é particionada por HASH(cnpj_basico): consultas com cnpj_basico na condição
+# (igualdade, IN ou a tupla da chave) leem só as partições correspondentes, inclusive com
+# parâmetros (poda na execução); as demais percorrem todas as partições.
 class EstabelecimentoRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    async def get_by_cnpj(
+        self,
+        cnpj_basico: str,
+        cnpj_ordem: str,
+        cnpj_dv: str,
+    ) -> Estabelecimento | None:
+        """Busca pela chave completa (uma única partição)."""
+        return await self.session.get(Estabelecimento, (cnpj_basico, cnpj_ordem, cnpj_dv))
+
     async def get_by_cnpj_ordem(
         self,
         cnpj_basico: str,
@@ -22,6 +36,22 @@ class EstabelecimentoRepository:
         )
         return result.scalar_one_or_none()
 
+    async def get_many_by_cnpj(
+        self,
+        cnpjs: Sequence[tuple[str, str, str]],
+    ) -> list[Estabelecimento]:
+        """Busca vários estabelecimentos pela chave completa (cnpj_basico, cnpj_ordem, cnpj_dv)."""
+        result = await self.session.execute(
+            select(Estabelecimento).where(
+                tuple_(
+                    Estabelecimento.cnpj_basico,
+                    Estabelecimento.cnpj_ordem,
+                    Estabelecimento.cnpj_dv,
+                ).in_(list(cnpjs))
+            )
+        )
+        return list(result.scalars().all())
+
     async def get_by_cnpj_basico(
         self,
         cnpj_basico: str,
@@ -35,6 +65,27 @@ class EstabelecimentoRepository:
         )
         return await paginate(self.session, stmt, page, limit)
 
+    async def get_by_cnae_secundario(
+        self,
+        codigo: str,
+        page: int = 1,
+        limit: int = 25,
+    ) -> tuple[list[Estabelecimento], int, int]:
+        """
+        Estabelecimentos com o CNAE entre as atividades secundárias. O @> (contains) usa o
+        índice GIN de cnae_fiscal_secundaria em cada partição.
+        """
+        stmt = (
+            select(Estabelecimento)
+            .where(Estabelecimento.cnae_fiscal_secundaria.contains([codigo]))
+            .order_by(
+                Estabelecimento.cnpj_basico,
+                Estabelecimento.cnpj_ordem,
+                Estabelecimento.cnpj_dv,
+            )
+        )
+        return await paginate(self.session, stmt, page, limit)
+
     async def get_all(
         self,
         page: int = 1,
@@ -58,6 +109,11 @@ class EstabelecimentoRepository:
         await self.session.refresh(estabelecimento)
         return estabelecimento
 
+    async def create_many(self, estabelecimentos: Sequence[Estabelecimento]) -> None:
+        """Adiciona vários registros e faz um único flush (sem refresh); inclui alterações pendentes."""
+        self.session.add_all(estabelecimentos)
+        await self.session.flush()
+
     async def delete(self, estabelecimento: Estabelecimento) -> None:
         await self.session.delete(estabelecimento)
         await self.session.flush()
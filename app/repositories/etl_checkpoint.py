@@ -0,0 +1,35 @@
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.etl_checkpoint import EtlCheckpoint
+
+
+class EtlCheckpointRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, table_name: str, source: str) -> EtlCheckpoint | None:
+        result = await self.session.execute(
+            select(EtlCheckpoint).where(
+                EtlCheckpoint.table_name == table_name,
+                EtlCheckpoint.source == source,
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def save(self, table_name: str, source: str, **values: Any) -> None:
+        """Grava (insert ou update) o checkpoint na transação corrente, sem flush do ORM."""
+        stmt = pg_insert(EtlCheckpoint).values(table_name=table_name, source=source, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EtlCheckpoint.table_name, EtlCheckpoint.source],
+            set_={**values, "updated_at": stmt.excluded.updated_at},
+        )
+        await self.session.execute(stmt)
+
+    async def delete_table(self, table_name: str) -> int:
+        """Remove os checkpoints de uma tabela (ex.: após esvaziá-la). Retorna quantos foram removidos."""
+        result = await self.session.execute(delete(EtlCheckpoint).where(EtlCheckpoint.table_name == table_name))
+        return result.rowcount
@@ -1,4 +1,6 @@
-from sqlalchemy import select
+from collections.abc import Sequence
+
+from sqlalchemy import any_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.pagination import paginate
@@ -15,6 +17,12 @@ class MotivoRepository:
         )
         return result.scalar_one_or_none()
 
+    async def get_many_by_codigo(self, codigos: Sequence[str]) -> list[Motivo]:
+        result = await self.session.execute(
+            select(Motivo).where(Motivo.codigo == any_(list(codigos)))
+        )
+        return list(result.scalars().all())
+
     async def get_all(
         self,
         page: int = 1,
@@ -35,6 +43,11 @@ class MotivoRepository:
         await self.session.refresh(motivo)
         return motivo
 
+    async def create_many(self, motivos: Sequence[Motivo]) -> None:
+        """Adiciona vários registros e faz um único flush (sem refresh); inclui alterações pendentes."""
+        self.session.add_all(motivos)
+        await self.session.flush()
+
     async def delete(self, motivo: Motivo) -> None:
         await self.session.delete(motivo)
         await self.session.flush()
@@ -1,4 +1,6 @@
-from sqlalchemy import select
+from collections.abc import Sequence
+
+from sqlalchemy import any_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.pagination import paginate
@@ -15,6 +17,12 @@ class NaturezaRepository:
         )
         return result.scalar_one_or_none()
 
+    async def get_many_by_codigo(self, codigos: Sequence[str]) -> list[Natureza]:
+        result = await self.session.execute(
+            select(Natureza).where(Natureza.codigo == any_(list(codigos)))
+        )
+        return list(result.scalars().all())
+
     async def get_all(
         self,
         page: int = 1,
@@ -34,6 +42,11 @@ class NaturezaRepository:
         await self.session.refresh(natureza)
         return natureza
 
+    async def create_many(self, naturezas: Sequence[Natureza]) -> None:
+        """Adiciona vários registros e faz um único flush (sem refresh); inclui alterações pendentes."""
+        self.session.add_all(naturezas)
+        await self.session.flush()
+
     async def delete(self, natureza: Natureza) -> None:
         await self.session.delete(natureza)
         await self.session.flush()
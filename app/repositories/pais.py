@@ -1,4 +1,6 @@
-from sqlalchemy import select
+from collections.abc import Sequence
+
+from sqlalchemy import any_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.pagination import paginate
@@ -15,6 +17,12 @@ class PaisRepository:
         )
         return result.scalar_one_or_none()
 
+    async def get_many_by_codigo(self, codigos: Sequence[str]) -> list[Pais]:
+        result = await self.session.execute(
+            select(Pais).where(Pais.codigo == any_(list(codigos)))
+        )
+        return list(result.scalars().all())
+
     async def get_all(
         self,
         page: int = 1,
@@ -34,6 +42,11 @@ class PaisRepository:
         await self.session.refresh(pais)
         return pais
 
+    async def create_many(self, paiss: Sequence[Pais]) -> None:
+        """Adiciona vários registros e faz um único flush (sem refresh); inclui alterações pendentes."""
+        self.session.add_all(paiss)
+        await self.session.flush()
+
     async def delete(self, pais: Pais) -> None:
         await self.session.delete(pais)
         await self.session.flush()
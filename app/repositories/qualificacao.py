@@ -1,4 +1,6 @@
-from sqlalchemy import select
+from collections.abc import Sequence
+
+from sqlalchemy import any_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.pagination import paginate
@@ -15,6 +17,12 @@ class QualificacaoRepository:
         )
         return result.scalar_one_or_none()
 
+    async def get_many_by_codigo(self, codigos: Sequence[str]) -> list[Qualificacao]:
+        result = await self.session.execute(
+            select(Qualificacao).where(Qualificacao.codigo == any_(list(codigos)))
+        )
+        return list(result.scalars().all())
+
     async def get_all(
         self,
         page: int = 1,
@@ -34,6 +42,11 @@ class QualificacaoRepository:
         await self.session.refresh(qualificacao)
         return qualificacao
 
+    async def create_many(self, qualificacaos: Sequence[Qualificacao]) -> None:
+        """Adiciona vários registros e faz um único flush (sem refresh); inclui alterações pendentes."""
+        self.session.add_all(qualificacaos)
+        await self.session.flush()
+
     async def delete(self, qualificacao: Qualificacao) -> None:
         await self.session.delete(qualificacao)
         await self.session.flush()
@@ -1,4 +1,6 @@
-from sqlalchemy import select
+from collections.abc import Sequence
+
+from sqlalchemy import any_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.pagination import paginate
@@ -15,6 +17,12 @@ class SimplesRepository:
         )
         return result.scalar_one_or_none()
 
+    async def get_many_by_cnpj_basico(self, cnpjs_basicos: Sequence[str]) -> list[Simples]:
+        result = await self.session.execute(
+            select(Simples).where(Simples.cnpj_basico == any_(list(cnpjs_basicos)))
+        )
+        return list(result.scalars().all())
+
     async def get_all(
         self,
         page: int = 1,
@@ -34,6 +42,11 @@ class SimplesRepository:
         await self.session.refresh(simples)
         return simples
 
+    async def create_many(self, simples_list: Sequence[Simples]) -> None:
+        """Adiciona vários registros e faz um único flush (sem refresh); inclui alterações pendentes."""
+        self.session.add_all(simples_list)
+        await self.session.flush()
+
     async def delete(self, simples: Simples) -> None:
         await self.session.delete(simples)
         await self.session.flush()
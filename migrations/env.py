@@ -1,6 +1,7 @@
 import importlib
 import os
 import pkgutil
+import re
 from logging.config import fileConfig
 
 from alembic import context
@@ -22,6 +23,20 @@ if config.config_file_name is not None:
 target_metadata = mapper_registry.metadata
 DATABASE_URL = settings.sync_database_url
 
+# Cópias das tabelas na recarga blue/green do ETL (app/etl/swap.py): não são modelos
+ETL_SWAP_SUFFIXES = ('_next', '_old', '_swap')
+# Partições criadas pelas migrations (ex.: estabelecimentos_p00): o modelo é a tabela particionada
+PARTITION_NAME = re.compile(r'(?P<table>.+)_p\d+')
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and reflected and compare_to is None:
+        partition = PARTITION_NAME.fullmatch(name)
+        if partition and partition['table'] in target_metadata.tables:
+            return False
+        return not name.endswith(ETL_SWAP_SUFFIXES)
+    return True
+
 
 def run_migrations_offline():
     context.configure(
@@ -29,6 +44,7 @@ def run_migrations_offline():
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={'paramstyle': 'named'},
+        include_object=include_object,
     )
     with context.begin_transaction():
         context.run_migrations()
@@ -38,7 +54,9 @@ def run_migrations_online():
     connectable = create_engine(DATABASE_URL, poolclass=pool.NullPool)
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,53 @@
+"""cnae_fiscal_secundaria array
+
+Revision ID: 6f2a8d4c1b93
+Revises: a4f2c81d6b37
+Create Date: 2026-10-18 21:07:33.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f2a8d4c1b93'
+down_revision: Union[str, Sequence[str], None] = 'a4f2c81d6b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = 'ix_estabelecimentos_cnae_fiscal_secundaria'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Texto da Receita ('6201501,6202300') -> array de códigos; vazio vira NULL
+    op.alter_column(
+        'estabelecimentos',
+        'cnae_fiscal_secundaria',
+        type_=postgresql.ARRAY(sa.String(length=7)),
+        existing_nullable=True,
+        postgresql_using="string_to_array(NULLIF(replace(cnae_fiscal_secundaria, ' ', ''), ''), ',')::varchar(7)[]",
+    )
+    # Na tabela mãe: o Postgres cria o índice em cada partição
+    op.create_index(
+        INDEX_NAME,
+        'estabelecimentos',
+        ['cnae_fiscal_secundaria'],
+        postgresql_using='gin',
+    )
+    op.execute('ANALYZE estabelecimentos')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(INDEX_NAME, table_name='estabelecimentos')
+    op.alter_column(
+        'estabelecimentos',
+        'cnae_fiscal_secundaria',
+        type_=sa.String(),
+        existing_nullable=True,
+        postgresql_using="array_to_string(cnae_fiscal_secundaria, ',')",
+    )
@@ -0,0 +1,86 @@
+"""partition estabelecimentos
+
+Revision ID: a4f2c81d6b37
+Revises: 5e1b7c2d9a40
+Create Date: 2026-10-18 19:24:05.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4f2c81d6b37'
+down_revision: Union[str, Sequence[str], None] = '5e1b7c2d9a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+
+PK_COLUMNS = ['cnpj_basico', 'cnpj_ordem', 'cnpj_dv']
+FOREIGN_KEYS = [
+    ('estabelecimentos_cnpj_basico_fkey', 'empresas', 'cnpj_basico', 'cnpj_basico'),
+    ('estabelecimentos_motivo_situacao_cadastral_fkey', 'motivos', 'motivo_situacao_cadastral', 'codigo'),
+    ('estabelecimentos_pais_fkey', 'paises', 'pais', 'codigo'),
+    ('estabelecimentos_cnae_fiscal_principal_fkey', 'cnaes', 'cnae_fiscal_principal', 'codigo'),
+    ('estabelecimentos_municipio_fkey', 'municipios', 'municipio', 'codigo'),
+]
+
+# Hash de partição de cnpj_basico. O Postgres escolhe a partição por
+# hash_combine64(0, h) % modulus = (h + 0x49a0f4dd15e5a8e3) % modulus (partbounds.c);
+# descontando a constante, a partição de um cnpj_basico numérico é cnpj_basico::bigint % modulus,
+# que o ETL calcula sem ir ao banco (app/etl/partitions.py). Outros valores usam o hash de text.
+HASH_FUNCTION = """
+CREATE FUNCTION cnpj_basico_partition_hash(value text, seed bigint) RETURNS bigint
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT CASE
+        WHEN value ~ '^[0-9]{1,18}$' THEN value::bigint - 5305509591434766563
+        ELSE hashtextextended(value, seed)
+    END
+$$
+"""
+HASH_OPCLASS = """
+CREATE OPERATOR CLASS cnpj_basico_partition_ops FOR TYPE text USING hash AS
+    OPERATOR 1 = (text, text),
+    FUNCTION 2 cnpj_basico_partition_hash(text, bigint)
+"""
+
+
+def _add_constraints() -> None:
+    op.create_primary_key('estabelecimentos_pkey', 'estabelecimentos', PK_COLUMNS)
+    for name, referent, column, remote in FOREIGN_KEYS:
+        op.create_foreign_key(name, 'estabelecimentos', referent, [column], [remote])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(HASH_FUNCTION)
+    op.execute(HASH_OPCLASS)
+    op.execute(
+        'CREATE TABLE estabelecimentos_partitioned (LIKE estabelecimentos INCLUDING DEFAULTS) '
+        'PARTITION BY HASH (cnpj_basico cnpj_basico_partition_ops)'
+    )
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f'CREATE TABLE estabelecimentos_p{remainder:02d} PARTITION OF estabelecimentos_partitioned '
+            f'FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})'
+        )
+    op.execute('INSERT INTO estabelecimentos_partitioned SELECT * FROM estabelecimentos')
+    op.drop_table('estabelecimentos')
+    op.rename_table('estabelecimentos_partitioned', 'estabelecimentos')
+    _add_constraints()
+    op.execute('ANALYZE estabelecimentos')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('CREATE TABLE estabelecimentos_heap (LIKE estabelecimentos INCLUDING DEFAULTS)')
+    op.execute('INSERT INTO estabelecimentos_heap SELECT * FROM estabelecimentos')
+    op.drop_table('estabelecimentos')
+    op.rename_table('estabelecimentos_heap', 'estabelecimentos')
+    _add_constraints()
+    # Remove também a classe de operadores (criada com uma família de mesmo nome)
+    op.execute('DROP OPERATOR FAMILY cnpj_basico_partition_ops USING hash')
+    op.execute('DROP FUNCTION cnpj_basico_partition_hash(text, bigint)')
@@ -0,0 +1,39 @@
+"""Schema de leitura de estabelecimentos: formato de cnae_fiscal_secundaria na API."""
+from datetime import date
+
+from app.api.v1.estabelecimentos.schemas import EstabelecimentoRead
+from app.models.estabelecimento import Estabelecimento
+
+
+def _estabelecimento(cnaes):
+    return Estabelecimento(
+        cnpj_basico="12345678",
+        cnpj_ordem="0001",
+        cnpj_dv="95",
+        identificador_matriz_filial="1",
+        nome_fantasia="EXEMPLO",
+        situacao_cadastral="02",
+        data_situacao_cadastral=date(2020, 1, 31),
+        motivo_situacao_cadastral="00",
+        cnae_fiscal_principal="6201501",
+        cnae_fiscal_secundaria=cnaes,
+        tipo_logradouro="RUA",
+        logradouro="EXEMPLO",
+        numero="1",
+        bairro="CENTRO",
+        cep="01001000",
+        uf="SP",
+        municipio="7107",
+    )
+
+
+def test_cnae_fiscal_secundaria_keeps_comma_separated_text():
+    data = EstabelecimentoRead.model_validate(_estabelecimento(["6201501", "6202300"])).model_dump()
+    assert data["cnae_fiscal_secundaria"] == "6201501,6202300"
+    assert data["cnaes_secundarios"] == ["6201501", "6202300"]
+
+
+def test_cnae_fiscal_secundaria_empty():
+    data = EstabelecimentoRead.model_validate(_estabelecimento(None)).model_dump()
+    assert data["cnae_fiscal_secundaria"] is None
+    assert data["cnaes_secundarios"] is None
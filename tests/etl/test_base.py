@@ -0,0 +1,125 @@
+"""BaseCSVPipeline: redução de chaves repetidas no bloco e divisão dos registros entre writers."""
+import pytest
+
+from app.etl.partitions import HashPartitions
+from app.etl.pipelines import EstabelecimentosPipeline, PaisesPipeline
+
+
+def _record(pipeline, **values):
+    """Registro (tupla na ordem de columns) com os valores dados e None nas demais colunas."""
+    return tuple(values.get(column) for column in pipeline.columns)
+
+
+def _stats():
+    return {"duplicates": 0}
+
+
+def test_collapse_duplicates_keeps_last_occurrence():
+    pipeline = PaisesPipeline(None)
+    records = [
+        _record(pipeline, codigo="001", descricao="A"),
+        _record(pipeline, codigo="002", descricao="A"),
+        _record(pipeline, codigo="001", descricao="B"),
+        _record(pipeline, codigo="003", descricao="A"),
+        _record(pipeline, codigo="001", descricao="C"),
+    ]
+    stats = _stats()
+
+    collapsed = pipeline._collapse_duplicates(records, stats)
+
+    # Uma por chave, com os valores da última ocorrência (na posição da primeira)
+    assert collapsed == [records[4], records[1], records[3]]
+    assert stats["duplicates"] == 2
+
+
+def test_collapse_duplicates_without_repeats_returns_block():
+    pipeline = PaisesPipeline(None)
+    records = [_record(pipeline, codigo=codigo) for codigo in ("001", "002", "003")]
+    stats = _stats()
+    assert pipeline._collapse_duplicates(records, stats) is records
+    assert stats["duplicates"] == 0
+
+
+def test_collapse_duplicates_uses_composite_key():
+    pipeline = EstabelecimentosPipeline(None)
+    matriz = dict(cnpj_basico="12345678", cnpj_ordem="0001", cnpj_dv="95")
+    filial = dict(cnpj_basico="12345678", cnpj_ordem="0002", cnpj_dv="76")
+    records = [
+        _record(pipeline, **matriz, nome_fantasia="A"),
+        _record(pipeline, **filial, nome_fantasia="A"),
+        _record(pipeline, **matriz, nome_fantasia="B"),
+    ]
+    stats = _stats()
+
+    # Mesmo cnpj_basico com ordem diferente não é repetição
+    assert pipeline._collapse_duplicates(records, stats) == [records[2], records[1]]
+    assert stats["duplicates"] == 1
+
+
+def _estabelecimento(pipeline, basico, ordem="0001", dv="00"):
+    return _record(pipeline, cnpj_basico=basico, cnpj_ordem=ordem, cnpj_dv=dv)
+
+
+def _owners(pipeline, groups, key):
+    """Writers que receberam cada chave."""
+    owners = {}
+    for writer, records in enumerate(groups):
+        for record in records:
+            owners.setdefault(key(record), set()).add(writer)
+    return owners
+
+
+ESTABELECIMENTOS = [
+    (basico, ordem, dv)
+    for basico in ("00000000", "12345678", "33683111", "99999999", "ABC00001")
+    for ordem, dv in (("0001", "91"), ("0002", "72"), ("0003", "53"))
+]
+
+
+@pytest.mark.parametrize("writers", [2, 3, 8])
+def test_split_by_writer_routes_composite_key_to_one_writer(writers):
+    pipeline = EstabelecimentosPipeline(None)
+    records = [_estabelecimento(pipeline, *key) for key in ESTABELECIMENTOS]
+    # Repetições em lotes diferentes (e fora de ordem) precisam cair no mesmo writer
+    first = pipeline._split_by_writer(records, writers)
+    second = pipeline._split_by_writer(list(reversed(records)) + records[:3], writers)
+
+    assert len(first) == writers
+    assert sorted(r for group in first for r in group) == sorted(records)
+    owners = _owners(pipeline, first, pipeline._record_key)
+    assert all(len(owner) == 1 for owner in owners.values())
+    assert _owners(pipeline, second, pipeline._record_key) == owners
+    # A ordem do bloco se mantém dentro de cada writer
+    for group in first:
+        assert group == [r for r in records if r in group]
+
+
+@pytest.mark.parametrize("writers", [2, 3, 16])
+def test_split_by_writer_gives_each_partition_to_one_writer(writers):
+    pipeline = EstabelecimentosPipeline(None)
+    names = [f"estabelecimentos_p{i:02d}" for i in range(16)]
+    pipeline._partitions = HashPartitions("estabelecimentos", "cnpj_basico", 16, names)
+    records = [_estabelecimento(pipeline, f"{n:08d}", f"{o:04d}") for n in range(0, 400, 7) for o in (1, 2)]
+    records.append(_estabelecimento(pipeline, "ABC00001"))  # não numérico: fica com a tabela mãe
+
+    groups = pipeline._split_by_writer(records, writers)
+
+    assert sorted(r for group in groups for r in group) == sorted(records)
+    index = pipeline.columns.index("cnpj_basico")
+    by_partition = _owners(pipeline, groups, lambda r: pipeline._partitions.partition_of(r[index]))
+    # Cada partição (e a mãe) com um só writer: dois writers nunca gravam a mesma linha nem
+    # disputam a mesma partição
+    assert all(len(owner) == 1 for owner in by_partition.values())
+    assert all(len(owner) == 1 for owner in _owners(pipeline, groups, pipeline._record_key).values())
+    if writers == 16:
+        # Um writer por partição: o resto da divisão por 16 é o próprio writer
+        for writer, group in enumerate(groups):
+            assert {pipeline._partitions.partition_of(r[index]) for r in group} - {"estabelecimentos"} <= {names[writer]}
+
+
+def test_split_by_writer_single_column_key():
+    pipeline = PaisesPipeline(None)
+    records = [_record(pipeline, codigo=f"{n:03d}") for n in range(50)]
+    groups = pipeline._split_by_writer(records + records[:10], 4)
+    assert all(len(owner) == 1 for owner in _owners(pipeline, groups, pipeline._record_key).values())
+    assert sum(map(len, groups)) == 60
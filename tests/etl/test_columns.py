@@ -0,0 +1,160 @@
+"""ColumnSpec: conversor compilado, cache por coluna, motivos de rejeição e render_fields."""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.etl import columns
+from app.etl.columns import ColumnSpec, compile_converter, parse_date, parse_decimal, rejection_reason, render_fields
+from app.etl.pipelines import (
+    CnaesPipeline,
+    EmpresasPipeline,
+    EstabelecimentosPipeline,
+    MotivosPipeline,
+    MunicipiosPipeline,
+    NaturezasPipeline,
+    PaisesPipeline,
+    QualificacoesPipeline,
+    SimplesPipeline,
+)
+
+PIPELINES = [
+    CnaesPipeline,
+    EmpresasPipeline,
+    EstabelecimentosPipeline,
+    MotivosPipeline,
+    MunicipiosPipeline,
+    NaturezasPipeline,
+    PaisesPipeline,
+    QualificacoesPipeline,
+    SimplesPipeline,
+]
+
+
+class Counting:
+    """Conversor que conta as chamadas (para conferir o cache)."""
+
+    def __init__(self, convert):
+        self.convert = convert
+        self.calls = 0
+
+    def __call__(self, raw):
+        self.calls += 1
+        return self.convert(raw)
+
+
+def test_converter_rules():
+    specs = [
+        ColumnSpec("codigo", 0, max_len=3, required=True),
+        ColumnSpec("descricao", 1, max_len=5, default="SEM"),
+        ColumnSpec("data", 2, type=parse_date),
+        ColumnSpec("valor", 3, type=parse_decimal, default=Decimal("0.00")),
+    ]
+    convert = compile_converter(specs, ["valor", "codigo", "descricao", "data"])
+
+    # Colunas na ordem pedida; strip antes das regras; max_len trunca
+    assert convert([" 0123 ", " ABCDEFG ", "20240131", "10,50"]) == (Decimal("10.50"), "012", "ABCDE", date(2024, 1, 31))
+    # Vazio ou inválido (conversor devolve None) em coluna opcional: default
+    assert convert(["1", "  ", "2024013", "x"]) == (Decimal("0.00"), "1", "SEM", None)
+    # Obrigatória vazia: linha descartada
+    assert convert(["  ", "A", "", ""]) is None
+    # Linha curta: IndexError (conta como erro, não como rejeição)
+    with pytest.raises(IndexError):
+        convert(["1", "A"])
+
+
+def test_required_column_with_invalid_value_drops_row():
+    convert = compile_converter([ColumnSpec("data", 0, type=parse_date, required=True)], ["data"])
+    assert convert(["20240230"]) is None
+    assert convert(["20240229"]) == (date(2024, 2, 29),)
+
+
+def test_converter_checks_specs_against_columns():
+    specs = [ColumnSpec("a", 0), ColumnSpec("b", 1)]
+    with pytest.raises(ValueError, match="sem ColumnSpec"):
+        compile_converter(specs, ["a", "b", "c"])
+    with pytest.raises(ValueError, match="inexistentes"):
+        compile_converter(specs, ["a"])
+
+
+def test_cache_converts_each_raw_value_once():
+    counting = Counting(parse_date)
+    convert = compile_converter([ColumnSpec("data", 0, type=counting, cache=True)], ["data"])
+
+    first = convert(["20240131"])[0]
+    assert convert(["20240131"])[0] is first
+    assert convert(["20240201"]) == (date(2024, 2, 1),)
+    assert counting.calls == 2
+    # A chave é o texto bruto: com espaços é outro valor no cache, com o mesmo resultado
+    assert convert([" 20240131 "]) == (first,)
+    assert counting.calls == 3
+
+
+def test_cache_remembers_dropped_rows():
+    counting = Counting(parse_date)
+    convert = compile_converter([ColumnSpec("data", 0, type=counting, required=True, cache=True)], ["data"])
+    assert convert(["invalida"]) is None
+    assert convert(["invalida"]) is None
+    assert counting.calls == 1
+    # _DROP fica no cache, nunca no registro
+    assert convert([""]) is None
+    assert convert(["20240131"]) == (date(2024, 1, 31),)
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(columns, "CACHE_SIZE", 2)
+    counting = Counting(str.upper)
+    convert = compile_converter([ColumnSpec("uf", 0, type=counting, cache=True)], ["uf"])
+    for raw in ["sp", "rj", "mg", "mg", "sp"]:
+        convert([raw])
+    # sp e rj memorizados; mg, que chegou com o cache cheio, é convertido a cada vez
+    assert counting.calls == 4
+
+
+def test_caches_are_per_column():
+    specs = [ColumnSpec("a", 0, type=str.upper, cache=True), ColumnSpec("b", 1, type=str.lower, cache=True)]
+    convert = compile_converter(specs, ["a", "b"])
+    assert convert(["Xy", "Xy"]) == ("XY", "xy")
+
+
+def test_rejection_reason():
+    specs = [
+        ColumnSpec("opcional", 0),
+        ColumnSpec("codigo", 1, required=True),
+        ColumnSpec("data", 2, type=parse_date, required=True),
+    ]
+    assert rejection_reason(specs, ["", " ", "20240131"]) == "empty_codigo"
+    assert rejection_reason(specs, ["", "1", "2024"]) == "invalid_data"
+    assert rejection_reason(specs, ["", "1", ""]) == "empty_data"
+    # Obrigatórias em ordem: o descarte veio de outra regra (ex.: código de domínio)
+    assert rejection_reason(specs, ["", "1", "20240131"]) == "rejected"
+
+
+def _sample_field(spec: ColumnSpec) -> str:
+    """Valor válido para a coluna, no formato do CSV da Receita."""
+    if spec.type is parse_date:
+        return "20240131"
+    if spec.type is parse_decimal:
+        return "1000,50"
+    if spec.name == "cnae_fiscal_secundaria":
+        return "6201501,6202300"
+    if spec.name.startswith("opcao_"):
+        return "S"
+    return "1" * (spec.max_len or 8)
+
+
+@pytest.mark.parametrize("pipeline_cls", PIPELINES, ids=lambda cls: cls.__name__)
+@pytest.mark.parametrize("optional", ["filled", "empty"])
+def test_render_fields_round_trip(pipeline_cls, optional):
+    pipeline = pipeline_cls(None)
+    specs = pipeline.column_specs
+    fields = [""] * pipeline._row_width
+    for spec in specs:
+        if spec.required or optional == "filled":
+            fields[spec.index] = _sample_field(spec)
+
+    record = pipeline._convert(fields)
+    assert record is not None
+    rendered = render_fields(specs, dict(zip(pipeline.columns, record)), pipeline._row_width)
+    assert len(rendered) == pipeline._row_width
+    assert pipeline._convert(rendered) == record
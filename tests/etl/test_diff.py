@@ -0,0 +1,145 @@
+"""Diff entre releases (--since): inseridas, alteradas, iguais e removidas, e a remoção no banco."""
+import asyncio
+import csv
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.etl import diff as diff_module
+from app.etl.diff import diff_snapshots
+from app.etl.pipelines.paises import PaisesPipeline
+
+OLD = [
+    ["001", "IGUAL"],
+    ["002", "ANTES"],
+    ["003", "REMOVIDO"],
+    ["004", "SÃO TOMÉ"],
+]
+NEW = [
+    ["001", "IGUAL"],
+    ["002", "DEPOIS"],
+    ["004", "SÃO TOMÉ"],
+    ["005", "NOVO"],
+]
+
+
+def _write(path, rows):
+    with path.open("w", newline="", encoding="latin-1") as f:
+        csv.writer(f, delimiter=";", quoting=csv.QUOTE_ALL).writerows(rows)
+    return path
+
+
+class PaisesPorDescricao(PaisesPipeline):
+    """Chave do diff na segunda coluna: linhas curtas ficam sem chave."""
+
+    diff_key_fields = ("descricao",)
+
+
+def _diff(tmp_path, old, new, pipeline_cls=PaisesPipeline, **kwargs):
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    old_path = _write(tmp_path / "old.PAISCSV", old)
+    new_path = _write(tmp_path / "new.PAISCSV", new)
+    diff = diff_snapshots(pipeline_cls(None), [old_path], [new_path], workdir, **kwargs)
+    with diff.changes_path.open(newline="", encoding="latin-1") as f:
+        changes = list(csv.reader(f, delimiter=";"))
+    with diff.removed_path.open(newline="", encoding="utf-8") as f:
+        removed = list(csv.reader(f))
+    return diff, changes, removed
+
+
+@pytest.mark.parametrize("bucket_bytes", [1, 1024 * 1024], ids=["many_buckets", "one_bucket"])
+def test_diff_buckets(tmp_path, bucket_bytes):
+    diff, changes, removed = _diff(tmp_path, OLD, NEW, bucket_bytes=bucket_bytes)
+
+    assert diff.summary == {"inserted": 1, "changed": 1, "unchanged": 2, "removed": 1}
+    assert sorted(changes) == [["002", "DEPOIS"], ["005", "NOVO"]]
+    assert removed == [["003"]]
+    # Buckets intermediários são apagados
+    assert sorted(p.name for p in (tmp_path / "work").iterdir()) == ["changes.csv", "removed.csv"]
+
+
+def test_diff_key_is_stripped(tmp_path):
+    diff, changes, removed = _diff(tmp_path, [["001", "A"]], [[" 001 ", "A"]])
+    # Mesma chave; a linha mudou (espaços), então é alterada e não inserida + removida
+    assert diff.summary == {"inserted": 0, "changed": 1, "unchanged": 0, "removed": 0}
+    assert changes == [[" 001 ", "A"]]
+
+
+def test_malformed_lines_go_to_changes(tmp_path):
+    new = [["001", "A"], [], ["006"], ["007"]]
+    diff, changes, removed = _diff(tmp_path, [["001", "A"]], new, PaisesPorDescricao)
+    # Linhas vazias são ignoradas; as sem chave seguem como alteradas para o pipeline contar o erro
+    assert changes == [["006"], ["007"]]
+    assert diff.summary == {"inserted": 1, "changed": 1, "unchanged": 1, "removed": 0}
+    assert removed == []
+
+
+def test_duplicate_keys_in_new_release(tmp_path):
+    old = [["001", "A"], ["002", "A"], ["003", "A"]]
+    new = [
+        ["001", "A"],  # igual à anterior
+        ["001", "B"],  # alterada em relação à ocorrência anterior
+        ["002", "B"],
+        ["002", "B"],  # repetição idêntica: não grava de novo
+        ["004", "A"],
+        ["004", "B"],
+    ]
+    diff, changes, removed = _diff(tmp_path, old, new)
+
+    assert diff.summary == {"inserted": 1, "changed": 3, "unchanged": 2, "removed": 1}
+    assert changes == [["001", "B"], ["002", "B"], ["004", "A"], ["004", "B"]]
+    assert removed == [["003"]]
+    # Carregadas na ordem, a última ocorrência de cada chave prevalece
+    assert {key: value for key, value in changes} == {"001": "B", "002": "B", "004": "B"}
+
+
+def test_duplicate_keys_in_old_release(tmp_path):
+    # Na release anterior vale a última ocorrência (a que ficou no banco)
+    diff, changes, removed = _diff(tmp_path, [["001", "A"], ["001", "B"]], [["001", "B"]])
+    assert diff.summary == {"inserted": 0, "changed": 0, "unchanged": 1, "removed": 0}
+    assert changes == [] and removed == []
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = self.rollbacks = 0
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+class PaisesComRemocao(PaisesPipeline):
+    """delete_batch em memória; o lote com "002" falha (como um código ainda referenciado)."""
+
+    deleted: list = []
+
+    async def delete_batch(self, keys):
+        if ("002",) in keys:
+            raise ValueError("violates foreign key constraint")
+        self.deleted.extend(keys)
+        return len(keys)
+
+
+def test_apply_removals_commits_each_batch(tmp_path, monkeypatch):
+    session = FakeSession()
+
+    @asynccontextmanager
+    async def fake_session():
+        yield session
+
+    monkeypatch.setattr(diff_module, "get_async_session", fake_session)
+    monkeypatch.setattr(PaisesComRemocao, "deleted", [])
+    old = [[f"{n:03d}", "A"] for n in range(1, 6)]
+    diff, _, removed = _diff(tmp_path, old, [["005", "A"]])
+    assert removed == [["001"], ["002"], ["003"], ["004"]]
+
+    stats = asyncio.run(diff_module.apply_removals(PaisesComRemocao, diff, batch_size=2))
+
+    # Domínios também removem; o lote que falha conta como erro e os demais seguem
+    assert stats == {"deleted": 2, "errors": 2}
+    assert PaisesComRemocao.deleted == [("003",), ("004",)]
+    assert (session.commits, session.rollbacks) == (1, 1)
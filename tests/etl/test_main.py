@@ -0,0 +1,43 @@
+"""CLI do ETL: modo de carga do delta no --since."""
+import argparse
+import asyncio
+import csv
+
+import pytest
+
+from app.etl import __main__ as cli
+from app.etl.pipelines import PaisesPipeline
+from app.etl.runner import FileResult, FileSetReport
+
+
+def _write(path, rows):
+    with path.open("w", newline="", encoding="latin-1") as f:
+        csv.writer(f, delimiter=";", quoting=csv.QUOTE_ALL).writerows(rows)
+    return path
+
+
+@pytest.mark.parametrize("mode", ["orm", "copy", "upsert"])
+def test_since_loads_delta_with_upsert(tmp_path, monkeypatch, mode):
+    old = _write(tmp_path / "old.PAISCSV", [["001", "A"], ["002", "A"]])
+    new = _write(tmp_path / "new.PAISCSV", [["001", "B"], ["003", "A"]])
+    calls = {}
+
+    async def run_files(pipeline_cls, paths, **kwargs):
+        with paths[0].open(encoding="latin-1") as f:
+            calls["delta"] = f.read()
+        calls["mode"] = kwargs["mode"]
+        return FileSetReport([FileResult(paths[0], True, {"processed": 2})])
+
+    async def apply_removals(pipeline_cls, diff, **kwargs):
+        return {"deleted": diff.removed, "errors": 0}
+
+    monkeypatch.setattr(cli, "run_files", run_files)
+    monkeypatch.setattr(cli, "apply_removals", apply_removals)
+    args = argparse.Namespace(since=str(old), work_dir=str(tmp_path), metrics_json=None, metrics_prom=None)
+
+    code = asyncio.run(cli._run_since(args, PaisesPipeline, [new], mode=mode, debug=False))
+
+    # Alterada (001) e inserida (003) vão juntas no delta: só o upsert grava as duas
+    assert code == 0
+    assert calls["mode"] == "upsert"
+    assert sorted(calls["delta"].splitlines()) == ['"001";"B"', '"003";"A"']
@@ -0,0 +1,182 @@
+"""Leitura paralela por faixas de bytes: as faixas juntas leem o mesmo que a leitura serial."""
+import asyncio
+import csv
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from app.etl.metrics import RunMetrics
+from app.etl.pipelines.paises import PaisesPipeline
+from app.etl.readers import parallel
+from app.etl.readers.parallel import _is_record_end, _next_boundary, iter_parallel_ranges, parse_range, split_ranges
+
+# Campos com \n, aspas escapadas ("") e ; dentro das aspas, e campos vazios ou só de aspas
+ROWS = [
+    ["001", "SIMPLES"],
+    ["002", "COM ; DENTRO"],
+    ["003", "QUEBRA\nDE LINHA"],
+    ["004", 'ASPAS "DENTRO"'],
+    ["005", ""],
+    ["006", '"'],
+    ["007", 'TERMINA EM ASPAS"'],
+    ["008", 'QUEBRA\n"ASPAS" E ; JUNTOS'],
+    ["009", "TERMINA EM QUEBRA\n"],
+    ["010", "BIRMÂNIA"],
+]
+
+
+def _write(path, rows, lineterminator="\n"):
+    """Grava as linhas como nos arquivos da Receita; retorna o offset de início de cada registro."""
+    starts = []
+    with path.open("wb") as f:
+        for row in rows:
+            starts.append(f.tell())
+            line = io.StringIO()
+            csv.writer(line, delimiter=";", quoting=csv.QUOTE_ALL, lineterminator=lineterminator).writerow(row)
+            f.write(line.getvalue().encode("latin-1"))
+    return starts
+
+
+def _serial(path):
+    with path.open(encoding="latin-1", newline="") as f:
+        return [row for row in csv.reader(f, delimiter=";") if row]
+
+
+def _read_ranges(path, ranges):
+    rows = []
+    with path.open("rb") as f:
+        for start, end in ranges:
+            f.seek(start)
+            text = f.read(end - start).decode("latin-1")
+            rows += [row for row in csv.reader(io.StringIO(text, newline=""), delimiter=";") if row]
+    return rows
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [
+        (b'"1";"a"\n', True),
+        (b'"1";"a"\r\n', True),
+        (b'"1";""\n', True),  # campo vazio
+        (b'"1";""""\n', True),  # campo só com uma aspa
+        (b'"1";"a"""\n', True),  # campo terminando em aspa escapada
+        (b'"1";"a""\n', False),  # aspa escapada, \n dentro do campo
+        (b'"1";"a\n', False),
+        (b"1;a\n", False),
+        (b"\n", False),
+    ],
+)
+def test_is_record_end(data, expected):
+    assert _is_record_end(data, len(data) - 1, ord(";")) is expected
+
+
+@pytest.mark.parametrize("lineterminator", ["\n", "\r\n"])
+def test_split_ranges_align_to_records(tmp_path, lineterminator):
+    path = tmp_path / "paises.csv"
+    starts = set(_write(path, ROWS, lineterminator))
+    size = path.stat().st_size
+    for chunk_bytes in range(1, size + 2):
+        ranges = split_ranges(path, chunk_bytes)
+        assert ranges[0][0] == 0 and ranges[-1][1] == size
+        assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        assert {start for start, _ in ranges} <= starts
+        assert _read_ranges(path, ranges) == _serial(path) == ROWS
+
+
+@pytest.mark.parametrize("lineterminator", ["\n", "\r\n"])
+def test_next_boundary_at_scan_buffer_edge(tmp_path, monkeypatch, lineterminator):
+    # Buffer de varredura só um pouco maior que o recuo de 64 bytes: o \n candidato cai na borda
+    monkeypatch.setattr(parallel, "_SCAN_BYTES", 65)
+    path = tmp_path / "paises.csv"
+    starts = _write(path, ROWS, lineterminator)
+    size = path.stat().st_size
+    with path.open("rb") as f:
+        for offset in range(1, size):
+            expected = next((s for s in starts if s >= offset), size)
+            assert _next_boundary(f, offset, size, True, ord(";")) == expected
+
+
+def test_split_ranges_from_start_offset(tmp_path):
+    path = tmp_path / "paises.csv"
+    starts = _write(path, ROWS)
+    ranges = split_ranges(path, 16, start=starts[3])
+    assert ranges[0][0] == starts[3]
+    assert _read_ranges(path, ranges) == ROWS[3:]
+    assert split_ranges(path, 16, start=path.stat().st_size) == []
+
+
+def test_parse_range_matches_serial_conversion(tmp_path, monkeypatch):
+    # Blocos de uma linha: as marks saem exatamente a cada `every` registros
+    monkeypatch.setattr(parallel, "_BLOCK_ROWS", 1)
+    path = tmp_path / "paises.csv"
+    _write(path, ROWS)
+    pipeline = PaisesPipeline(None)
+
+    records = []
+    for start, end in split_ranges(path, 40):
+        result = parse_range(PaisesPipeline, str(path), start, end, 2)
+        records += result.records
+        assert [count for count, *_ in result.marks] == list(range(2, len(result.records) + 1, 2))
+        # Cada mark é um ponto de commit: o offset fica logo após o último registro contado
+        with path.open("rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        for count, offset, line, _ in result.marks:
+            converted = [pipeline._convert(row) for row in _read_bytes(data[:offset])]
+            assert [record for record in converted if record is not None] == result.records[:count]
+            assert line == data[:offset].count(b"\n")
+    # O "005" tem descricao vazia (obrigatória): vai para os rejeitos nas duas leituras
+    assert records == [record for record in map(pipeline._convert, ROWS) if record is not None]
+
+
+def _read_bytes(data):
+    return [row for row in csv.reader(io.StringIO(data.decode("latin-1"), newline=""), delimiter=";") if row]
+
+
+def test_parallel_file_smaller_than_workers(tmp_path):
+    path = tmp_path / "paises.csv"
+    _write(path, ROWS[:2])
+    pipeline = PaisesPipeline(None)
+    assert len(split_ranges(path, pipeline.parallel_chunk_bytes)) == 1
+
+    async def collect():
+        return [result async for result in iter_parallel_ranges(pipeline, path, workers=4, batch_size=1)]
+
+    results = asyncio.run(collect())
+    assert [record for result in results for record in result.records] == [pipeline._convert(r) for r in ROWS[:2]]
+    assert sum(result.lines for result in results) == 2
+
+
+class RecordingPool(ProcessPoolExecutor):
+    """ProcessPoolExecutor que registra os shutdowns."""
+
+    shutdowns: list[bool] = []
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shutdowns.append(cancel_futures)
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def test_failed_load_shuts_pool_down(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr(RecordingPool, "shutdowns", [])
+    path = tmp_path / "paises.csv"
+    _write(path, ROWS * 100)
+    pipeline = PaisesPipeline(None)
+    pipeline.parallel_chunk_bytes = 64
+    pipeline.metrics = RunMetrics("paises", str(path), "copy", 2)
+
+    async def load_chunks(chunks, stats, **load):
+        async for _ in chunks:
+            raise RuntimeError("falha na carga")
+
+    pipeline._load_chunks = load_chunks
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await pipeline._run_parallel(path, {"errors": 0}, workers=2, start=None, show_progress=False, mode="copy")
+        # Já encerrado ao propagar o erro, sem depender do coletor de lixo
+        return list(RecordingPool.shutdowns)
+
+    assert asyncio.run(run()) == [True]
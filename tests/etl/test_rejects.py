@@ -0,0 +1,147 @@
+"""RejectWriter: troca do destino no commit e retomada do temporário de uma carga interrompida."""
+import csv
+import gzip
+
+import pytest
+
+from app.etl.rejects import RejectWriter, is_rejects_file, iter_rejected_rows, open_rejects, rejects_path_for
+
+
+def _writer(path, buffer_size=2):
+    return RejectWriter(path, encoding="latin-1", delimiter=";", buffer_size=buffer_size)
+
+
+def _write_rows(writer, start, end):
+    for n in range(start, end):
+        writer.write(n, "empty_descricao", [f"{n:03d}", "BIRMÂNIA"])
+
+
+def _read(path):
+    with open_rejects(path, "latin-1") as source:
+        return list(iter_rejected_rows(csv.reader(source.text, delimiter=";")))
+
+
+def _expected(start, end):
+    return [(n, [f"{n:03d}", "BIRMÂNIA"]) for n in range(start, end)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return rejects_path_for(tmp_path / "paises.csv")
+
+
+def _tmp(path):
+    return path.with_name(path.name + ".new")
+
+
+def _previous(path):
+    """Destino deixado por uma execução anterior."""
+    writer = _writer(path)
+    _write_rows(writer, 100, 103)
+    writer.commit()
+
+
+def test_commit_replaces_destination(path):
+    _previous(path)
+    writer = _writer(path)
+    _write_rows(writer, 1, 6)
+    writer.write(None, "db_rejected", ["006", "X"])  # recusada pelo banco: sem número de linha
+    # Nada muda no destino antes do commit
+    assert _read(path) == _expected(100, 103)
+
+    writer.commit()
+
+    assert writer.count == 6
+    assert _read(path) == _expected(1, 6) + [(None, ["006", "X"])]
+    assert not _tmp(path).exists()
+
+
+def test_commit_without_rejects_removes_destination(path):
+    _previous(path)
+    writer = _writer(path)
+    writer.commit()
+    assert not path.exists() and not _tmp(path).exists()
+
+
+def test_discard_keeps_previous_destination(path):
+    _previous(path)
+    writer = _writer(path)
+    _write_rows(writer, 1, 6)
+    writer.discard()
+    assert _read(path) == _expected(100, 103)
+    assert not _tmp(path).exists()
+
+
+def test_resume_truncates_to_checkpoint(path):
+    first = _writer(path)
+    _write_rows(first, 1, 6)
+    first.suspend()
+
+    # Checkpoint confirmou 3 rejeitos: os 2 seguintes são refeitos pela retomada
+    second = _writer(path)
+    assert second.resume(3) is True
+    assert second.count == 3
+    _write_rows(second, 4, 8)
+    second.commit()
+
+    assert second.count == 7
+    assert _read(path) == _expected(1, 8)
+    assert not _tmp(path).exists()
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_resume_after_killed_process(path):
+    first = _writer(path)
+    _write_rows(first, 1, 5)
+    first.sync()
+    synced = _tmp(path).read_bytes()
+    _write_rows(first, 5, 9)  # depois do último checkpoint: não sincronizadas
+    first.discard()
+    # Processo morto após o sync: gzip sem o trailer
+    _tmp(path).write_bytes(synced)
+    with pytest.raises(EOFError):
+        with gzip.open(_tmp(path), "rt", encoding="latin-1") as f:
+            f.read()
+
+    second = _writer(path)
+    second.resume(10)
+    # Ficam só as sincronizadas, mesmo com keep maior
+    assert second.count == 4
+    second.commit()
+    assert _read(path) == _expected(1, 5)
+
+
+def test_resume_without_kept_rows_drops_stale_temporary(path):
+    _previous(path)
+    first = _writer(path)
+    _write_rows(first, 1, 6)
+    first.suspend()
+
+    second = _writer(path)
+    assert second.resume(0) is True
+    assert second.count == 0
+    second.commit()
+    assert not path.exists() and not _tmp(path).exists()
+
+
+def test_resume_without_temporary(path):
+    # O checkpoint conta 3 rejeitos, mas o temporário sumiu: a retomada perderia essas linhas
+    writer = _writer(path)
+    assert writer.resume(3) is False
+    assert writer.count == 0 and not _tmp(path).exists()
+    assert writer.resume(0) is True
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        ("K3241.K03200Y0.D40113.PAISCSV.rejects.csv.gz", True),
+        ("K3241.K03200Y0.D40113.PAISCSV.rejects.csv.gz.new", True),
+        ("K3241.K03200Y0.D40113.PAISCSV.rejects.csv.gz.new.old", True),
+        ("K3241.K03200Y0.D40113.PAISCSV", False),
+        ("Paises.zip", False),
+        ("rejects.csv", False),
+    ],
+)
+def test_is_rejects_file(tmp_path, name, expected):
+    assert is_rejects_file(tmp_path / name) is expected
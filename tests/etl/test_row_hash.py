@@ -0,0 +1,121 @@
+"""row_hash: hash do registro inteiro e reescrita só dos registros alterados no modo "orm"."""
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.etl.base import compute_row_hash
+from app.etl.pipelines import EmpresasPipeline, EstabelecimentosPipeline
+
+# Linha de ESTABELE com todos os campos preenchidos
+ESTABELECIMENTO = [
+    "12345678", "0001", "95", "1", "LOJA", "02", "20200101", "00", "", "105", "20000101", "6201501",
+    "6202300,6203100", "RUA", "DAS FLORES", "100", "SALA 1", "CENTRO", "01001-000", "SP", "7107",
+    "11", "33334444", "11", "55556666", "11", "77778888", "LOJA@EXEMPLO.COM", "", "",
+]
+
+
+def _hash(pipeline, row):
+    return pipeline._convert(row)[-1]
+
+
+@pytest.mark.parametrize(
+    ("field", "value"),
+    [
+        ("telefone1", "33334445"),
+        ("telefone2", "55556667"),
+        ("correio_eletronico", "OUTRO@EXEMPLO.COM"),
+        ("complemento", "SALA 2"),
+        ("cnae_fiscal_secundaria", "6202300"),
+        ("ddd_fax", "21"),
+        ("nome_cidade_exterior", "LISBOA"),
+    ],
+)
+def test_hash_covers_every_column(field, value):
+    # Colunas fora da comparação antiga de 10 campos também mudam o hash
+    pipeline = EstabelecimentosPipeline(None)
+    row = list(ESTABELECIMENTO)
+    row[pipeline.fieldnames.index(field)] = value
+    assert _hash(pipeline, row) != _hash(pipeline, ESTABELECIMENTO)
+
+
+def test_hash_ignores_surrounding_spaces_and_cep_hyphen():
+    # O hash é dos valores normalizados, não do texto do CSV
+    pipeline = EstabelecimentosPipeline(None)
+    row = [f" {value} " if value else value for value in ESTABELECIMENTO]
+    row[pipeline.fieldnames.index("cep")] = "01001000"
+    assert _hash(pipeline, row) == _hash(pipeline, ESTABELECIMENTO)
+
+
+def test_hash_distinguishes_empty_from_none_and_column_boundaries():
+    assert compute_row_hash(["a", None]) != compute_row_hash(["a", ""])
+    assert compute_row_hash(["ab", "c"]) != compute_row_hash(["a", "bc"])
+    assert compute_row_hash([["6201501", "6202300"]]) == compute_row_hash(["6201501,6202300"])
+
+
+def test_hash_is_stable_across_processes():
+    # Gravado no banco e comparado na próxima release: não pode depender de PYTHONHASHSEED
+    pipeline = EstabelecimentosPipeline(None)
+    code = (
+        "from app.etl.pipelines import EstabelecimentosPipeline\n"
+        "from tests.etl.test_row_hash import ESTABELECIMENTO\n"
+        "print(EstabelecimentosPipeline(None)._convert(ESTABELECIMENTO)[-1])\n"
+    )
+    hashes = {
+        int(subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=Path(__file__).resolve().parents[2],
+            env={"PYTHONHASHSEED": seed, "PYTHONPATH": "."},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout)
+        for seed in ("1", "2")
+    }
+    assert hashes == {_hash(pipeline, ESTABELECIMENTO)}
+    assert -(2**63) <= _hash(pipeline, ESTABELECIMENTO) < 2**63
+
+
+class FakeEmpresas(EmpresasPipeline):
+    """Hashes já gravados em memória; registra o que seria inserido e reescrito."""
+
+    def __init__(self, known):
+        super().__init__(None)
+        self.known = known
+        self.saved = []
+        self.updated = []
+
+    async def fetch_hashes(self, keys):
+        return {key: self.known[key] for key in keys if key in self.known}
+
+    async def save_batch(self, models):
+        self.saved += models
+
+    async def update_batch(self, models):
+        self.updated += models
+
+
+def test_persist_by_hash_rewrites_only_changed_rows():
+    rows = {
+        "igual": ["00000001", "EMPRESA A", "2062", "49", "1000,00", "01", ""],
+        "alterada": ["00000002", "EMPRESA B", "2062", "49", "2000,00", "01", ""],
+        "sem_hash": ["00000003", "EMPRESA C", "2062", "49", "0,00", "01", ""],
+        "nova": ["00000004", "EMPRESA D", "2062", "49", "0,00", "01", ""],
+    }
+    pipeline = FakeEmpresas({})
+    models = {name: pipeline._from_record(pipeline._convert(row)) for name, row in rows.items()}
+    previous = list(rows["alterada"])
+    previous[4] = "1500,00"  # capital_social na release anterior
+    pipeline.known = {
+        ("00000001",): models["igual"].row_hash,
+        ("00000002",): pipeline._convert(previous)[-1],
+        ("00000003",): None,  # gravado antes da coluna row_hash
+    }
+
+    results = asyncio.run(pipeline._persist_batch(list(models.values())))
+
+    assert results == ["skipped", "updated", "updated", "inserted"]
+    assert pipeline.updated == [models["alterada"], models["sem_hash"]]
+    assert pipeline.saved == [models["nova"]]
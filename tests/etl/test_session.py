@@ -0,0 +1,49 @@
+"""get_driver_connection: BEGIN forçado só quando a transação ainda não começou."""
+import asyncio
+
+import pytest
+
+from app.etl.session import get_driver_connection
+
+
+class FakeDriver:
+    def __init__(self, in_transaction):
+        self.in_transaction = in_transaction
+
+    def is_in_transaction(self):
+        return self.in_transaction
+
+
+class FakeSession:
+    """Sessão cujo execute abre a transação na conexão, como o adapter asyncpg."""
+
+    def __init__(self, in_transaction):
+        self.driver = FakeDriver(in_transaction)
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement))
+        self.driver.in_transaction = True
+
+    async def connection(self):
+        return self
+
+    async def get_raw_connection(self):
+        return self
+
+    @property
+    def driver_connection(self):
+        return self.driver
+
+
+@pytest.mark.parametrize(("in_transaction", "statements"), [(False, ["SELECT 1"]), (True, [])])
+def test_begin_only_outside_transaction(in_transaction, statements):
+    session = FakeSession(in_transaction)
+
+    async def copies():
+        for _ in range(3):
+            assert await get_driver_connection(session) is session.driver
+
+    asyncio.run(copies())
+    # Um SELECT 1 por transação, não um por COPY
+    assert session.statements == statements